@@ -0,0 +1,334 @@
+'''
+AUTHOR: PAUL BRUNO
+
+Warm OMF agent.
+
+The agent process keeps authenticated OMFClient instances for each openstack environment and
+serves omf-osmgr.py commands over a unix domain socket, so a probe only pays for one socket
+round trip and the openstack api calls of the command itself.
+
+Without --serve or --stop this script is a thin client. It takes exactly the omf-osmgr.py
+flags, prints the command output and exits with the same exit code and 4 digit stderr
+code (see omfcodes.ExitCodes). If no agent is listening the command runs in omf-osmgr.py.
+
+EXAMPLES:
+
+  * omf-agent.py --serve --osenv sandbox,dev  (start agent, pre-authenticate sandbox and dev)
+
+  * omf-agent.py --osenv sandbox --checkhostsapi
+
+  * omf-agent.py --osenv sandbox --show flavors
+
+  * omf-agent.py --stop
+
+  The socket path defaults to ~/.omf/agent.sock, override with --socket PATH or OMF_AGENT_SOCKET.
+
+NOTE:
+
+  commands are served one at a time. Interactive commands (--createserver interactive) are
+  not served by the agent.
+'''
+
+import os, sys
+import socket
+import json
+
+OMF_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OSMGR = os.path.join(OMF_DIR, 'omf-osmgr.py')
+
+default_socket = os.environ.get('OMF_AGENT_SOCKET', os.path.join(os.path.expanduser('~'), '.omf', 'agent.sock'))
+
+CALLER_PATHS = ['--metrics-out', '--trace-out', '--profile-out', '--summary-out', '--record', '--replay', '--volumecfg']
+''' omf-osmgr.py path options resolved from the working directory of the caller, and --createvolume config=FILE '''
+
+
+def _pop_option(argv, name, has_value=True):
+
+  value = None
+
+  if name in argv:
+    i = argv.index(name)
+    if has_value:
+      value = argv[i + 1]
+      del argv[i:i + 2]
+    else:
+      value = True
+      del argv[i]
+
+  return value
+
+def _caller_value(option, value, cwd):
+
+  if option in CALLER_PATHS:
+    return os.path.join(cwd, os.path.expanduser(value))
+
+  if option == '--createvolume' and value.startswith('config='):
+    return 'config={0}'.format(os.path.join(cwd, os.path.expanduser(value[len('config='):])))
+
+  return value
+
+def _caller_argv(argv, cwd):
+
+  ret = list(argv)
+
+  for i, a in enumerate(ret):
+    if a.startswith('--') and '=' in a:
+      ret[i] = '{0}={1}'.format(a.split('=', 1)[0], _caller_value(a.split('=', 1)[0], a.split('=', 1)[1], cwd))
+    elif a.startswith('--') and i + 1 < len(ret):
+      ret[i + 1] = _caller_value(a, ret[i + 1], cwd)
+
+  return ret
+
+def _send(path, request):
+  '''
+  Send one request to the agent and read the reply
+
+  INPUTS:
+
+    STRING path - agent socket path
+
+    DICT request - json serializable request
+
+  RETURN:
+
+    DICT reply
+  '''
+  s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  s.connect(path)
+
+  try:
+    s.sendall(json.dumps(request) + '\n')
+    s.shutdown(socket.SHUT_WR)
+
+    chunks = []
+    while True:
+      data = s.recv(65536)
+      if not data:
+        break
+      chunks.append(data)
+  finally:
+    s.close()
+
+  return json.loads(''.join(chunks))
+
+
+''' <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><> '''
+
+class OMFAgent(object):
+
+  def __init__(self, path=default_socket, environments=None):
+    '''
+    Initialize OMFAgent instance
+
+    INPUTS:
+
+      STRING path - unix domain socket path to listen on
+
+      LIST environments - openstack environments to authenticate at start
+
+    RETURN:
+
+      OMFAgent instance
+    '''
+    self.path = path
+    ''' socket path '''
+
+    self.environments = environments or []
+    ''' environments to pre-warm '''
+
+    self.clients = {}
+    ''' warm OMFClient instances keyed on environment and credentials '''
+
+    sys.path.insert(0, OMF_DIR)
+
+    import imp
+    self.osmgr = imp.load_source('omf_osmgr', OSMGR)
+    ''' omf-osmgr.py module, commands are run through its main() '''
+
+    self.osmgr.client_factory = self.client
+
+  def client(self, **kwargs):
+    '''
+    Return the warm OMFClient for the requested environment, creating it on first request.
+    Has the same signature as OMFClient() so it can be used as omf-osmgr client_factory.
+
+    RETURN:
+
+      OMFClient instance
+    '''
+    if kwargs.get('record') or kwargs.get('replay'):
+      # RECORDED AND REPLAYED RUNS NEED THEIR OWN TRANSPORT
+      import omfbase
+      return omfbase.OMFCLIENT_CLASS(**kwargs)
+
+    key = (kwargs.get('osenv'), kwargs.get('host'), kwargs.get('user'), kwargs.get('project'))
+
+    c = self.clients.get(key)
+    if c is None:
+      # omfbase FIRST, omf_client CAN NOT BE IMPORTED BEFORE IT (CIRCULAR IMPORT)
+      import omfbase
+      c = omfbase.OMFCLIENT_CLASS(**kwargs)
+      self.clients[key] = c
+    else:
+      import omf_log
+      c.debug = kwargs.get('debug', False)
+      c.level = omf_log.level_of(debug=c.debug, quiet=kwargs.get('quiet', False))
+      c.summary = bool(kwargs.get('summary'))
+      c.metrics.reset()
+      if kwargs.get('req_client'):
+        for attr in c._client_modules.keys():
+          if attr.split('_')[0] in kwargs['req_client'].lower():
+            getattr(c, attr)
+
+    for _theclient in c._clients.values():
+      _theclient.debug = c.debug
+
+    return c
+
+  def warm(self):
+    '''
+    Authenticate the pre-warm environments
+
+    RETURN: none
+    '''
+    for env in self.environments:
+      try:
+        self.client(osenv=env).session
+        print 'warmed {0}'.format(env)
+      except SystemExit as e:
+        print 'failed to warm {0}, exit code {1}'.format(env, e.code)
+
+  def run(self, argv, cwd=None):
+    '''
+    Run one omf-osmgr command in the agent process
+
+    INPUTS:
+
+      LIST argv - omf-osmgr.py arguments
+
+      STRING cwd - working directory of the caller, output, cassette and config file paths are resolved from it
+
+    RETURN:
+
+      DICT code, stdout, stderr
+    '''
+    import StringIO, traceback
+
+    if ('--createserver' in argv) and ('interactive' in argv):
+      return {'code': 150, 'stdout': 'Interactive commands are not served by omf-agent\n', 'stderr': '1508'}
+
+    _stdout, _stderr = sys.stdout, sys.stderr
+    out, err = StringIO.StringIO(), StringIO.StringIO()
+
+    # THE AGENT STAYS IN OMF_DIR, OMF MODULES READ ../credentials AND ../templates RELATIVE TO IT
+    if cwd:
+      argv = _caller_argv(argv, cwd)
+
+    code = 0
+    try:
+      sys.stdout, sys.stderr = out, err
+      self.osmgr.main(argv)
+    except SystemExit as e:
+      if e.code is None:
+        code = 0
+      elif isinstance(e.code, int):
+        code = e.code
+      else:
+        err.write(str(e.code))
+        code = 1
+    except Exception:
+      traceback.print_exc(file=err)
+      code = 1
+    finally:
+      sys.stdout, sys.stderr = _stdout, _stderr
+
+    return {'code': code, 'stdout': out.getvalue(), 'stderr': err.getvalue()}
+
+  def serve(self):
+    '''
+    Listen on the unix domain socket until a stop request is received
+
+    RETURN: none
+    '''
+    import SocketServer
+
+    agent = self
+
+    class _Handler(SocketServer.StreamRequestHandler):
+
+      def handle(self):
+        try:
+          request = json.loads(self.rfile.readline())
+        except ValueError:
+          return
+
+        if request.get('command') == 'stop':
+          reply = {'code': 0, 'stdout': 'omf-agent stopped\n', 'stderr': ''}
+          self.server.stopping = True
+        elif request.get('command') == 'ping':
+          reply = {'code': 0, 'stdout': 'omf-agent {0} environments: {1}\n'.format(os.getpid(), \
+                     sorted(set([k[0] for k in agent.clients.keys()]))), 'stderr': ''}
+        else:
+          reply = agent.run([a.encode('utf-8') for a in request.get('argv', [])], request.get('cwd'))
+
+        self.wfile.write(json.dumps(reply))
+
+    if not os.path.isdir(os.path.dirname(self.path)):
+      os.makedirs(os.path.dirname(self.path), 0700)
+
+    if os.path.exists(self.path):
+      os.remove(self.path)
+
+    _umask = os.umask(077)
+    server = SocketServer.UnixStreamServer(self.path, _Handler)
+    os.umask(_umask)
+
+    server.stopping = False
+
+    print 'omf-agent listening on {0}'.format(self.path)
+    sys.stdout.flush()
+
+    try:
+      while not server.stopping:
+        server.handle_request()
+    finally:
+      server.server_close()
+      if os.path.exists(self.path):
+        os.remove(self.path)
+
+
+if __name__ == '__main__':
+
+  argv = sys.argv[1:]
+
+  path = _pop_option(argv, '--socket') or default_socket
+
+  if _pop_option(argv, '--serve', has_value=False):
+    # OMF MODULES READ ../credentials AND ../templates RELATIVE TO THE WORKING DIRECTORY
+    os.chdir(OMF_DIR)
+    envs = _pop_option(argv, '--osenv')
+    agent = OMFAgent(path=path, environments=envs.split(',') if envs else [])
+    agent.warm()
+    agent.serve()
+    sys.exit(0)
+
+  if _pop_option(argv, '--stop', has_value=False):
+    request = {'command': 'stop'}
+  elif _pop_option(argv, '--ping', has_value=False):
+    request = {'command': 'ping'}
+  else:
+    request = {'argv': argv, 'cwd': os.getcwd()}
+
+  try:
+    reply = _send(path, request)
+  except socket.error:
+    if 'argv' not in request:
+      sys.stderr.write('omf-agent is not running on {0}\n'.format(path))
+      sys.exit(1)
+    # NO AGENT, RUN THE COMMAND THE REGULAR WAY
+    os.execv(sys.executable, [sys.executable, OSMGR] + argv)
+
+  sys.stdout.write(reply['stdout'])
+  sys.stderr.write(reply['stderr'])
+  sys.exit(reply['code'])
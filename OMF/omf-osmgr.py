@@ -51,6 +51,28 @@ EXAMPLES:
 
   * omf-osmgr.py --osenv sandbox --show networks
 
+  * omf-osmgr.py --osenv all --checkhostsapi  (or --osenv dev,qa. runs each environment in parallel, optionally add --workers xx)
+
+  * omf-osmgr.py --osenv sandbox --checkhostsapi --showmetrics  (print count and p50/p99 latency of each openstack api call at exit)
+
+  * omf-osmgr.py --osenv production --checkhosts --record /tmp/prod-checkhosts  (then replay it without network access:
+    omf-osmgr.py --osenv production --checkhosts --replay /tmp/prod-checkhosts  (optionally add --replay-speed 0))
+
+  * omf-osmgr.py --osenv sandbox --checkhosts --metrics-out /var/lib/node_exporter/textfile/omf.prom  (host, volume, api and run
+    metrics for the node_exporter textfile collector. with several --osenv environments each writes omf-<environment>.prom)
+
+  * omf-osmgr.py --osenv sandbox --checkhosts --trace  (print where the time went, command > OMF call > api call)
+
+  * omf-osmgr.py --osenv sandbox --test addip --trace-out /tmp/addip.json  (every api call, ping, wait loop iteration and sleep
+    per thread, open in chrome://tracing or https://ui.perfetto.dev)
+
+  * omf-osmgr.py --osenv sandbox --show hostsfull --profile-out /tmp/hostsfull.pstats --profile-mem  (cProfile of the command,
+    top allocation sites and memory peak. --profile prints the top functions by cumulative time)
+
+  * omf-osmgr.py --osenv sandbox --checkhosts --summary  (count, total, mean, p50/p95/p99 and max seconds of each traced
+    operation and it's share of the run time, the per call "query took" lines are then only logged.
+    --summary-out /tmp/checkhosts.json writes it as json)
+
 
 EXAMPLE VOLUME JSON INPUT:
 
@@ -68,17 +90,18 @@ volcfg.json sample:
 '''
 
 import os, sys, time
-import subprocess
-import traceback
+import re
 from collections import defaultdict
 from collections import namedtuple
-from datetime import datetime, timedelta
-import ast
-import random
-import omfbase #utility class
+import omf_args
+import omf_log
+import omf_trace
 from omfcodes import ExitCodes
-import utils
-import urllib
+
+# omfbase (AND WITH IT OMFClient AND THE CREDENTIALS) IS IMPORTED ONCE THE ARGUMENTS PARSED, THE OPENSTACK
+# CLIENT MODULES AND MODULES ONLY SOME COMMANDS NEED WHERE THEY ARE USED, SO --help AND ARGUMENT ERRORS
+# RETURN WITHOUT LOADING THEM, FROM ANY WORKING DIRECTORY
+omfbase = None
 
 try:
   ec = ExitCodes()
@@ -92,16 +115,42 @@ heat_client = None
 
 __evacuating_node = None
 
-try:
+global os_client
+
+os_client = None
+
+textfile = None
+''' omf_metrics.Textfile of the run when --metrics-out is used '''
+
+profile = None
+''' omf_profile.Profile of the run when --profile, --profile-out or --profile-mem is used '''
+
+client_factory = None
+''' optional callable returning the OMFClient for a run (used by omf-agent.py to hand out warm clients) '''
+
+fanned_out = False
+''' the run was handed to one omf-osmgr.py process per environment, they write the output files '''
+
+def _new_client(**kwargs):
+
+  if (_args):
+    kwargs.setdefault('record', _args.get('record'))
+    kwargs.setdefault('replay', _args.get('replay'))
+    kwargs.setdefault('replay_speed', _args.get('replay_speed'))
+    kwargs.setdefault('summary', _args.get('summary'))
+
+  if (client_factory):
+    return client_factory(**kwargs)
+
+  try:
     from omf_client import OMFClient
-except Exception:
+  except Exception:
+    import traceback
     exc_type, exc_value, exc_traceback = sys.exc_info()
     traceback.print_exception(exc_type, exc_value, exc_traceback, limit = 3, file = sys.stdout)
     raise RuntimeError("Failed to load OMFClient")
 
-global os_client
-
-os_client = None
+  return OMFClient(**kwargs)
 
 def __ceiloclient():
 
@@ -187,8 +236,7 @@ def powerdown_node(node=None):
 
 def _evacuate(instance):
 
-  if (debug):
-    os_client.log_and_print_info('Evacuating {0}'.format(instance))
+  os_client.log_and_print_debug('Evacuating {0}', instance)
 
   try:
     nova_session.client.servers.evacuate(instance, host=None, on_shared_storage=True, password=None)
@@ -227,27 +275,163 @@ def evacuate_host(host_instances=None):
       failed.append(str(i['name']))
       continue
 
-    runningtime, obj = omfbase.trace(_evacuate, i['uuid'])
+    with omf_trace.span('evacuate', i['name']) as _span:
+      obj = _evacuate(i['uuid'])
 
     if (debug):
-      os_client.log_and_print_info('Evacuate {0}:{1} took: {2}'.format(i['name'],i['uuid'], runningtime)) 
+      os_client.log_and_print_info('Evacuate {0}:{1} took: {2}', i['name'],i['uuid'], _span.duration) 
     else:
-      os_client.log_info('Evacuate {0}:{1} took: {2}'.format(i['name'],i['uuid'], runningtime))
+      os_client.log_info('Evacuate {0}:{1} took: {2}', i['name'],i['uuid'], _span.duration)
 
     if (obj):
       failed.append(str(i['name']))
     
       if (debug):
-        os_client.log_and_print_error('Failed to evacuate {0}:{1}'.format(i['name'],i['uuid']))
+        os_client.log_and_print_error('Failed to evacuate {0}:{1}', i['name'],i['uuid'])
 
   if (len(failed) > 0):
     if (debug):
-      os_client.log_and_print_error('Total host failed to evacuate: {0} \n{1}'.format(len(failed), failed))
+      os_client.log_and_print_error('Total host failed to evacuate: {0} \n{1}', len(failed), failed)
     return len(failed)
   else:
     return 0
 
 
+''' Result of a command run against one environment '''
+EnvResult = namedtuple('EnvResult', 'environment, exit, code, seconds, stdout, stderr')
+
+CODE_MARKER = '@@OMF-CODE@@'
+''' stderr line prefix of the OMF code of an environment process, set OMF_CODE_MARKER in it's environment '''
+
+class _CodeStream(object):
+  '''
+  stderr of an environment process, remembers the last 4 digit OMF code written to it
+  '''
+
+  def __init__(self, stream):
+
+    self.stream = stream
+    self.code = None
+
+  def write(self, data):
+
+    # OMF CODES ARE WRITTEN ON THEIR OWN, OR AHEAD OF THEIR DESCRIPTOR (SEE omfcodes)
+    m = re.match(r'\s*(\d{4})(\s|$)', data)
+    if (m):
+      self.code = m.group(1)
+    self.stream.write(data)
+
+  def __getattr__(self, name):
+
+    return getattr(self.stream, name)
+
+_ENVIRONMENT_FILES = ['--metrics-out', '--trace-out', '--profile-out', '--summary-out']
+''' output file options written per environment as <path>-<environment><ext> '''
+
+def _environment_argv(argv, env):
+
+  ret = []
+  skip = False
+
+  for a in argv:
+    if (skip):
+      skip = False
+      continue
+    if a in ['--osenv', '--workers']:
+      skip = True
+      continue
+    if a.startswith('--osenv=') or a.startswith('--workers='):
+      continue
+    ret.append(a)
+
+  # EACH ENVIRONMENT WRITES IT'S OWN TEXTFILE, TRACE, PROFILE AND SUMMARY, AND RECORDS TO OR REPLAYS FROM IT'S OWN DIRECTORY
+  for i, a in enumerate(ret):
+    if a.split('=', 1)[0] in _ENVIRONMENT_FILES and '=' in a:
+      ret[i] = '{0}={1}'.format(a.split('=', 1)[0], _environment_path(a.split('=', 1)[1], env))
+    elif a in _ENVIRONMENT_FILES and i + 1 < len(ret):
+      ret[i + 1] = _environment_path(ret[i + 1], env)
+    elif a.startswith('--record=') or a.startswith('--replay='):
+      ret[i] = '{0}={1}'.format(a.split('=', 1)[0], os.path.join(a.split('=', 1)[1], env))
+    elif a in ['--record', '--replay'] and i + 1 < len(ret):
+      ret[i + 1] = os.path.join(ret[i + 1], env)
+
+  return ret + ['--osenv', env]
+
+def _environment_path(path, env):
+
+  root, ext = os.path.splitext(path)
+
+  return '{0}-{1}{2}'.format(root, env, ext)
+
+def _run_environment(env, argv):
+
+  import subprocess
+
+  _start = time.time()
+
+  p = subprocess.Popen([sys.executable, os.path.abspath(__file__)] + _environment_argv(argv, env), \
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=dict(os.environ, OMF_CODE_MARKER='1'))
+  out, err = p.communicate()
+
+  codes = re.findall(r'^{0}(\d{{4}})$'.format(CODE_MARKER), err, re.M)
+  err = re.sub(r'\n?^{0}\d{{4}}$\n?'.format(CODE_MARKER), '', err, flags=re.M)
+
+  return EnvResult(environment = env, \
+                   exit = p.returncode, \
+                   code = codes[-1] if codes else '-', \
+                   seconds = '{0:.2f}'.format(time.time() - _start), \
+                   stdout = out, \
+                   stderr = err)
+
+def fan_out(environments, argv):
+  '''
+  Run the same command against several openstack environments in parallel, one
+  omf-osmgr.py process per environment, and print one merged report
+
+  INPUTS:
+
+    LIST environments - known openstack environments
+
+    LIST argv - command line arguments of this run
+
+  RETURN:
+
+    INT exit code. 0 when every environment passed
+  '''
+  for a in ['test', 'createserver', 'createvolume', 'mountvolume', 'evacuate']:
+    if _args[a]:
+      print 'Only checks and --show can run against several environments, not --{0}'.format(a)
+      sys.stderr.write('1504')
+      return 150
+
+  from multiprocessing.pool import ThreadPool
+
+  pool = ThreadPool(max(1, min(_args['workers'], len(environments))))
+  try:
+    results = pool.map(lambda env: _run_environment(env, argv), environments)
+  finally:
+    pool.close()
+    pool.join()
+
+  for r in results:
+    print '\n{0} {1} (exit {2}) {3}\n'.format('=' * 20, r.environment, r.exit, '=' * 20)
+    sys.stdout.write(r.stdout)
+    if (r.stderr):
+      print '\nstderr:\n{0}'.format(r.stderr.strip())
+
+  print '\nSummary:\n'
+  header = EnvResult('ENVIRONMENT', 'EXIT', 'CODE', 'SECONDS', None, None)
+  omfbase.print_pretty_columns([header] + results, ['environment', 'exit', 'code', 'seconds'])
+
+  failed = [r for r in results if r.exit]
+
+  if (failed):
+    sys.stderr.write('1512')
+    return 151
+
+  return 0
+
+
 '''
 RETURNS argparse.ArgumentParser() object 
 ADDS utility specific args in the object
@@ -257,7 +441,7 @@ ADDS utility specific args in the object
 
 def fill_args():
 
-  _p = omfbase.common_args()
+  _p = omf_args.common_args()
 
   _p.add_argument(
     '--checkclients',
@@ -357,6 +541,68 @@ def fill_args():
     help='Limit results set. Used with metric (ceilometer) calls.',
     default=3)
 
+  _p.add_argument(
+    '--workers',
+    help='Maximum environments checked at the same time when --osenv lists several. default=4',
+    type=int,
+    default=4)
+
+  _p.add_argument(
+    '--metrics-out',
+    help='Write a node_exporter textfile (prometheus text format) with host, volume, api latency and run metrics. ' \
+         'The file is replaced atomically.',
+    metavar='PATH',
+    default=None)
+
+  _p.add_argument(
+    '--record',
+    help='Record every openstack api request and response, and every host ping, to DIR/cassette.jsonl. ' \
+         'Passwords and tokens are not written.',
+    metavar='DIR',
+    default=None)
+
+  _p.add_argument(
+    '--replay',
+    help='Answer openstack api requests and host pings from a cassette recorded with --record, without network access.',
+    metavar='DIR',
+    default=None)
+
+  _p.add_argument(
+    '--replay-speed',
+    help='Recorded latency multiplier with --replay. 0 answers right away. default=1.0',
+    metavar='FACTOR',
+    type=float,
+    default=1.0)
+
+  _p.add_argument(
+    '--showmetrics',
+    help='Print count, errors and p50/p99 latency of every openstack api call the command made.',
+    action='store_true')
+
+  _p.add_argument(
+    '--trace',
+    help='Print where the time of the command went, as a tree of timed spans (command > OMF call > api call).',
+    action='store_true')
+
+  _p.add_argument(
+    '--trace-out',
+    help='Write every span of the command (api calls, pings, wait loop iterations, sleeps) per thread to PATH ' \
+         'in Chrome Trace Event format, for chrome://tracing or https://ui.perfetto.dev',
+    metavar='PATH',
+    default=None)
+
+  _p.add_argument(
+    '--summary',
+    help='Print count, total, mean, p50, p95, p99 and max seconds of every traced operation, and it\'s share ' \
+         'of the run wall time, at exit. The per call "query took" lines are then only logged.',
+    action='store_true')
+
+  _p.add_argument(
+    '--summary-out',
+    help='Write the run summary of --summary to PATH as json.',
+    metavar='PATH',
+    default=None)
+
   return _p
 
 def test_cinder():
@@ -455,37 +701,173 @@ _args = None
 
 ''' <><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><><> '''
 
-if __name__ == '__main__':
+def main(argv=None):
+  '''
+  Run one omf-osmgr command
+
+  INPUT:
+
+    LIST argv - command line arguments, default sys.argv[1:]
+
+  RETURN:
+
+    none, exits with the OMF exit code of the command
+  '''
+  global _args, os_client, textfile, profile, fanned_out
+
+  if argv is None:
+    argv = sys.argv[1:]
+
+  _args, os_client, textfile, profile, fanned_out = None, None, None, None, False
+
+  if os.environ.get('OMF_CODE_MARKER'):
+    sys.stderr = _CodeStream(sys.stderr)
 
-  _args = vars(fill_args().parse_args())
+  omf_trace.reset()
+
+  _start = time.time()
+  code = 0
+
+  # ROOT SPAN OF THE COMMAND, NAMED AFTER IT ONCE THE ARGUMENTS ARE PARSED
+  _run = omf_trace.span('omf-osmgr')
+
+  try:
+    with _run:
+      _main(argv)
+  except SystemExit as e:
+    code = e.code
+    raise
+  except Exception:
+    code = 1
+    raise
+  finally:
+    if (profile):
+      profile.stop()
+    if (os_client):
+      _code = code if isinstance(code, int) else (0 if code is None else 1)
+      os_client.log_event(_command(), state='error' if _code else 'info', duration=time.time() - _start, exit_code=_code)
+    if (_args):
+      _run.name = _command()
+    if (os_client) and (_args.get('showmetrics')):
+      os_client.metrics.report()
+    # A FANNED OUT RUN ONLY MERGES THE REPORTS, THE ENVIRONMENT PROCESSES TRACE, PROFILE AND SUMMARIZE
+    if (_args) and (not fanned_out) and (_args.get('trace')):
+      omf_trace.report()
+    if (profile) and (_args.get('profile') or _args.get('profile_mem')):
+      profile.report(cpu=_args.get('profile'))
+    if (_args) and (not fanned_out) and (_args.get('trace_out')):
+      try:
+        omf_trace.write_chrome(_args['trace_out'])
+      except (IOError, OSError) as e:
+        sys.stdout.write('Failed to write trace file {0}: {1}\n'.format(_args['trace_out'], e))
+    if (_args) and (not fanned_out) and (_args.get('summary')):
+      omf_trace.report_summary()
+    if (_args) and (not fanned_out) and (_args.get('summary_out')):
+      try:
+        omf_trace.write_summary(_args['summary_out'])
+      except (IOError, OSError) as e:
+        sys.stdout.write('Failed to write summary file {0}: {1}\n'.format(_args['summary_out'], e))
+    if (textfile):
+      _write_textfile(code, time.time() - _start)
+    if isinstance(sys.stderr, _CodeStream):
+      if (sys.stderr.code):
+        sys.stderr.write('\n{0}{1}\n'.format(CODE_MARKER, sys.stderr.code))
+      sys.stderr = sys.stderr.stream
+
+def _command():
+
+  for c in ['checkhosts', 'checkhostsapi', 'checkvolumes', 'checkclients', 'checkmetrics', 'listmetrics', \
+            'test', 'show', 'createvolume', 'createserver', 'mountvolume']:
+    if (_args.get(c)):
+      return c
+
+  return 'none'
+
+def _write_textfile(code, seconds):
+  '''
+  Add the run metrics and write the --metrics-out textfile
+
+  INPUTS:
+
+    INT code - exit code of the run
+
+    FLOAT seconds - run duration
+
+  RETURN: none
+  '''
+  _labels = {'command': _command()}
+
+  textfile.gauge('run_duration_seconds', seconds, 'Duration of the omf-osmgr run', **_labels)
+  textfile.gauge('run_exit_code', code if isinstance(code, int) else 1, 'Exit code of the omf-osmgr run', **_labels)
+  textfile.gauge('run_timestamp_seconds', time.time(), 'Unix time the omf-osmgr run finished', **_labels)
+
+  try:
+    textfile.write(_args['metrics_out'], os_client.metrics if os_client else None)
+  except (IOError, OSError) as e:
+    sys.stdout.write('Failed to write metrics file {0}: {1}\n'.format(_args['metrics_out'], e))
+
+def _main(argv):
+
+  global _args, os_environment, debug, failsafe, action_evacuate, os_client, nova_session, cinder_session, textfile, profile, omfbase, fanned_out
+
+  _parser = fill_args()
+  _args = vars(_parser.parse_args(argv))
+
+  if (_args['record']) and (_args['replay']):
+    _parser.error('--record and --replay can not be used together')
+
+  if (_args['debug']) and (_args['quiet']):
+    _parser.error('--debug and --quiet can not be used together')
+
+  import omfbase
+
+  omf_log.level = omf_log.level_of(debug=_args['debug'], quiet=_args['quiet'])
+  omf_log.configure(fmt=_args['log_format'], max_bytes=_args['log_max_bytes'], backups=_args['log_backups'])
+  omf_trace.enable(_args['trace'] or _args['trace_out'] or _args['summary'] or _args['summary_out'])
 
   if (_args['osenv']):
-    os_environment = _args['osenv'].lower()
+    try:
+      environments = omfbase.parse_environments(_args['osenv'])
+    except ValueError as e:
+      _parser.error('argument --osenv: {0}'.format(e))
+
+    if len(environments) > 1:
+      fanned_out = True
+      sys.exit(fan_out(environments, argv))
+
+    os_environment = environments[0]
     
-    if not os_environment in omfbase.known_environments:
+    if not os_environment in omfbase.environments():
       raise ValueError('No matching known openstack environment found for {0}'.format(os_environment))
 
   else:
     if (not _args['user']) and (not _args['password']) and (not _args['host']) and (not _args['project']):
       raise NameError("if --osenv is not specified, you must use --user --password --host --project")
   
-  if (_args['debug']):
-    debug = True
+  if (_args['metrics_out']):
+    import omf_metrics
+    textfile = omf_metrics.Textfile(environment=os_environment if _args['osenv'] else _args['host'])
+
+  if (_args['profile']) or (_args['profile_out']) or (_args['profile_mem']):
+    import omf_profile
+    profile = omf_profile.Profile(out=_args['profile_out'], mem=_args['profile_mem'])
+    profile.start()
+
+  debug = _args['debug']
 
   if (_args['failsafe']):
     failsafe = _args['failsafe']
 
-  if (_args['evacuate']):
-    action_evacuate = _args['evacuate']
+  action_evacuate = _args['evacuate']
 
   ''' OPEN BASE CLIENT CLASS. PROVIDES CREDIENTIAL INIT TO BE CONSUMED (OR OVERWRITTEN) BY CHILD CLIENT CLASSES AND OTHER BASE FUNCTIONS '''
 
   if _args['checkclients']: #not much overhead opening all clients, but the option to check just one is needed.
 
     if not _args['checkclients'] == 'all': 
-      os_client = OMFClient(osenv=os_environment, req_client=_args['checkclients'], debug=_args['debug'])
+      os_client = _new_client(osenv=os_environment, req_client=_args['checkclients'], debug=_args['debug'], quiet=_args['quiet'], token_cache=_args['token_cache'])
     else:
-      os_client = OMFClient(osenv=os_environment, debug=_args['debug'])
+      os_client = _new_client(osenv=os_environment, debug=_args['debug'], quiet=_args['quiet'], token_cache=_args['token_cache'])
 
  
   def _setup_client(client=None):
@@ -493,9 +875,9 @@ if __name__ == '__main__':
     global os_client
 
     if not client:
-      os_client = OMFClient(osenv=os_environment, debug=_args['debug'])
+      os_client = _new_client(osenv=os_environment, debug=_args['debug'], quiet=_args['quiet'], token_cache=_args['token_cache'])
     else:
-      os_client = OMFClient(osenv=os_environment, debug=_args['debug'], req_client=client)
+      os_client = _new_client(osenv=os_environment, debug=_args['debug'], quiet=_args['quiet'], token_cache=_args['token_cache'], req_client=client)
 
 
   if (_args['checkmetrics'] and _args['listmetrics']):
@@ -569,14 +951,14 @@ if __name__ == '__main__':
         os_client.log_and_exit(e, 2102)
 
       for m in meters:
-        os_client.log_and_print_info('{0}\n'.format(m))
+        os_client.log_and_print_info('{0}\n', m)
     
       sys.exit(0)
 
     if _args['listmetrics']: 
       meters = ceilo_session.get_metrics(namefilter=_sname, metric=_metric)
       for m in meters:
-        os_client.log_and_print_info('{0}\n'.format(m))
+        os_client.log_and_print_info('{0}\n', m)
 
       sys.exit(0)
 
@@ -601,6 +983,8 @@ if __name__ == '__main__':
 
       _hosts[h.hypervisor_hostname] = h.state
       checkedhosts+=1
+      if (textfile):
+        textfile.gauge('host_api_up', h.state == 'up', 'Hypervisor is up according to the nova api', host=h.hypervisor_hostname)
       if h.state != 'up':
         failedhosts+=1
 
@@ -608,9 +992,8 @@ if __name__ == '__main__':
 
     # GET TOTAL FAILED HOSTS
     if (not failedhosts):
-      os_client.log_and_print_info('All hosts ({0}) are responding to api calls.'.format(checkedhosts))
-      if (debug):
-        os_client.log_and_print_info(_hosts)
+      os_client.log_and_print_info('All hosts ({0}) are responding to api calls.', checkedhosts)
+      os_client.log_and_print_debug(_hosts)
       sys.exit(0)
     else:
       os_client.log_and_print_info(_hosts) 
@@ -645,6 +1028,9 @@ if __name__ == '__main__':
     for h in compute_node_set:
       if ((not h.network_up) and (not h.api_up) and (h.has_nodes)):
         failedhosts+=1
+      if (textfile):
+        textfile.gauge('host_network_up', bool(h.network_up), 'Hypervisor answers ping', host=h.hostname)
+        textfile.gauge('host_api_up', bool(h.api_up), 'Hypervisor is up according to the nova api', host=h.hostname)
 
     if (failedhosts > failsafe):
       os_client.log_and_print('CRITICAL: More than {0} hosts need evacuation, beyond the capacity'.format(str(failsafe)), 1507)
@@ -721,7 +1107,7 @@ if __name__ == '__main__':
     elif 'ceilo' in _args['checkclients'].lower():
       test_ceilo()
     else:
-      os_client.log_and_print_info('Unknown client asked for {0}'.format(_args['checkclients']))
+      os_client.log_and_print_info('Unknown client asked for {0}', _args['checkclients'])
 
   '''------------------------------------- CHECK VOLUME/S -----------------------------------------'''
   if (_args['checkvolumes']):
@@ -732,20 +1118,25 @@ if __name__ == '__main__':
 
     _failed = {}
 
+    if (textfile):
+      _status = defaultdict(int)
+      for v in _vol or []:
+        _status[v.status] += 1
+      for s, n in _status.items():
+        textfile.gauge('volumes', n, 'Volumes by status', status=s)
+
     if (_vol):
-      if (debug): 
-        os_client.log_and_print_info('\n{0} Volumes found:\n'.format(len(_vol)))
+      os_client.log_and_print_debug('\n{0} Volumes found:\n', len(_vol))
 
       for v in _vol:
 
-        if (debug):
-          os_client.log_and_print_info('{0}\n'.format(v))
+        os_client.log_and_print_debug('{0}\n', v)
 
         if v.status != 'available':
           _failed[v.name] = '{0} :: {1}'.format(v.id,v.status)
 
       if len(_failed) == len(_vol):
-        os_client.log_and_print_error('*** {0} of {1} Volumes are not available'.format(len(_failed), len(_vol)))
+        os_client.log_and_print_error('*** {0} of {1} Volumes are not available', len(_failed), len(_vol))
         os_client.log_and_print_warn('*** Take Action to create Volumes.')
         sys.stderr.write('1509')
         sys.exit(150)
@@ -778,13 +1169,13 @@ if __name__ == '__main__':
         omfbase.print_pretty_dict(d)
       else:
         for o in obj:
-          os_client.log_and_print_info('name={0} id={1}'.format(o.human_id,o.id))
+          os_client.log_and_print_info('name={0} id={1}', o.human_id,o.id)
 
       sys.exit(0)
 
     def _process_cinder_show(obj):
       for o in obj:
-        os_client.log_and_print_info('name={0} id={1}'.format(o.name,o.id))
+        os_client.log_and_print_info('name={0} id={1}', o.name,o.id)
       sys.exit(0)
 
     nova_session = __novaclient()
@@ -854,7 +1245,7 @@ if __name__ == '__main__':
       omfbase.print_pretty_columns(nova_session.get_flavors(), ['name','human_id','id','ram'])
 
       #for f in nova_session.get_flavors():
-      #  os_client.log_and_print_info('{0}\t{1}\t{2}'.format(f.name,f.human_id,f.id))
+      #  os_client.log_and_print_info('{0}\t{1}\t{2}', f.name,f.human_id,f.id)
       #_process_nova_show(nova_session.get_flavors())
 
     if (_args['show'] == 'servers'):
@@ -883,7 +1274,7 @@ if __name__ == '__main__':
       all_available_hosts = nova_session.get_hypervisors()
       compute_node_set = nova_session.get_hypervisors_info(namefilter=_args['filter'])
       for h in  compute_node_set:
-         os_client.log_and_print_info('\n{0}'.format(h))
+         os_client.log_and_print_info('\n{0}', h)
       sys.exit(0)
 
     if (_args['show'] == 'volumes'):
@@ -907,10 +1298,10 @@ if __name__ == '__main__':
       _vol = cinder_session.get_volumes_info(namefilter=_args['filter'])
    
       if (_vol):
-        os_client.log_and_print_info('\n{0} Volumes found:\n'.format(len(_vol)))
+        os_client.log_and_print_info('\n{0} Volumes found:\n', len(_vol))
 
         for v in _vol:
-          os_client.log_and_print_info('{0}\n'.format(v))
+          os_client.log_and_print_info('{0}\n', v)
 
       sys.exit(0)
 
@@ -1009,13 +1400,14 @@ if __name__ == '__main__':
     glance_session = __glanceclient()
     nova_session = __novaclient()
 
+    import random
     _name = 'IMG_{0}'.format(str(random.getrandbits(16))) if not _args['filter'] else _args['filter']
 
     newimage = glance_session.create_image(name = _name, url=glance_session.test_image)
 
     omfbase.print_pretty_dict({'name': newimage.human_id, 'id': newimage.id, 'status':  newimage.status})
 
-    os_client.log_and_print_info('Deleteing image {0}'.format(newimage.name))
+    os_client.log_and_print_info('Deleteing image {0}', newimage.name)
 
     try:
       nova_session.client.images.delete(newimage.id)
@@ -1061,7 +1453,7 @@ if __name__ == '__main__':
       # s - server
       # n - network 
       # exit - exit code
-      os_client.log_and_print_info('Tearing down new server and ip {0} {1}'.format(s.name, ip['floating_ip_address']))
+      os_client.log_and_print_info('Tearing down new server and ip {0} {1}', s.name, ip['floating_ip_address'])
 
       _stderr = sys.stderr
       f = open('trash','w')
@@ -1085,6 +1477,7 @@ if __name__ == '__main__':
     cfg['network'] = 'newnet'
     cfg['image'] = 'centos7'
     cfg['flavor'] = 'm1medium'
+    import random
     cfg['name'] = 'SVR_{0}'.format(str(random.getrandbits(24)))
 
     s = nova_session.create_instance(cfg)
@@ -1129,7 +1522,7 @@ if __name__ == '__main__':
     new_fixed_ip = new_fips.items()[0][1]['fixed_ip_address']
 
     if (new_fips_id):
-      os_client.log_and_print_info('Created new ip {0}'.format(new_fixed_ip)) 
+      os_client.log_and_print_info('Created new ip {0}', new_fixed_ip) 
 
       floatingips = None
 
@@ -1155,27 +1548,28 @@ if __name__ == '__main__':
 
           if x['id'] == new_fips_id:
 
-            os_client.log_and_print_info('Verified new id {0}'.format(x['id'])) 
+            os_client.log_and_print_info('Verified new id {0}', x['id']) 
 
             # try to ping the new floating ip
             ctr = neutron_session.new_floating_ip_wait
             up = False
             
             while ((not up) and (ctr != 0)):
-              os_client.log_and_print_info('pinging {0}'.format(new_floating_ip))
-              up = os_client.is_reachable(host=new_floating_ip)
+              with omf_trace.span('wait_floating_ip', new_floating_ip, cat='wait'):
+                os_client.log_and_print_info('pinging {0}', new_floating_ip)
+                up = os_client.is_reachable(host=new_floating_ip)
 
-              time.sleep(neutron_session.pause)
+                omf_trace.sleep(neutron_session.pause)
               ctr-=1
               
             if (not up):
-              os_client.log_and_print_error('Failed to reach new ip {0}\nDeleting new instance and ip.'.format(x['fixed_ip_address']))
+              os_client.log_and_print_error('Failed to reach new ip {0}\nDeleting new instance and ip.', x['fixed_ip_address'])
               _teardown(s,x,2001)
             else:
               os_client.log_and_print_error('Success validation new floating ip association')
               _teardown(s,x,0) 
 
-            os_client.log_and_print_info('Deleted new ip {0} {1}'.format(x['fixed_ip_address'], x['id']))
+            os_client.log_and_print_info('Deleted new ip {0} {1}', x['fixed_ip_address'], x['id'])
 
     else:
       os_client.log_and_exit('Failed to create new floating ip', 2005)      
@@ -1204,8 +1598,7 @@ if __name__ == '__main__':
     _stack = heat_session.create_stack(name=_name, stack=data)
 
     if (_stack):
-      if (debug):
-        os_client.log_and_print_info('Successfully created stack')
+      os_client.log_and_print_debug('Successfully created stack')
 
       # TEAR IT DOWN 
       s = {}
@@ -1258,6 +1651,8 @@ if __name__ == '__main__':
 
     cinder_session = __cinderclient()
 
+    import ast
+
     volconfig = None
 
     try: 
@@ -1276,7 +1671,7 @@ if __name__ == '__main__':
     if (not v): 
       os_client.log_and_exit('Failed to create volume {0}'.format(volconfig['name']), 1702)
 
-    os_client.log_and_print_info('Created new volume {0} id: {1}'.format(volconfig['name'], v)) 
+    os_client.log_and_print_info('Created new volume {0} id: {1}', volconfig['name'], v) 
 
     os_client.log_and_print_info('Deleteing new volume')
     try:
@@ -1303,6 +1698,7 @@ if __name__ == '__main__':
     cfg['network'] = 'newnet'
     cfg['image'] = 'centos7'
     cfg['flavor'] = 'm1medium'
+    import random
     cfg['name'] = 'SVR_{0}'.format(str(random.getrandbits(24)))
 
     s = nova_session.create_instance(cfg)
@@ -1318,7 +1714,7 @@ if __name__ == '__main__':
       except Exception as e:
         os_client.log_and_exit(e, 1610)
 
-    os_client.log_and_print_info('Cleanup, delete new instance {0}, no wait.'.format(s.name))
+    os_client.log_and_print_info('Cleanup, delete new instance {0}, no wait.', s.name)
    
     try:
       s.delete()
@@ -1332,6 +1728,8 @@ if __name__ == '__main__':
 
     cinder_session = __cinderclient()
 
+    import ast
+
     volconfig = None
 
     if ('config=' in _args['createvolume']):
@@ -1354,12 +1752,11 @@ if __name__ == '__main__':
     if (not _v):
       os_client.log_and_exit('Failed to create volume {0}'.format(volconfig['name']), 1702)
 
-    os_client.log_and_print_info('Created new volume {0} id: {1}'.format(volconfig['name'], _v))
+    os_client.log_and_print_info('Created new volume {0} id: {1}', volconfig['name'], _v)
     sys.exit(0)
 
   '''---------------------------------------------------------------------------------------------'''
 
 
-
-
-
+if __name__ == '__main__':
+  main()
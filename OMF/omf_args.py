@@ -0,0 +1,130 @@
+'''
+Author: Paul Bruno
+
+Provides:
+
+  - command line arguments common to the OMF scripts
+
+  - building the parser reads no credentials and imports no OMF client module, so --help and
+    argument errors return right away, from any working directory
+'''
+
+import argparse
+import omf_log
+
+def common_args():
+  '''
+  Builds ArgumentParser and fills with common arguments for all OS Clients
+
+    debug - enable verbose logging and print
+
+    quiet - only print and log warnings and errors
+  
+    user - valid openstack user name
+
+    password - valid openstack user password
+ 
+    host - valid openstack host connect url
+
+    project - valid openstack tenant 
+
+    osenv - known environment, comma separated list of environments or all
+
+    token-cache - reuse cached keystone token for the environment
+
+    log-format, log-max-bytes, log-backups - text or json log lines, size based rotation of the log files
+
+    profile, profile-out, profile-mem - run the command under cProfile, write pstats, record allocation sites
+    
+  INPUTS:
+
+    none
+
+  RETURN:
+  
+    ArgumentParser object
+
+  '''
+  parser = argparse.ArgumentParser()
+
+  parser.add_argument(
+    '--debug',
+    help="toggle debug",
+    action='store_true')
+
+  parser.add_argument(
+    '--quiet',
+    help="Only print and log warnings and errors, the exit code tells the result.",
+    action='store_true')
+
+  parser.add_argument(
+    '--user',
+    help='Openstack user.',
+    default=None)
+
+  parser.add_argument(
+    '--password',
+    help='Openstack password.',
+    default=None)
+
+  parser.add_argument(
+    '--host',
+    help='Openstack auth_url.',
+    default=None)
+
+  parser.add_argument(
+    '--project',
+    help='Openstack tenant (project).',
+    default=None)
+
+  parser.add_argument(
+    '--token-cache',
+    help='Reuse the keystone token of a previous run for --osenv until it is about to expire.',
+    action='store_true')
+
+  parser.add_argument(
+    '--log-format',
+    choices=omf_log.FORMATS,
+    help='OMFClient.log and OMFOpenStack.log line format. json writes one json object per line, ' \
+         'with timestamp, environment, service, operation, duration, object count and exit code of api calls and runs. default=text',
+    default='text')
+
+  parser.add_argument(
+    '--log-max-bytes',
+    help='Rotate a log file at this size, 0 never rotates. default={0}'.format(omf_log.DEFAULT_MAX_BYTES),
+    metavar='BYTES',
+    type=int,
+    default=omf_log.DEFAULT_MAX_BYTES)
+
+  parser.add_argument(
+    '--log-backups',
+    help='Gzip compressed segments kept of a rotated log file. default={0}'.format(omf_log.DEFAULT_BACKUPS),
+    metavar='N',
+    type=int,
+    default=omf_log.DEFAULT_BACKUPS)
+
+  parser.add_argument(
+    '--profile',
+    help='Run the command under cProfile and print the top functions by cumulative time.',
+    action='store_true')
+
+  parser.add_argument(
+    '--profile-out',
+    help='Run the command under cProfile and write the pstats to FILE.',
+    metavar='FILE',
+    default=None)
+
+  parser.add_argument(
+    '--profile-mem',
+    help='Also print the top allocation sites and the peak of the traced memory (needs tracemalloc, ' \
+         'else only the peak resident set size is printed).',
+    action='store_true')
+
+  parser.add_argument(
+    '--osenv',
+    metavar='ENV[,ENV...]|all',
+    help='OpenStack Environment listed in credentials/environments. Use instead of passing credentials in. ' \
+         'A comma separated list or all runs the command against each environment in parallel.',
+    default=None)
+
+  return parser
@@ -0,0 +1,187 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Concurrent facade over OMFClient
+
+  - Runs the public methods of the OMF service clients on a bounded pool of worker threads
+    and returns result handles, so independent api calls run at the same time
+
+USE EXAMPLES:
+
+  from omf_client import OMFClient
+  from omf_async import AsyncOMFClient
+
+  aclient = AsyncOMFClient(OMFClient(osenv='sandbox'), workers=8)
+
+  servers = aclient.nova.get_instance()
+  volumes = aclient.cinder.get_volumes_basic()
+  networks = aclient.neutron.get_networks()
+
+  servers, volumes, networks = aclient.gather(servers, volumes, networks)
+
+  * print aclient.snapshot() (servers, volumes, networks and stacks in the time of the slowest call)
+
+NOTE:
+
+  The OMF service clients keep filters on the instance between calls, so calls to the same
+  service client run one at a time. Calls to different services run in parallel.
+'''
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+
+import omfbase as omfbase
+import omf_trace
+
+
+class OMFAsyncExit(Exception):
+  '''
+  A call in a worker thread exited through OMFClient.log_and_exit. gather() exits with the same code.
+  '''
+  def __init__(self, code):
+    Exception.__init__(self, code)
+    self.code = code
+
+
+class _AsyncService(object):
+
+  def __init__(self, owner, attr):
+
+    self._owner = owner
+    self._attr = attr
+    self._lock = threading.Lock()
+
+  def __getattr__(self, name):
+
+    if name.startswith('_'):
+      raise AttributeError(name)
+
+    def _submit(*args, **kwargs):
+      return self._owner.submit(self._call, name, args, kwargs)
+
+    _submit.__name__ = name
+
+    return _submit
+
+  def _call(self, name, args, kwargs):
+
+    _theclient = getattr(self._owner.client, self._attr)
+
+    with self._lock:
+      return getattr(_theclient, name)(*args, **kwargs)
+
+
+class AsyncOMFClient(object):
+
+  def __init__(self, client, workers=8):
+    '''
+    Initialize AsyncOMFClient instance
+
+    INPUTS:
+
+      * OMFClient client - instance of OMFClient
+
+      * INT workers - maximum calls running at the same time. default 8
+
+    RETURN:
+
+      * AsyncOMFClient instance
+    '''
+    if (not client) or (not isinstance(client, omfbase.OMFCLIENT_CLASS)):
+      raise TypeError('AsyncOMFClient needs an OMFClient instance, got {0}'.format(type(client)))
+
+    self.client = client
+    ''' INSTANCE of OMFClient '''
+
+    self.workers = workers
+    ''' INT concurrency limit '''
+
+    self._pool = ThreadPool(workers)
+
+    self.keystone = _AsyncService(self, 'keystone_client')
+    self.nova = _AsyncService(self, 'nova_client')
+    self.cinder = _AsyncService(self, 'cinder_client')
+    self.glance = _AsyncService(self, 'glance_client')
+    self.heat = _AsyncService(self, 'heat_client')
+    self.neutron = _AsyncService(self, 'neutron_client')
+    self.ceilo = _AsyncService(self, 'ceilo_client')
+
+  def submit(self, func, *args, **kwargs):
+    '''
+    Run any callable on the worker pool
+
+    INPUTS:
+
+      * FUNCTION func - callable, i.e. a native client method
+
+      * args, kwargs - passed to func
+
+    RETURN:
+
+      * multiprocessing.pool.AsyncResult. use .get(timeout) or gather()
+    '''
+    def _run():
+      try:
+        return func(*args, **kwargs)
+      except SystemExit as e:
+        # log_and_exit() IN A WORKER THREAD. SystemExit WOULD END THE POOL THREAD, HAND IT BACK TO THE CALLER INSTEAD
+        raise OMFAsyncExit(e.code)
+
+    # CALLS RUN AS CHILDREN OF THE SPAN THAT SUBMITTED THEM
+    return self._pool.apply_async(omf_trace.wrap(_run))
+
+  def gather(self, *results, **kwargs):
+    '''
+    Wait for results of submitted calls
+
+    INPUTS:
+
+      * AsyncResult results - handles returned by the service methods or submit()
+
+      * FLOAT timeout - optional keyword, seconds to wait for each result
+
+    RETURN:
+
+      * LIST of values in the order of results. Exits like OMFClient.log_and_exit if one of the calls did.
+    '''
+    timeout = kwargs.get('timeout')
+
+    ret = []
+    for r in results:
+      try:
+        ret.append(r.get(timeout) if timeout else r.get(2 ** 31))
+      except OMFAsyncExit as e:
+        sys.exit(e.code)
+
+    return ret
+
+  def snapshot(self):
+    '''
+    Look up servers, volumes, networks and stacks at the same time
+
+    RETURN:
+
+      * DICT servers, volumes, networks, stacks
+    '''
+    keys = ['servers', 'volumes', 'networks', 'stacks']
+
+    values = self.gather(self.nova.get_instance(), \
+                         self.cinder.get_volumes_basic(), \
+                         self.neutron.get_networks(), \
+                         self.heat.get_stacks())
+
+    ret = dict(zip(keys, values))
+    ret['stacks'] = ret['stacks'][2]  # get_stacks() returns count, generator, list
+
+    return ret
+
+  def close(self):
+    '''
+    Stop the worker threads after pending calls finished
+
+    RETURN: none
+    '''
+    self._pool.close()
+    self._pool.join()
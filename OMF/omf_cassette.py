@@ -0,0 +1,257 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Record and replay of the openstack api traffic of an OMFClient
+
+  - --record DIR writes every http request and response pair of the shared transport
+    (so of all OMF service clients) and the result of each host ping to DIR/cassette.jsonl,
+    one json object per line, with the time each one took
+
+  - --replay DIR answers the same requests from the cassette without any network access.
+    Identical requests are answered in the order they were recorded, the last answer is
+    repeated once they are used up (polling). The recorded latencies are reproduced,
+    scaled by --replay-speed (0 answers right away)
+
+NOTE:
+
+  Passwords in request bodies and tokens in responses are replaced with ***, a cassette can be
+  shared. Token expiry times are moved to the far future so a replayed token never expires.
+'''
+import os, time
+import json
+import threading
+
+REDACTED = '***'
+
+FAR_FUTURE = '2999-12-31T23:59:59Z'
+
+
+def _redact(obj):
+
+  if isinstance(obj, dict):
+    ret = {}
+    for k, v in obj.items():
+      if k in ['password', 'secret']:
+        ret[k] = REDACTED
+      elif k in ['expires', 'expires_at'] and isinstance(v, basestring):
+        ret[k] = FAR_FUTURE
+      elif k == 'token' and isinstance(v, dict) and 'id' in v:
+        # KEYSTONE V2 TOKEN
+        ret[k] = _redact(v)
+        ret[k]['id'] = REDACTED
+      else:
+        ret[k] = _redact(v)
+    return ret
+
+  if isinstance(obj, list):
+    return [_redact(x) for x in obj]
+
+  return obj
+
+
+def _redact_body(body):
+
+  if not body or not isinstance(body, basestring):
+    return body
+
+  try:
+    return json.dumps(_redact(json.loads(body)), sort_keys=True)
+  except ValueError:
+    return body
+
+
+class Cassette(object):
+  '''
+  Recorded openstack api traffic of one run
+  '''
+
+  def __init__(self, path, mode='record', speed=1.0):
+    '''
+    Initialize Cassette instance
+
+    INPUTS:
+
+      STRING path - directory holding cassette.jsonl
+
+      STRING mode - record | replay
+
+      FLOAT speed - replay only, recorded latency multiplier. 0 answers right away. default 1.0
+
+    RETURN:
+
+      Cassette instance
+    '''
+    self.path = os.path.join(path, 'cassette.jsonl')
+    ''' cassette file '''
+
+    self.mode = mode
+    ''' record | replay '''
+
+    self.speed = speed
+    ''' recorded latency multiplier '''
+
+    self._entries = {}
+    self._lock = threading.Lock()
+
+    if mode == 'record':
+      if not os.path.isdir(path):
+        os.makedirs(path, 0700)
+      open(self.path, 'w').close()
+    else:
+      with open(self.path, 'r') as f:
+        for line in f:
+          if line.strip():
+            e = json.loads(line)
+            self._entries.setdefault(self._key(e['kind'], e['request']), []).append(e)
+
+  @property
+  def recording(self):
+
+    return self.mode == 'record'
+
+  def _key(self, kind, request):
+
+    return json.dumps([kind, request], sort_keys=True)
+
+  def _write(self, kind, request, response, elapsed):
+
+    line = json.dumps({'kind': kind, 'request': request, 'response': response, 'elapsed': round(elapsed, 6)}, \
+                      sort_keys=True)
+
+    with self._lock:
+      with open(self.path, 'a') as f:
+        f.write(line + '\n')
+
+  def _next(self, kind, request):
+
+    with self._lock:
+      queue = self._entries.get(self._key(kind, request))
+      if not queue:
+        return None
+      e = queue[0]
+      if len(queue) > 1:
+        queue.pop(0)
+
+    if self.speed and e['elapsed']:
+      time.sleep(e['elapsed'] * self.speed)
+
+    return e
+
+  ''' http '''
+
+  def _http_request(self, request):
+
+    import urlparse, urllib
+
+    url = urlparse.urlsplit(request.url)
+    query = urllib.urlencode(sorted(urlparse.parse_qsl(url.query, keep_blank_values=True)))
+
+    body = request.body
+    if body is not None and not isinstance(body, basestring):
+      # FILE UPLOAD (glance image data), ONLY IT'S PRESENCE IS PART OF THE KEY
+      body = '<stream>'
+
+    return {'method': request.method, \
+            'url': urlparse.urlunsplit((url.scheme, url.netloc, url.path, query, '')), \
+            'body': _redact_body(body)}
+
+  def record_http(self, request, response, elapsed):
+    '''
+    Write one http exchange
+
+    INPUTS:
+
+      requests.PreparedRequest request
+
+      requests.Response response - it's content is read
+
+      FLOAT elapsed - seconds
+
+    RETURN: none
+    '''
+    headers = dict([(k, v) for k, v in response.headers.items() if k.lower() not in ['set-cookie']])
+    if 'X-Subject-Token' in headers:
+      headers['X-Subject-Token'] = REDACTED
+
+    content = response.content
+    try:
+      body, encoding = _redact_body(content.decode('utf-8')), 'text'
+    except UnicodeDecodeError:
+      body, encoding = content.encode('base64'), 'base64'
+
+    self._write('http', self._http_request(request), \
+                {'status': response.status_code, 'reason': response.reason, 'headers': headers, \
+                 'body': body, 'encoding': encoding}, elapsed)
+
+  def replay_http(self, request, adapter):
+    '''
+    Answer an http request from the cassette
+
+    INPUTS:
+
+      requests.PreparedRequest request
+
+      requests.adapters.HTTPAdapter adapter - adapter the response is returned through
+
+    RETURN:
+
+      requests.Response. Raises requests.exceptions.ConnectionError for a request that was not recorded
+    '''
+    import datetime
+    import requests
+    from requests.structures import CaseInsensitiveDict
+
+    _request = self._http_request(request)
+
+    e = self._next('http', _request)
+    if e is None:
+      raise requests.exceptions.ConnectionError('No recorded response for {0} {1} in {2}'.format(_request['method'], \
+                                                                                                   _request['url'], \
+                                                                                                   self.path))
+
+    r = e['response']
+
+    response = requests.Response()
+    response.status_code = r['status']
+    response.reason = r['reason']
+    response.headers = CaseInsensitiveDict(r['headers'])
+    response._content = r['body'].decode('base64') if r['encoding'] == 'base64' else r['body'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    response.connection = adapter
+    response.elapsed = datetime.timedelta(seconds=e['elapsed'])
+
+    return response
+
+  ''' other calls '''
+
+  def call(self, kind, key, func, *args, **kwargs):
+    '''
+    Record or replay a call with a json serializable result, i.e. a host ping
+
+    INPUTS:
+
+      STRING kind - call type, i.e. ping
+
+      STRING key - what the call was made for, i.e. the host name
+
+      FUNCTION func - makes the call when recording
+
+    RETURN:
+
+      result of func
+    '''
+    if (self.recording):
+      t1 = time.time()
+      ret = func(*args, **kwargs)
+      self._write(kind, key, ret, time.time() - t1)
+      return ret
+
+    e = self._next(kind, key)
+    if e is None:
+      raise RuntimeError('No recorded {0} {1} in {2}'.format(kind, key, self.path))
+
+    return e['response']
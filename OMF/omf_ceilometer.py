@@ -11,6 +11,7 @@ Description:
 import os, sys, traceback
 from sets import Set
 import omfbase as omfbase
+import omf_trace
 import time
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -72,21 +73,16 @@ class CeiloClient (object):
 
       self.project = _project
 
-      ''' NON LAMBDA WAY OF CREATING THE CLIENT '''
-      keystone = {}
-      keystone['os_username'] = _user
-      keystone['os_password'] = _password
-      keystone['os_auth_url'] = _class.host
-      keystone['os_tenant_name'] = _project
+      sess = _class.get_session(kwargs)
 
-      ceilo = client.get_client(2, **keystone)
+      ceilo = client.get_client(2, session=sess)
 
-      self.client = ceilo
+      self.client = _class.instrument('ceilo', ceilo)
 
       if not isinstance(ceilo, ceilometerclient.v2.client.Client):
         _class.log_and_exit('Invalid Ceilometer client.', 2100)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(self.client)))
+      _class.log_debug('Created new {0}: {1}', __name__, type(self.client))
 
     except Exception as e:
       _class.log_and_exit(e, 2100)
@@ -161,17 +157,16 @@ class CeiloClient (object):
       LIST of openstack metric objects
     ''' 
     if (namefilter):
-      if (self.debug):
-        self.parent.log_and_print_info('Setting namefilter to {0}'.format(namefilter))
+      self.parent.log_and_print_debug('Setting namefilter to {0}', namefilter)
       self._name_filter = namefilter
 
     if (metric):
-      if (self.debug):
-        self.parent.log_and_print_info('Setting metric filter to {0}'.format(metric))
+      self.parent.log_and_print_debug('Setting metric filter to {0}', metric)
       self._metric_filter = metric
 
-    runningtime, obj = omfbase.trace(self._metrics)
-    self.parent.log_and_print_info('Metrics query took: {0}'.format(runningtime))
+    with omf_trace.span('get_metrics') as _span:
+      obj = self._metrics()
+    self.parent.log_took('Metrics query took: {0}', _span.duration)
 
     return obj 
 
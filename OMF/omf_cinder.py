@@ -11,7 +11,7 @@ Description:
 import os, sys, traceback
 from sets import Set
 import omfbase as omfbase
-import time
+import omf_trace
 from datetime import datetime, timedelta
 from collections import defaultdict
 from collections import namedtuple
@@ -84,12 +84,14 @@ class CinderClient (object):
 
       self.project = _project
 
-      self.client = Client('2', _user, _password, _project, auth_url=_class.host)
+      sess = _class.get_session(kwargs)
+
+      self.client = _class.instrument('cinder', Client('2', session=sess))
 
       if not isinstance(self.client, cinderclient.v2.client.Client):
         _class.log_and_exit('Initialize Cinder client failed', 1700)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(self.client)))
+      _class.log_debug('Created new {0}: {1}', __name__, type(self.client))
 
     except Exception as e:
       _class.log_and_exit(e, 1700)
@@ -145,17 +147,18 @@ class CinderClient (object):
     while (waiting):
       waiting = False
       try:
-        vols = self._volumes()
-        if (vols):
-          for v in vols:
-            if v.name.lower() == obj.name.lower():
-              if (v.status.lower() != 'available'):
-                waiting = True
-                sys.stdout.write('. ')
-                sys.stdout.flush()
-                time.sleep(1)
-              else:
-                self.parent.log_and_print_info('\nNew Volume {0} is ready.'.format(obj.name))
+        with omf_trace.span('wait_volume', obj.name, cat='wait'):
+          vols = self._volumes()
+          if (vols):
+            for v in vols:
+              if v.name.lower() == obj.name.lower():
+                if (v.status.lower() != 'available'):
+                  waiting = True
+                  sys.stdout.write('. ')
+                  sys.stdout.flush()
+                  omf_trace.sleep(1)
+                else:
+                  self.parent.log_and_print_info('\nNew Volume {0} is ready.', obj.name)
             
       except Exception as e:
         self.parent.log_and_exit(e, 1701)
@@ -180,8 +183,9 @@ class CinderClient (object):
     '''
     self._statusfilter = 'Available'
 
-    runningtime, obj = omfbase.trace(self._volumes)
-    self.parent.log_and_print_info('Volumes query took: {0}'.format(runningtime))
+    with omf_trace.span('get_available_volumes') as _span:
+      obj = self._volumes()
+    self.parent.log_took('Volumes query took: {0}', _span.duration)
 
     if (not obj):
       self.parent.log_and_print_info('Creating new volume as needed...')
@@ -192,8 +196,9 @@ class CinderClient (object):
       cfg['size'] = self.vol_size
  
       if(self.create_volume(cfg)):
-        runningtime, obj = omfbase.trace(self._volumes)
-        self.parent.log_and_print_info('Volumes create took: {0}'.format(runningtime))
+        with omf_trace.span('get_available_volumes') as _span:
+          obj = self._volumes()
+        self.parent.log_took('Volumes create took: {0}', _span.duration)
 
     return obj
 
@@ -212,8 +217,9 @@ class CinderClient (object):
     if (namefilter):
       self._namefilter = namefilter
 
-    runningtime, obj = omfbase.trace(self._volumes)
-    self.parent.log_and_print_info('Volumes query took: {0}'.format(runningtime))
+    with omf_trace.span('get_volumes_basic') as _span:
+      obj = self._volumes()
+    self.parent.log_took('Volumes query took: {0}', _span.duration)
 
     return obj
 
@@ -232,8 +238,9 @@ class CinderClient (object):
     if (namefilter):
       self._namefilter = namefilter
 
-    runningtime, obj = omfbase.trace(self._volumes)
-    self.parent.log_and_print_info('Volumes query took: {0}'.format(runningtime))
+    with omf_trace.span('get_volumes_info') as _span:
+      obj = self._volumes()
+    self.parent.log_took('Volumes query took: {0}', _span.duration)
 
     _volumes = []
 
@@ -274,15 +281,16 @@ class CinderClient (object):
       if v.name == config['name']:
         self.parent.log_error('Duplicate Volume name. Name must not exist in tenent')
         if (force):
-          self.parent.log_and_print_info('You specified to force re-create volume {0}'.format(config['name']))
+          self.parent.log_and_print_info('You specified to force re-create volume {0}', config['name'])
           d = v.delete()
         else:
           self.parent.log_and_exit('Volume name specified is in use: {0}'.format(config['name']), 1707)
 
     self.vol_config = config
 
-    runningtime, obj = omfbase.trace(self._create_volume)
-    self.parent.log_and_print_info('Create Volume took: {0}'.format(runningtime))
+    with omf_trace.span('create_volume') as _span:
+      obj = self._create_volume()
+    self.parent.log_took('Create Volume took: {0}', _span.duration)
 
     return obj
 
@@ -298,7 +306,8 @@ class CinderClient (object):
 
       * Instance Openstack Quota object
     '''
-    runningtime, obj = omfbase.trace(self._quotas)
-    self.parent.log_and_print_info('Quota query took: {0}'.format(runningtime))
+    with omf_trace.span('get_quotas') as _span:
+      obj = self._quotas()
+    self.parent.log_took('Quota query took: {0}', _span.duration)
 
     return obj
@@ -17,13 +17,19 @@ Provides:
 
 import os, sys, traceback, inspect
 from sets import Set 
-from datetime import datetime, timedelta
 import time
 import omfbase as omfbase
-import subprocess
+import atexit
+import types
+import threading
 from collections import defaultdict
 from collections import namedtuple
 from omfcodes import ExitCodes
+import omf_log
+import omf_metrics
+import omf_retry
+import omf_singleflight
+import omf_trace
 
 ec = ExitCodes()
 
@@ -52,6 +58,30 @@ class OMFClient (object):
       STRING project - valid openstack tenant
 
       **kwargs - additional parameters
+
+        STRING req_client - pre-load the named service client (nova|cinder|glance|heat|neutron|ceilo|keystone).
+                            All other service clients are imported and authenticated on first use of
+                            their *_client attribute.
+
+        BOOL debug - toggle debug, log and print DEBUG messages
+
+        BOOL quiet - only log and print warnings and errors
+
+        BOOL token_cache - reuse keystone tokens across runs (also set with token_cache=true in the credentials file)
+
+        BOOL endpoint_cache - keep the parsed service catalog on disk (also set with endpoint_cache=true in the credentials file)
+
+        INT pool_connections, INT pool_maxsize - http connection pools kept and connections kept per host
+
+        FLOAT connect_timeout, FLOAT read_timeout - http timeouts in seconds
+
+        (the http settings can also be set in the credentials file)
+
+        STRING record - directory to record the openstack api traffic and host pings to (see omf_cassette)
+
+        STRING replay - directory to replay recorded traffic from, no network access is made
+
+        FLOAT replay_speed - recorded latency multiplier when replaying, 0 answers right away. default 1.0
     
     '''
 
@@ -70,15 +100,59 @@ class OMFClient (object):
     self.project = None
     '''openstack tenant'''
 
-    def _exit(_client, code, shortcode):
-      print '\nFailed to load OMF {0}\n'.format(_client)
-      for e in inspect.trace():
-        print e[1], e[2], e[3], e[4]
-      sys.stderr.write('\n{0} {1}\n'.format(code, ec.get(code)))      
-      sys.exit(shortcode)
+    self._clients = {}
+    '''service clients created so far, keyed on attribute name'''
+
+    self._lock = threading.RLock()
+    '''guards creation of the shared transport, session and service clients across threads'''
+
+    self._session = None
+    '''keystone session shared by the service clients'''
+
+    self.osenv = osenv
+    '''openstack environment name'''
+
+    self.token_cache = False
+    '''reuse keystone tokens across runs from the on-disk token cache'''
+
+    self.transport_options = {}
+    '''http transport settings (pool_connections, pool_maxsize, connect_timeout, read_timeout)'''
+
+    self._transport = None
+    '''http transport shared by the service clients'''
+
+    self.endpoint_cache = False
+    '''keep the parsed service catalog on disk for the environment'''
+
+    self._endpoints = None
+    '''service catalog endpoint resolver of the shared session'''
+
+    self.cassette = None
+    '''omf_cassette.Cassette the api traffic is recorded to or replayed from, None for live traffic'''
+
+    self.metrics = omf_metrics.MetricsRegistry()
+    '''counters and latency histograms of every openstack api call, see api_call()'''
+
+    self.limits = {}
+    '''client side api limits from the credentials file, default or service -> rate_limit rate_burst max_inflight'''
+
+    self._limiters = {}
+    '''omf_limits.Limiter of each service, created on first call'''
+
+    self.retry_policy = omf_retry.RetryPolicy()
+    '''retry policy and retry budget of the api calls, see omf_retry'''
+
+    self.singleflight = omf_singleflight.SingleFlight()
+    '''identical read only api calls in flight or just finished, see omf_singleflight'''
+
+    self.breaker_options = {}
+    '''circuit breaker settings from the credentials file (threshold, reset_timeout)'''
+
+    self._breakers = {}
+    '''omf_retry.CircuitBreaker of each service, created on first call'''
 
     if (osenv):
-      if not osenv in omfbase.known_environments:
+      if not osenv in omfbase.environments():
         print 'No matching known openstack environment found for {0}'.format(os_environment)
         sys.stderr.write('{0} {1}\n'.format(1501, ec.get(1501)))      
         sys.exit(150)
@@ -106,9 +180,24 @@ class OMFClient (object):
 
       self.domain = self.creds.domain
 
+      self.token_cache = self.creds.token_cache
+
+      self.endpoint_cache = self.creds.endpoint_cache
+
+      self.transport_options.update(self.creds.transport)
+
+      self.limits = self.creds.limits
+
+      self.breaker_options = self.creds.breaker
+
+      self.retry_policy = omf_retry.RetryPolicy(**self.creds.retry)
+
+      if self.creds.singleflight_window is not None:
+        self.singleflight.window = self.creds.singleflight_window
+
       ret = omfbase.check_client_args(locals())
 
-      omfbase._log("Verified args...!")
+      omfbase._log("Verified args...!", 'debug')
 
       if (ret):
         print('Required client parameters needed, {0} are missing'.format(ret))
@@ -120,154 +209,343 @@ class OMFClient (object):
       self.debug = False
       '''set debug level'''
 
+      self.level = omf_log.level
+      '''log and print level, omf_log.DEBUG with debug, omf_log.WARN with quiet'''
+
+      self.summary = False
+      '''the run prints a latency summary (--summary), the per call durations are only logged'''
+
       _theclient = None
+      _record, _replay, _speed = None, None, 1.0
       for k,v in kwargs.items():
         if 'req_client' in k:
           _theclient = v
         if 'debug' in k:
           self.debug = v
+          if (v):
+            self.level = omf_log.DEBUG
+        if k == 'quiet' and v and not self.debug:
+          self.level = omf_log.WARN
+        if 'token_cache' in k and v:
+          self.token_cache = v
+        if 'endpoint_cache' in k and v:
+          self.endpoint_cache = v
+        if k in ['pool_connections', 'pool_maxsize', 'connect_timeout', 'read_timeout'] and v is not None:
+          self.transport_options[k] = v
+        if k == 'record' and v:
+          _record = v
+        if k == 'replay' and v:
+          _replay = v
+        if k == 'replay_speed' and v is not None:
+          _speed = float(v)
+        if k == 'summary' and v:
+          self.summary = True
+
+      if (_record) or (_replay):
+        import omf_cassette
+        self.cassette = omf_cassette.Cassette(_record or _replay, mode='record' if _record else 'replay', speed=_speed)
 
     except Exception as e:
       self.log_and_exit(e, 1501)
 
 
-    ''' KEYSTONE IS USED ALMOST ALWAYS, SO CREATE IT ALWAYS '''
+    '''
+    SERVICE CLIENTS ARE CREATED ON FIRST USE (SEE THE *_client PROPERTIES BELOW).
+    req_client ONLY PRE-LOADS THE NAMED CLIENT SO IT'S INIT ERRORS SURFACE HERE.
+    '''
+    if (_theclient):
+      for attr in self._client_modules.keys():
+        if attr.split('_')[0] in _theclient.lower():
+          getattr(self, attr)
+
+  def _exit_client_init(self, _client, code, shortcode):
+
+    print '\nFailed to load OMF {0}\n'.format(_client)
+    for e in inspect.trace():
+      print e[1], e[2], e[3], e[4]
+    sys.stderr.write('\n{0} {1}\n'.format(code, ec.get(code)))
+    sys.exit(shortcode)
+
+  def _load_client(self, attr):
+    '''
+    Import and initialize an OMF service client class
+
+    INPUT:
+
+      STRING attr - client attribute name, one of _client_modules
+
+    RETURN:
+
+      OMF service client instance
+    '''
+    _module, _name, code, _kwargs = self._client_modules[attr]
 
     try:
-      from omf_keystone import KeystoneClient
-      self.keystone_client = KeystoneClient(self, version=2)
+      _class = getattr(__import__(_module), _name)
+      _theclient = _class(self, **_kwargs)
     except Exception as e:
-      if isinstance(e, omfbase.OMFImport): 
-        _exit('KeystoneClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
+      if isinstance(e, omfbase.OMFImport):
+        self._exit_client_init(_name, int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
       else:
-        _exit('KeyStoneClient', 2200, 220)
-     
-    if self.debug:
-      self.log_and_print_info('created client object {0}'.format(type(self.keystone_client)))
+        self._exit_client_init(_name, code, int(str(code)[:3]))
+
+    self.log_and_print_debug('created client object {0}', type(_theclient))
+
+    self._clients[attr] = _theclient
+
+    return _theclient
+
+  @property
+  def transport(self):
+    '''
+    Http transport (requests.Session with a pooled keep-alive adapter) shared by all keystone sessions
+    and so by all OMF service clients.
+    '''
+    with self._lock:
+      if self._transport is None:
+        import omf_session
+        self._transport = omf_session.new_transport(cassette=self.cassette, **self.transport_options)
+
+    return self._transport
+
+  @property
+  def session(self):
+    '''
+    Keystone session shared by all OMF service clients (one token, one service catalog).
+    Authenticates on first use.
+    '''
+    with self._lock:
+      if self._session is None:
+        self._session = self._new_session(self.user, self.password, self.project)
+
+    return self._session
+
+  @property
+  def endpoints(self):
+    '''
+    Service catalog endpoint resolver of the shared session. Use endpoints.url_for(service_type, interface, region).
+    '''
+    with self._lock:
+      if self._endpoints is None:
+        import omf_session
+        self._endpoints = omf_session.EndpointResolver(self.session, osenv=self.osenv, persist=self.endpoint_cache)
+
+    return self._endpoints
+
+  def _new_session(self, user, password, project):
 
     try:
-      from omf_nova import NovaClient
-      self.nova_client = NovaClient(self)
+      import omf_session
+      sess = omf_session.new_session(host=self.host, user=user, password=password, project=project, \
+                                     domain=self.domain, transport=self.transport)
+
+      if (self.token_cache):
+        cache = omf_session.TokenCache(osenv=self.osenv, host=self.host, user=user, project=project)
+        if cache.load(sess.auth):
+          self.log_info('Using cached token {0}', cache.path)
+
+        self.api_call('keystone', 'authenticate', sess.get_token)
+
+        # WRITE NOW FOR A FRESH LOGIN, AND AGAIN AT EXIT IN CASE THE SESSION HAD TO RE-AUTHENTICATE
+        cache.save(sess.auth)
+        atexit.register(cache.save, sess.auth)
+      else:
+        self.api_call('keystone', 'authenticate', sess.get_token)
+
     except Exception as e:
-      if isinstance(e, omfbase.OMFImport): 
-        _exit('NovaClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
+      if isinstance(e, omfbase.OMFImport):
+        self._exit_client_init('Session', int(str(e)), int(str(e)[:3]))
       else:
-        _exit('NovaClient', 1600, 160)
+        self.log_and_exit(e, 2203)
 
-    if self.debug:
-      self.log_and_print_info('created client object {0}'.format(type(self.nova_client)))
+    self.log_info('Authenticated new {0} for {1}', type(sess), user)
 
-    if (_theclient):
-      if 'cinder' in _theclient.lower():
-        try:
-          from omf_cinder import CinderClient
-          self.cinder_client = CinderClient(self)
-        except Exception as e:
-          if isinstance(e, omfbase.OMFImport): 
-            _exit('CinderClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-          else:
-            _exit('CinderClient', 1700, 170)
-
-        if self.debug:
-          self.log_and_print_info('created client object {0}'.format(type(self.cinder_client)))
- 
-      if 'heat' in _theclient.lower():
-        try:
-          from omf_heat import HeatClient
-          self.heat_client = HeatClient(self)
-        except Exception as e:
-          if isinstance(e, omfbase.OMFImport): 
-            _exit('HeatClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-          else:
-            _exit('HeatClient', 1900, 190)
-
-        if self.debug:
-          self.log_and_print_info('created client object {0}'.format(type(self.heat_client)))
-
-      if 'glance' in _theclient.lower():
-        try:
-          from omf_glance import GlanceClient
-          self.glance_client = GlanceClient(self)
-        except Exception as e:
-          if isinstance(e, omfbase.OMFImport): 
-            _exit('GlanceClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-          else:
-            _exit('GlanceClient', 1800, 180)
-
-        if self.debug:
-          self.log_and_print_info('created client object {0}'.format(type(self.glance_client)))
-
-      if 'neutron' in _theclient.lower():    
-        try: 
-          from omf_neutron import NeutronClient
-          self.neutron_client = NeutronClient(self)
-        except Exception as e:
-          if isinstance(e, omfbase.OMFImport): 
-            _exit('NeutronClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-          else:
-            _exit('NeutronClient', 2000, 200)
-
-        if self.debug:
-          self.log_and_print_info('created client object {0}'.format(type(self.neutron_client)))
-
-      if 'ceilo' in _theclient.lower():
-        try:
-          from omf_ceilometer import CeiloClient
-          self.ceilo_client = CeiloClient(self)
-        except Exception as e:
-          if isinstance(e, omfbase.OMFImport): 
-            _exit('CeiloClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-          else:
-            _exit('CeiloClient', 2100, 210)
-
-        if self.debug:
-          self.log_and_print_info('created client object {0}'.format(type(self.ceilo_client)))
-
-    else:  
-      try:
-        from omf_cinder import CinderClient
-        self.cinder_client = CinderClient(self)
-      except Exception as e:
-        if isinstance(e, omfbase.OMFImport): 
-          _exit('CinderClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-        else:
-          _exit('CinderClient', 1700, 170)
+    return sess
+
+  def get_session(self, auth_inputs):
+    '''
+    Keystone session for a service client. The shared session is returned unless the client
+    was initialized with different credentials, then a dedicated session is authenticated.
 
+    INPUT:
+
+      DICT auth_inputs - service client keyword arguments (user, password, project)
+
+    RETURN:
+
+      Instance keystoneclient.session.Session
+    '''
+    _user, _password, _project = self.init_client_meta(self, auth_inputs)
+
+    if (_user, _password, _project) == (self.user, self.password, self.project):
+      return self.session
+
+    return self._new_session(_user, _password, _project)
+
+  def api_call(self, service, operation, func, *args, **kwargs):
+    '''
+    Run one native openstack client call and record it in self.metrics.
+    All calls of the OMF service clients go through here (see instrument()).
+
+    Identical read only calls made at the same time, or within singleflight_window, share one
+    request and it's result (see omf_singleflight).
+
+    Each try waits for the rate and in-flight limits of the service (see omf_limits).
+    Read only calls failing with a transient error are retried with backoff, and calls to a
+    service whose circuit breaker is open fail right away with omf_retry.CircuitOpen (see omf_retry).
+
+    INPUTS:
+
+      STRING service - nova | cinder | glance | heat | neutron | ceilo | keystone
+
+      STRING operation - native call name. i.e. servers.list
+
+      FUNCTION func - the native call
+
+      args, kwargs - passed to func
+
+    RETURN:
+
+      return value of func. Exceptions are recorded with their http status and raised again.
+    '''
+    if not self.retry_policy.idempotent(operation):
       try:
-        from omf_heat import HeatClient
-        self.heat_client = HeatClient(self)
-      except Exception as e:
-        if isinstance(e, omfbase.OMFImport): 
-          _exit('HeatClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-        else:
-          _exit('HeatClient', 1900, 190)
+        return self._retry_call(service, operation, func, *args, **kwargs)
+      finally:
+        # RESULTS KEPT FROM BEFORE THE CHANGE ARE STALE NOW, ALSO THOSE OF OTHER SERVICES
+        self.singleflight.forget()
+
+    def _call():
+      return self._retry_call(service, operation, func, *args, **kwargs)
+
+    ret, shared = self.singleflight.do(self.singleflight.key(service, operation, args, kwargs), _call)
+
+    if (shared):
+      self.metrics.record_shared(service, operation)
 
+    return ret
+
+  def _retry_call(self, service, operation, func, *args, **kwargs):
+
+    breaker = self._breaker(service)
+    retry = self.retry_policy if self.retry_policy.idempotent(operation) else None
+
+    self.retry_policy.deposit()
+
+    attempt = 0
+    while True:
       try:
-        from omf_glance import GlanceClient
-        self.glance_client = GlanceClient(self)
-      except Exception as e:
-        if isinstance(e, omfbase.OMFImport): 
-          _exit('GlanceClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-        else:
-          _exit('GlanceClient', 1800, 180)
-
-      try: 
-        from omf_neutron import NeutronClient
-        self.neutron_client = NeutronClient(self)
-      except Exception as e:
-        if isinstance(e, omfbase.OMFImport): 
-          _exit('NeutronClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-        else:
-          _exit('NeutronClient', 2000, 200)
+        breaker.before()
+      except omf_retry.CircuitOpen:
+        self.metrics.record(service, operation, 'circuit_open', 0.0)
+        raise
 
       try:
-        from omf_ceilometer import CeiloClient
-        self.ceilo_client = CeiloClient(self)
+        ret = self._api_call(service, operation, func, *args, **kwargs)
       except Exception as e:
-        if isinstance(e, omfbase.OMFImport): 
-          _exit('CeiloClient', int(str(e)), int('{0}{1}{2}'.format(str(e)[0], str(e)[1], str(e)[3])))
-        else:
-          _exit('CeiloClient', 2100, 210)
+        if not self.retry_policy.retryable(e):
+          # THE API ANSWERED, IT IS UP
+          breaker.success()
+          raise
+
+        if breaker.failure():
+          self.log_warn('{0} api circuit opened after {1} transient failures, last: {2}', service, breaker.failures, e)
+
+        if (not retry) or (attempt + 1 >= retry.attempts) or (not retry.withdraw()):
+          raise
+
+        delay = retry.delay(attempt, e)
+        self.log_warn('Retry {0} {1} in {2:.2f}s after: {3}', service, operation, delay, e)
+        self.metrics.record_retry(service, operation)
+
+        omf_trace.sleep(delay, 'retry_backoff')
+        attempt += 1
+        continue
+
+      breaker.success()
+
+      return ret
+
+  def _api_call(self, service, operation, func, *args, **kwargs):
+
+    limiter = self._limiter(service)
+
+    if (limiter):
+      self.metrics.record_wait(service, operation, limiter.acquire())
+
+    t1 = time.time()
+
+    try:
+      with omf_trace.span('{0}.{1}'.format(service, operation), cat='api'):
+        ret = func(*args, **kwargs)
+    except Exception as e:
+      status = omf_metrics.status_of(e)
+      self.metrics.record(service, operation, status, time.time() - t1)
+      self.log_event(operation, service=service, duration=time.time() - t1, status=status)
+      raise
+    finally:
+      if (limiter):
+        limiter.release()
+
+    if isinstance(ret, types.GeneratorType):
+      # PAGED LISTS (glance images, heat stacks) ARE FETCHED WHILE THE CALLER ITERATES
+      def _done(status, seconds):
+        self.metrics.record(service, operation, status, seconds)
+        self.log_event(operation, service=service, duration=seconds, status=status)
+
+      return omf_metrics.timed_generator(ret, _done, time.time() - t1)
+
+    self.metrics.record(service, operation, 'ok', time.time() - t1)
+    self.log_event(operation, service=service, duration=time.time() - t1, status='ok', \
+                   count=len(ret) if isinstance(ret, (list, tuple)) else None)
+
+    return ret
+
+  def _breaker(self, service):
+
+    if not service in self._breakers:
+      with self._lock:
+        if not service in self._breakers:
+          self._breakers[service] = omf_retry.CircuitBreaker(service, **self.breaker_options)
+
+    return self._breakers[service]
+
+  def _limiter(self, service):
+
+    if not service in self._limiters:
+      with self._lock:
+        if not service in self._limiters:
+          import omf_limits
+          self._limiters[service] = omf_limits.new_limiter(self.limits, service)
+
+    return self._limiters[service]
+
+  def instrument(self, service, native):
+    '''
+    Route the calls of a native openstack client through api_call()
+
+    INPUTS:
+
+      STRING service - service name the calls are recorded under
+
+      OBJECT native - native openstack client, i.e. novaclient.v2.client.Client
+
+    RETURN:
+
+      proxy of native. isinstance() checks against the native client class still hold
+    '''
+    return omf_metrics.Instrumented(native, self.api_call, service)
+
+  _client_modules = {
+    'keystone_client': ('omf_keystone', 'KeystoneClient', 2200, {'version': 2}),
+    'nova_client': ('omf_nova', 'NovaClient', 1600, {}),
+    'cinder_client': ('omf_cinder', 'CinderClient', 1700, {}),
+    'glance_client': ('omf_glance', 'GlanceClient', 1800, {}),
+    'heat_client': ('omf_heat', 'HeatClient', 1900, {}),
+    'neutron_client': ('omf_neutron', 'NeutronClient', 2000, {}),
+    'ceilo_client': ('omf_ceilometer', 'CeiloClient', 2100, {})
+  }
+  ''' attribute -> (module, class, init failure exit code, init kwargs) of each OMF service client '''
 
   ''' CLASS OFFERINGS '''
 
@@ -341,13 +619,14 @@ class OMFClient (object):
     if descriptor == 'OMF_INVALID_EXIT_CODE':
       code = 1501
 
-    f = open('{0}'.format(self.logfile), 'a')
-
     exc_type, exc_value, exc_traceback = sys.exc_info()
     if (self.debug):
       traceback.print_exception(exc_type, exc_value, exc_traceback, limit = 3, file = sys.stdout)
     else:
-      traceback.print_exception(exc_type, exc_value, exc_traceback, limit = 3, file = f)  
+      self._log_traceback(exc_type, exc_value, exc_traceback)
+
+    # NOTHING QUEUED MAY BE LOST, WHATEVER ENDS THE PROCESS AFTER THIS
+    omf_log.flush()
 
     sys.stderr.write('{0} {1}\n'.format(code, ec.get(code)))
 
@@ -370,12 +649,23 @@ class OMFClient (object):
     print e.message
     print e.__doc__
     print 'Exception caught: {0}'.format(type(e))
-    f = open('{0}'.format(self.logfile), 'a')
     exc_type, exc_value, exc_traceback = sys.exc_info()
     if (self.debug):
       traceback.print_exception(exc_type, exc_value, exc_traceback, limit = 3, file = sys.stdout)
     else:
-      traceback.print_exception(exc_type, exc_value, exc_traceback, limit = 3, file = f)  
+      self._log_traceback(exc_type, exc_value, exc_traceback)
+
+  def _log_traceback(self, exc_type, exc_value, exc_traceback):
+
+    if exc_type is None:
+      return
+
+    _tb = ''.join(traceback.format_exception(exc_type, exc_value, exc_traceback, limit = 3))
+
+    if omf_log.log_format == 'json':
+      _tb = omf_log.line('error', _tb.rstrip('\n'), env=self.osenv or self.host)
+
+    omf_log.sink(self.logfile).write(_tb)
 
   def init_client_meta(self, _class, auth_inputs):
     '''
@@ -407,6 +697,7 @@ class OMFClient (object):
 
     return _user, _password, _project
 
+  @omf_trace.traced(label='host', cat='ping')
   def is_reachable(self, host):
     '''
     Attempt ping on host
@@ -420,6 +711,15 @@ class OMFClient (object):
       BOOL True | False
 
     '''
+    if (self.cassette):
+      return self.cassette.call('ping', host, self._ping, host)
+
+    return self._ping(host)
+
+  def _ping(self, host):
+
+    import subprocess
+
     output = []
     machinetype = None
     test = subprocess.Popen('echo $MACHTYPE', shell=True, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
@@ -444,103 +744,200 @@ class OMFClient (object):
       print 'output:', output
       
     if (output):
-      self._log('ping stdout: {0}'.format(output))
+      self.log_debug('ping stdout: {0}', output)
     if (errout):
-      self._log('ping stderr: {0}'.format(errout))
+      self.log_info('ping stderr: {0}', errout)
     if (retcode):  #failed
       return False
 
     return True
 
-  def log_and_print_info(self, text=None):
+  def enabled(self, level):
+    '''
+    Guard for log work that costs more than formatting, i.e. building a report only logged in debug
+
+    INPUT:
+
+      INT level - omf_log.DEBUG | INFO | WARN | ERROR
+
+    RETURN:
+
+      BOOL True if messages of the level are printed and logged
+    '''
+    return level >= self.level
+
+  def log_and_print_debug(self, text=None, *args, **kwargs):
+    '''
+    Log tagged DEBUG: message to OMFClient.log and print to stdout, only with --debug
+
+    INPUT:
+
+      STRING text - message, or format string for args and kwargs. Formatted only if printed
+
+    RETURN: none
+    '''
+    self._emit(omf_log.DEBUG, text, args, kwargs, True)
+
+  def log_and_print_info(self, text=None, *args, **kwargs):
     '''
     Log tagged INFO: information message to OMFClient.log and print to stdout
 
     INPUT:
 
-      STRING text
+      STRING text - message, or format string for args and kwargs. Formatted only if printed
 
     RETURN: none
     '''
-    self._print(text)
-    self._log(text, 'INFO')
+    self._emit(omf_log.INFO, text, args, kwargs, True)
 
-  def log_and_print_warn(self, text=None):
+  def log_and_print_warn(self, text=None, *args, **kwargs):
     '''
     Log tagged WARN: warning message to OMFClient.log and print to stdout
 
     INPUT:
 
-      STRING text
+      STRING text - message, or format string for args and kwargs. Formatted only if printed
 
     RETURN: none
     '''
-    self._print(text)
-    self._log(text, 'WARN')
+    self._emit(omf_log.WARN, text, args, kwargs, True)
 
-  def log_and_print_error(self, text=None):
+  def log_and_print_error(self, text=None, *args, **kwargs):
     '''
     Log tagged ERROR: error message to OMFClient.log and print to stdout
 
     INPUT:
 
-      STRING text
+      STRING text - message, or format string for args and kwargs
 
     RETURN: none
     '''
-    self._print(text)
-    self._log(text, 'ERROR')
+    self._emit(omf_log.ERROR, text, args, kwargs, True)
+
+  def log_took(self, text=None, *args, **kwargs):
+    '''
+    Log tagged INFO: duration of an OMF call to OMFClient.log, and print it to stdout unless the run prints a summary
+
+    INPUT:
+
+      STRING text - message, or format string for args and kwargs. Formatted only if printed or logged
+
+    RETURN: none
+    '''
+    self._emit(omf_log.INFO, text, args, kwargs, not self.summary)
 
   def _print (self, text=None):
 
     print '{0}'.format(str(text))
 
-  def log_error (self, data=None):
+  def log_error (self, data=None, *args, **kwargs):
     '''
     Log tagged ERROR: error message to OMFClient.log 
 
     INPUT:
 
-      STRING text
+      STRING data - message, or format string for args and kwargs
 
     RETURN: none
     '''
-    with open(self.logfile, 'a') as f:
-      _log = '{0} ERROR: {1}\n'.format(str(datetime.now()), str(data))
-      f.write(_log)
+    self._emit(omf_log.ERROR, data, args, kwargs)
 
-  def log_warn (self, data=None):
+  def log_warn (self, data=None, *args, **kwargs):
     '''
     Log tagged WARN: warning message to OMFClient.log 
 
     INPUT:
 
-      STRING text
+      STRING data - message, or format string for args and kwargs. Formatted only if logged
 
     RETURN: none
     '''
-    with open(self.logfile, 'a') as f:
-      _log = '{0} WARN: {1}\n'.format(str(datetime.now()), str(data))
-      f.write(_log)
+    self._emit(omf_log.WARN, data, args, kwargs)
 
-  def log_info (self, data=None):
+  def log_info (self, data=None, *args, **kwargs):
     '''
     Log tagged INFO: information message to OMFClient.log 
 
     INPUT:
 
-      STRING text
+      STRING data - message, or format string for args and kwargs. Formatted only if logged
+
+    RETURN: none
+    '''
+    self._emit(omf_log.INFO, data, args, kwargs)
+
+  def log_debug (self, data=None, *args, **kwargs):
+    '''
+    Log tagged DEBUG: message to OMFClient.log, only with --debug
+
+    INPUT:
+
+      STRING data - message, or format string for args and kwargs. Formatted only if logged
+
+    RETURN: none
+    '''
+    self._emit(omf_log.DEBUG, data, args, kwargs)
+
+  def log_event(self, operation, state='info', **fields):
+    '''
+    Log a json record of a timed operation to OMFClient.log, only with the json log format
+
+    INPUTS:
+
+      STRING operation - i.e. servers.list or checkhosts
+
+      STRING state - debug | info | warn | error. default info
+
+      fields - service, duration (seconds), count (objects returned), status, exit_code (see omf_log.event)
 
     RETURN: none
     '''
-    with open(self.logfile, 'a') as f:
-      _log = '{0} INFO: {1}\n'.format(str(datetime.now()), str(data))
-      f.write(_log)
+    if omf_log.log_format != 'json' or omf_log.LEVELS.get(state.upper(), omf_log.INFO) < self.level:
+      return
+
+    fields.setdefault('env', self.osenv or self.host)
+
+    omf_log.sink(self.logfile).write(omf_log.event(state, operation, **fields))
+
+  def _emit(self, level, text, args, kwargs, _print=False):
+
+    # BELOW THE LEVEL NOTHING IS FORMATTED
+    if level < self.level:
+      return
+
+    text = omf_log.render(text, args, kwargs)
+
+    if (_print):
+      self._print(text)
+
+    self._log(text, _LEVEL_NAMES[level])
 
   def _log (self, data=None, state='info'):
 
-    with open(self.logfile, 'a') as f:
-      _log = '{0} {1}: {2}\n'.format(str(datetime.now()), state.upper(), str(data))
-      f.write(_log)
+    omf_log.sink(self.logfile).write(omf_log.line(state, data, env=self.osenv or self.host))
+
+
+_LEVEL_NAMES = {omf_log.DEBUG: 'DEBUG', omf_log.INFO: 'INFO', omf_log.WARN: 'WARN', omf_log.ERROR: 'ERROR'}
+
+
+def _lazy_client(attr):
+  '''
+  Build the property for an OMFClient service client attribute.
+  The client class is imported and authenticated the first time the attribute is read.
+  '''
+  def _get(self):
+    _theclient = self._clients.get(attr)
+    if _theclient is None:
+      with self._lock:
+        _theclient = self._clients.get(attr)
+        if _theclient is None:
+          _theclient = self._load_client(attr)
+    return _theclient
+
+  def _set(self, value):
+    self._clients[attr] = value
 
+  return property(_get, _set, doc='{0} instance, created on first use'.format(OMFClient._client_modules[attr][1]))
 
+for _attr in OMFClient._client_modules.keys():
+  setattr(OMFClient, _attr, _lazy_client(_attr))
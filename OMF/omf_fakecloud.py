@@ -0,0 +1,915 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - In-process stand-in for the openstack apis OMF uses, for performance work without a cloud
+
+  - Implements the subset of keystone v2.0/v3, nova v2, cinder v2, glance v1, heat v1,
+    neutron v2.0 and ceilometer v2 the OMF service clients call, on one http port
+
+  - Object counts, per service latency and per service error injection are configurable,
+    request counts and bytes transferred are kept per service and per operation
+
+USE EXAMPLES:
+
+  * python omf_fakecloud.py --servers 1000 --hypervisors 100 --latency nova=0.05 --errors nova=0.01
+
+    then omf-osmgr.py --osenv fakecloud --checkhostsapi  (credentials/fakecloud points at port 35357)
+
+  * in process:
+
+    from omf_fakecloud import FakeCloud
+
+    with FakeCloud(servers=1000, hypervisors=100, port=0) as cloud:
+      c = OMFClient(osenv='fakecloud', host=cloud.auth_url)
+      c.nova_client.get_instance()
+      print cloud.stats()
+
+NOTE:
+
+  Hypervisor host names are loopback addresses (127.0.0.2, 127.0.0.3, ...) so the ping
+  of --checkhosts succeeds on linux. Use down=N for hypervisors whose api state is down.
+
+  Run with http_proxy pointing at the fake cloud (and no_proxy=127.0.0.1) to serve the image
+  download of --test createimage without internet access.
+'''
+import sys, time
+import json
+import random
+import re
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import BaseHTTPServer
+import SocketServer
+import urlparse
+
+TENANT_ID = 'f0c0a1d0fa4e4d5f9a1b2c3d4e5f6a7b'
+USER_ID = '0d1e2f3a4b5c6d7e8f9a0b1c2d3e4f5a'
+
+SERVICES = [('keystone', 'identity'), ('nova', 'compute'), ('cinder', 'volumev2'), ('glance', 'image'), \
+            ('heat', 'orchestration'), ('neutron', 'network'), ('ceilo', 'metering')]
+''' OMF service name -> catalog service type '''
+
+
+def _uuid(kind, n):
+
+  return str(uuid.uuid5(uuid.NAMESPACE_DNS, '{0}-{1}.omf'.format(kind, n)))
+
+def _loopback(n):
+
+  n += 2
+  return '127.{0}.{1}.{2}'.format((n >> 16) & 255, (n >> 8) & 255, n & 255)
+
+def _now():
+
+  return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _expires():
+
+  return (datetime.utcnow() + timedelta(hours=12)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _page(items, query, key='id'):
+  '''
+  Apply marker and limit query parameters. Lists are served newest first, like the real apis.
+  '''
+  marker = query.get('marker')
+  if (marker):
+    ids = [i[key] for i in items]
+    items = items[ids.index(marker) + 1:] if marker in ids else []
+
+  if query.get('limit'):
+    items = items[:int(query['limit'])]
+
+  return items
+
+
+class FakeCloud(object):
+  '''
+  Fake openstack cloud served by a threaded http server
+  '''
+
+  def __init__(self, servers=10, hypervisors=2, volumes=10, images=5, networks=2, stacks=2, meters=5, \
+               floatingips=2, down=0, latency=None, errors=None, error_status=503, seed=0, \
+               host='127.0.0.1', port=35357):
+    '''
+    Initialize FakeCloud instance
+
+    INPUTS:
+
+      INT servers, hypervisors, volumes, images, networks, stacks, meters, floatingips - objects to start with
+
+      INT down - hypervisors reporting api state down. default 0
+
+      FLOAT or DICT latency - seconds added to each request, for all or per service (nova, cinder, ...)
+
+      FLOAT or DICT errors - share of requests failing with error_status, for all or per service
+
+      INT error_status - http status of injected errors. default 503
+
+      INT seed - random seed of the error injection, runs with the same seed fail the same requests
+
+      STRING host, INT port - listen address. port 0 picks a free port. default 127.0.0.1:35357
+
+    RETURN:
+
+      FakeCloud instance
+    '''
+    self.host = host
+    ''' listen address '''
+
+    self.port = port
+    ''' listen port, the real one after start() '''
+
+    self.latency = latency if isinstance(latency, dict) else dict([(s, latency or 0.0) for s, t in SERVICES])
+    ''' DICT service -> seconds added to each request '''
+
+    self.errors = errors if isinstance(errors, dict) else dict([(s, errors or 0.0) for s, t in SERVICES])
+    ''' DICT service -> share of requests failing '''
+
+    self.error_status = error_status
+    ''' http status of injected errors '''
+
+    self._random = random.Random(seed)
+    self._lock = threading.Lock()
+    self._server = None
+    self._thread = None
+
+    self._stats = {}
+    self._index = None
+
+    self._populate(servers, hypervisors, volumes, images, networks, stacks, meters, floatingips, down)
+
+  def __enter__(self):
+
+    self.start()
+    return self
+
+  def __exit__(self, *args):
+
+    self.stop()
+
+  ''' data '''
+
+  def _populate(self, servers, hypervisors, volumes, images, networks, stacks, meters, floatingips, down):
+
+    now = _now()
+
+    self.flavors = [{'id': str(i), 'name': 'm1.{0}'.format(n), 'ram': 512 * 2 ** i, 'vcpus': 2 ** (i - 1), 'disk': 10 * i, \
+                     'links': []} for i, n in enumerate(['tiny', 'small', 'medium', 'large', 'xlarge'], 1)]
+
+    self.hypervisors = [{'id': i + 1, 'hypervisor_hostname': _loopback(i), 'state': 'down' if i < down else 'up', \
+                         'status': 'enabled', 'hypervisor_type': 'QEMU', 'hypervisor_version': 2005000, 'vcpus': 32, \
+                         'vcpus_used': 0, 'memory_mb': 131072, 'memory_mb_used': 512, 'free_ram_mb': 130560, \
+                         'local_gb': 1024, 'local_gb_used': 0, 'free_disk_gb': 1024, 'disk_available_least': 1000, \
+                         'current_workload': 0, 'cpu_info': '{}', 'running_vms': 0, 'host_ip': _loopback(i), \
+                         'service': {'host': _loopback(i), 'id': i + 1, 'disabled_reason': None}} \
+                        for i in range(hypervisors)]
+
+    # FIRST IMAGE, NETWORK AND THE m1.medium FLAVOR ARE THE ONES templates/test_* AND --test NAME
+    self.images = [{'id': _uuid('image', i), 'name': 'image-{0}'.format(i) if i else 'CentOS7', 'status': 'active', 'size': 1024 ** 2, \
+                    'disk_format': 'qcow2', 'container_format': 'bare', 'is_public': True, 'protected': False, \
+                    'created_at': now, 'updated_at': now, 'deleted': False, 'checksum': None, 'min_disk': 0, \
+                    'min_ram': 0, 'owner': TENANT_ID, 'properties': {}} for i in range(images)]
+
+    self.networks = [{'id': _uuid('network', i), 'name': 'net-{0}'.format(i) if i else 'newnet', 'status': 'ACTIVE', \
+                      'admin_state_up': True, 'shared': False, 'subnets': [], 'tenant_id': TENANT_ID, \
+                      'router:external': i == 0} for i in range(networks)]
+
+    self.servers = []
+    for i in range(servers):
+      hv = self.hypervisors[i % len(self.hypervisors)] if self.hypervisors else None
+      self.servers.append(self._server_body(_uuid('server', i), 'server-{0}'.format(i), \
+                                            self.flavors[i % len(self.flavors)]['id'], \
+                                            self.images[i % len(self.images)]['id'] if self.images else '', \
+                                            hv['hypervisor_hostname'] if hv else None, now))
+      if (hv):
+        hv['running_vms'] += 1
+
+    self.ports = [{'id': _uuid('port', i), 'device_id': s['id'], 'network_id': self.networks[0]['id'] if self.networks else '', \
+                   'fixed_ips': [{'ip_address': '10.0.{0}.{1}'.format(i >> 8 & 255, i & 255)}], 'status': 'ACTIVE', \
+                   'tenant_id': TENANT_ID} for i, s in enumerate(self.servers)]
+
+    self.volumes = [self._volume_body(_uuid('volume', i), 'volume-{0}'.format(i), 1 + i % 10, 'available', now) \
+                    for i in range(volumes)]
+
+    self.stacks = [{'id': _uuid('stack', i), 'stack_name': 'stack-{0}'.format(i), 'stack_status': 'CREATE_COMPLETE', \
+                    'stack_status_reason': '', 'creation_time': now, 'updated_time': None, 'description': '', \
+                    'links': []} for i in range(stacks)]
+
+    self.floatingips = [{'id': _uuid('floatingip', i), 'floating_ip_address': '172.24.4.{0}'.format(i + 1), \
+                         'floating_network_id': self.networks[0]['id'] if self.networks else '', 'port_id': None, \
+                         'fixed_ip_address': None, 'status': 'DOWN', 'tenant_id': TENANT_ID, 'router_id': None} \
+                        for i in range(floatingips)]
+
+    self.meters = [{'meter_id': _uuid('meter', i), 'name': ['cpu_util', 'memory.usage', 'disk.read.bytes', \
+                    'disk.write.bytes', 'network.incoming.bytes'][i % 5], 'type': 'gauge', 'unit': '%', \
+                    'resource_id': self.servers[i % len(self.servers)]['id'] if self.servers else '', \
+                    'project_id': TENANT_ID, 'user_id': USER_ID, 'source': 'openstack'} for i in range(meters)]
+
+  def _server_body(self, _id, name, flavor, image, host, now):
+
+    return {'id': _id, 'name': name, 'status': 'ACTIVE', 'tenant_id': TENANT_ID, 'user_id': USER_ID, \
+            'flavor': {'id': flavor, 'links': []}, 'image': {'id': image, 'links': []}, 'created': now, \
+            'updated': now, 'addresses': {}, 'metadata': {}, 'links': [], 'key_name': None, \
+            'OS-EXT-SRV-ATTR:host': host, 'OS-EXT-SRV-ATTR:hypervisor_hostname': host, \
+            'OS-EXT-SRV-ATTR:instance_name': 'instance-{0}'.format(_id[:8]), \
+            'OS-EXT-STS:vm_state': 'active', 'OS-EXT-STS:task_state': None, 'OS-EXT-STS:power_state': 1, \
+            'os-extended-volumes:volumes_attached': []}
+
+  def _volume_body(self, _id, name, size, status, now):
+
+    return {'id': _id, 'name': name, 'size': size, 'status': status, 'attachments': [], \
+            'availability_zone': 'nova', 'created_at': now, 'description': None, 'volume_type': None, \
+            'snapshot_id': None, 'source_volid': None, 'metadata': {}, 'bootable': 'false', 'links': []}
+
+  ''' server '''
+
+  @property
+  def url(self):
+    ''' base url of the fake cloud '''
+    return 'http://{0}:{1}'.format(self.host, self.port)
+
+  @property
+  def auth_url(self):
+    ''' keystone v3 auth url, use as OMFClient host '''
+    return '{0}/identity/v3'.format(self.url)
+
+  def start(self):
+    '''
+    Serve in a background thread
+
+    RETURN:
+
+      STRING base url
+    '''
+    cloud = self
+
+    class _Handler(_FakeHandler):
+      fake = cloud
+
+    class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+      daemon_threads = True
+      allow_reuse_address = True
+      request_queue_size = 128
+
+    self._server = _Server((self.host, self.port), _Handler)
+    self.port = self._server.server_address[1]
+
+    self._thread = threading.Thread(target=self._server.serve_forever, name='omf-fakecloud')
+    self._thread.daemon = True
+    self._thread.start()
+
+    return self.url
+
+  def stop(self):
+
+    if (self._server):
+      self._server.shutdown()
+      self._server.server_close()
+      self._server = None
+
+  def stats(self):
+    '''
+    Requests and bytes served
+
+    RETURN:
+
+      DICT requests, bytes_in, bytes_out, errors, services {service: {...}}, operations {"service METHOD path": count}
+    '''
+    with self._lock:
+      ret = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0, 'services': {}, 'operations': {}}
+      for (service, operation), s in self._stats.items():
+        svc = ret['services'].setdefault(service, {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0})
+        for k in ['requests', 'bytes_in', 'bytes_out', 'errors']:
+          svc[k] += s[k]
+          ret[k] += s[k]
+        ret['operations']['{0} {1}'.format(service, operation)] = s['requests']
+
+    return ret
+
+  def reset_stats(self):
+
+    with self._lock:
+      self._stats = {}
+
+  def _count(self, service, operation, bytes_in, bytes_out, error):
+
+    with self._lock:
+      s = self._stats.setdefault((service, operation), {'requests': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0})
+      s['requests'] += 1
+      s['bytes_in'] += bytes_in
+      s['bytes_out'] += bytes_out
+      s['errors'] += int(error)
+
+  def _inject(self, service):
+    '''
+    RETURN:
+
+      BOOL True if this request must fail
+    '''
+    rate = self.errors.get(service) or 0.0
+    if not rate:
+      return False
+
+    with self._lock:
+      return self._random.random() < rate
+
+  ''' catalog '''
+
+  def _catalog_v2(self):
+
+    ret = []
+    for service, _type in SERVICES:
+      url = self._endpoint(_type)
+      ret.append({'type': _type, 'name': service, 'endpoints_links': [], \
+                  'endpoints': [{'region': 'RegionOne', 'id': _uuid('endpoint', _type), 'publicURL': url, \
+                                 'internalURL': url, 'adminURL': url}]})
+    return ret
+
+  def _catalog_v3(self):
+
+    ret = []
+    for service, _type in SERVICES:
+      url = self._endpoint(_type, v3=True)
+      ret.append({'type': _type, 'name': service, 'id': _uuid('service', _type), \
+                  'endpoints': [{'id': _uuid('endpoint-{0}'.format(i), _type), 'interface': i, 'region': 'RegionOne', \
+                                 'region_id': 'RegionOne', 'url': url} for i in ['public', 'internal', 'admin']]})
+    return ret
+
+  def _endpoint(self, _type, v3=False):
+
+    return {'identity': '{0}/identity/{1}'.format(self.url, 'v3' if v3 else 'v2.0'), \
+            'compute': '{0}/compute/v2/{1}'.format(self.url, TENANT_ID), \
+            'volumev2': '{0}/volume/v2/{1}'.format(self.url, TENANT_ID), \
+            'image': '{0}/image'.format(self.url), \
+            'orchestration': '{0}/orchestration/v1/{1}'.format(self.url, TENANT_ID), \
+            'network': '{0}/network'.format(self.url), \
+            'metering': '{0}/metering'.format(self.url)}[_type]
+
+  ''' keystone '''
+
+  def _version(self, v):
+
+    if v == 'v3':
+      return {'id': 'v3.4', 'status': 'stable', 'updated': '2015-03-30T00:00:00Z', \
+              'links': [{'rel': 'self', 'href': '{0}/identity/v3/'.format(self.url)}], \
+              'media-types': [{'base': 'application/json', 'type': 'application/vnd.openstack.identity-v3+json'}]}
+
+    return {'id': 'v2.0', 'status': 'stable', 'updated': '2014-04-17T00:00:00Z', \
+            'links': [{'rel': 'self', 'href': '{0}/identity/v2.0/'.format(self.url)}], \
+            'media-types': [{'base': 'application/json', 'type': 'application/vnd.openstack.identity-v2.0+json'}]}
+
+  def identity_versions(self, req):
+    return 300, {'versions': {'values': [self._version('v3'), self._version('v2.0')]}}
+
+  def identity_version(self, req, v):
+    return 200, {'version': self._version(v)}
+
+  def tokens_v2(self, req):
+
+    creds = req.json().get('auth', {})
+    token = uuid.uuid4().hex
+
+    return 200, {'access': {'token': {'id': token, 'expires': _expires(), 'issued_at': _now(), \
+                                      'tenant': {'id': TENANT_ID, 'name': creds.get('tenantName', 'omf'), 'enabled': True}}, \
+                            'serviceCatalog': self._catalog_v2(), \
+                            'user': {'id': USER_ID, 'name': creds.get('passwordCredentials', {}).get('username', 'omf'), \
+                                     'roles': [{'name': 'admin'}], 'roles_links': []}, \
+                            'metadata': {'is_admin': 0, 'roles': []}}}
+
+  def tokens_v3(self, req):
+
+    auth = req.json().get('auth', {})
+    user = auth.get('identity', {}).get('password', {}).get('user', {})
+    project = auth.get('scope', {}).get('project', {})
+
+    req.response_headers['X-Subject-Token'] = uuid.uuid4().hex
+
+    return 201, {'token': {'expires_at': _expires(), 'issued_at': _now(), 'methods': ['password'], \
+                           'user': {'id': USER_ID, 'name': user.get('name', 'omf'), \
+                                    'domain': {'id': 'default', 'name': 'Default'}}, \
+                           'project': {'id': TENANT_ID, 'name': project.get('name', 'omf'), \
+                                       'domain': {'id': 'default', 'name': 'Default'}}, \
+                           'roles': [{'id': _uuid('role', 'admin'), 'name': 'admin'}], \
+                           'catalog': self._catalog_v3()}}
+
+  def users(self, req, v):
+    return 200, {'users': [{'id': USER_ID, 'name': 'omf', 'enabled': True, 'email': None}]}
+
+  def tenants(self, req):
+    return 200, {'tenants': [{'id': TENANT_ID, 'name': 'omf', 'enabled': True, 'description': ''}]}
+
+  ''' nova '''
+
+  def flavor_list(self, req):
+    return 200, {'flavors': self.flavors}
+
+  def server_list(self, req):
+    return 200, {'servers': _page(self.servers[::-1], req.query)}
+
+  def server_get(self, req, _id):
+    for s in self.servers:
+      if s['id'] == _id:
+        return 200, {'server': s}
+    return 404, {'itemNotFound': {'code': 404, 'message': 'Instance {0} could not be found.'.format(_id)}}
+
+  def server_create(self, req):
+
+    body = req.json().get('server', {})
+    now = _now()
+    hv = self.hypervisors[len(self.servers) % len(self.hypervisors)]['hypervisor_hostname'] if self.hypervisors else None
+
+    with self._lock:
+      s = self._server_body(str(uuid.uuid4()), body.get('name'), body.get('flavorRef'), body.get('imageRef'), hv, now)
+      self.servers.append(s)
+      self._index = None
+      self.ports.append({'id': str(uuid.uuid4()), 'device_id': s['id'], 'status': 'ACTIVE', 'tenant_id': TENANT_ID, \
+                         'network_id': self.networks[0]['id'] if self.networks else '', \
+                         'fixed_ips': [{'ip_address': '10.1.{0}.{1}'.format(len(self.ports) >> 8 & 255, len(self.ports) & 255)}]})
+
+    return 202, {'server': {'id': s['id'], 'links': [], 'adminPass': 'fake'}}
+
+  def server_delete(self, req, _id):
+    with self._lock:
+      self.servers = [s for s in self.servers if s['id'] != _id]
+      self._index = None
+    return 204, None
+
+  def server_action(self, req, _id):
+    return 202, None
+
+  def volume_attach(self, req, _id):
+    body = req.json().get('volumeAttachment', {})
+    with self._lock:
+      for s in self.servers:
+        if s['id'] == _id:
+          s['os-extended-volumes:volumes_attached'].append({'id': body.get('volumeId')})
+      for v in self.volumes:
+        if v['id'] == body.get('volumeId'):
+          v['status'] = 'in-use'
+          v['attachments'] = [{'server_id': _id, 'volume_id': v['id'], 'device': body.get('device') or '/dev/vdb'}]
+    return 200, {'volumeAttachment': {'id': body.get('volumeId'), 'serverId': _id, 'volumeId': body.get('volumeId'), \
+                                      'device': body.get('device') or '/dev/vdb'}}
+
+  def _hypervisor_index(self, h):
+
+    # THE INDEX AND SEARCH VIEWS OF NOVA ONLY CARRY THESE
+    return dict([(k, h[k]) for k in ['id', 'hypervisor_hostname', 'state', 'status']])
+
+  def hypervisor_list(self, req, detail=False):
+    if (detail):
+      return 200, {'hypervisors': self.hypervisors}
+    return 200, {'hypervisors': [self._hypervisor_index(h) for h in self.hypervisors]}
+
+  def hypervisor_detail(self, req):
+    return self.hypervisor_list(req, detail=True)
+
+  def hypervisor_get(self, req, _id):
+    for h in self.hypervisors:
+      if str(h['id']) == _id:
+        return 200, {'hypervisor': h}
+    return 404, {'itemNotFound': {'code': 404, 'message': 'Hypervisor {0} could not be found.'.format(_id)}}
+
+  def _hosted(self):
+    '''
+    RETURN:
+
+      DICT hypervisor hostname -> LIST servers, kept until servers are created or deleted
+    '''
+    with self._lock:
+      if self._index is None:
+        self._index = {}
+        for s in self.servers:
+          self._index.setdefault(s['OS-EXT-SRV-ATTR:hypervisor_hostname'], []).append({'uuid': s['id'], 'name': s['name']})
+      return self._index
+
+  def hypervisor_search(self, req, match, target):
+
+    found = [h for h in self.hypervisors if match in h['hypervisor_hostname']]
+    if not found:
+      return 404, {'itemNotFound': {'code': 404, 'message': 'No hypervisor matching {0} could be found.'.format(match)}}
+
+    ret = []
+    for h in found:
+      r = self._hypervisor_index(h)
+      if target == 'servers':
+        r['servers'] = self._hosted().get(h['hypervisor_hostname'], [])
+      ret.append(r)
+
+    return 200, {'hypervisors': ret}
+
+  def nova_volume_list(self, req):
+    return 200, {'volumes': [{'id': v['id'], 'displayName': v['name'], 'size': v['size'], 'status': v['status'], \
+                              'attachments': [], 'availabilityZone': 'nova', 'createdAt': v['created_at']} \
+                             for v in self.volumes[::-1]]}
+
+  def nova_image_list(self, req):
+    return 200, {'images': [{'id': i['id'], 'name': i['name'], 'status': i['status'].upper(), 'minDisk': 0, 'minRam': 0, \
+                             'metadata': {}, 'links': []} for i in self.images[::-1]]}
+
+  def nova_network_list(self, req):
+    return 200, {'networks': [{'id': n['id'], 'label': n['name']} for n in self.networks]}
+
+  ''' cinder '''
+
+  def volume_list(self, req):
+    return 200, {'volumes': _page(self.volumes[::-1], req.query)}
+
+  def volume_get(self, req, _id):
+    for v in self.volumes:
+      if v['id'] == _id:
+        return 200, {'volume': v}
+    return 404, {'itemNotFound': {'code': 404, 'message': 'Volume {0} could not be found.'.format(_id)}}
+
+  def volume_create(self, req):
+
+    body = req.json().get('volume', {})
+    now = _now()
+
+    with self._lock:
+      v = self._volume_body(str(uuid.uuid4()), body.get('name'), body.get('size'), 'available', now)
+      v['description'] = body.get('description')
+      v['metadata'] = body.get('metadata') or {}
+      self.volumes.append(v)
+
+    # NEW VOLUMES ARE AVAILABLE RIGHT AWAY, ONLY THE CREATE RESPONSE SAYS creating
+    return 202, {'volume': dict(v, status='creating')}
+
+  def volume_delete(self, req, _id):
+    with self._lock:
+      self.volumes = [v for v in self.volumes if v['id'] != _id]
+    return 202, None
+
+  def quota_get(self, req, tenant):
+    return 200, {'quota_set': {'id': tenant, 'volumes': 1000, 'gigabytes': 100000, 'snapshots': 1000, 'backups': 100, \
+                               'backup_gigabytes': 10000, 'per_volume_gigabytes': -1, 'volumes_Standard': -1, \
+                               'gigabytes_Standard': -1, 'snapshots_Standard': -1}}
+
+  ''' glance v1 '''
+
+  def _image_headers(self, i):
+
+    headers = {}
+    for k, v in i.items():
+      if k == 'properties':
+        for pk, pv in v.items():
+          headers['x-image-meta-property-{0}'.format(pk)] = str(pv)
+      elif v is not None:
+        headers['x-image-meta-{0}'.format(k.replace('_', '-'))] = str(v)
+    return headers
+
+  def _image_meta(self, req, image):
+
+    for k, v in req.headers.items():
+      k = k.lower()
+      if k.startswith('x-image-meta-property-'):
+        image['properties'][k[len('x-image-meta-property-'):]] = v
+      elif k.startswith('x-image-meta-'):
+        image[k[len('x-image-meta-'):].replace('-', '_')] = v
+    if (req.body):
+      image['size'] = len(req.body)
+      image['status'] = 'active'
+    image['updated_at'] = _now()
+
+  def image_list(self, req):
+
+    images = self.images[::-1]
+    if req.query.get('name'):
+      images = [i for i in images if i['name'] == req.query['name']]
+    if req.query.get('status'):
+      images = [i for i in images if i['status'] == req.query['status']]
+
+    return 200, {'images': _page(images, req.query)}
+
+  def image_create(self, req):
+
+    now = _now()
+    image = {'id': str(uuid.uuid4()), 'name': None, 'status': 'queued', 'size': 0, 'disk_format': None, \
+             'container_format': None, 'is_public': False, 'protected': False, 'created_at': now, 'updated_at': now, \
+             'deleted': False, 'checksum': None, 'min_disk': 0, 'min_ram': 0, 'owner': TENANT_ID, 'properties': {}}
+    self._image_meta(req, image)
+
+    with self._lock:
+      self.images.append(image)
+
+    return 201, {'image': image}
+
+  def image_update(self, req, _id):
+    for i in self.images:
+      if i['id'] == _id:
+        self._image_meta(req, i)
+        return 200, {'image': i}
+    return 404, None
+
+  def image_head(self, req, _id):
+    for i in self.images:
+      if i['id'] == _id:
+        req.response_headers.update(self._image_headers(i))
+        return 200, None
+    return 404, None
+
+  def image_delete(self, req, _id):
+    with self._lock:
+      self.images = [i for i in self.images if i['id'] != _id]
+    return 200, None
+
+  def image_download(self, req):
+    # IMAGE URLS (glance test_image) FETCHED THROUGH THE FAKE CLOUD AS HTTP PROXY
+    return 200, 'QFI\xfb' + '\0' * 4092
+
+  ''' heat '''
+
+  def stack_list(self, req):
+    return 200, {'stacks': _page(self.stacks, req.query)}
+
+  def stack_get(self, req, name, _id=None):
+    for s in self.stacks:
+      if name in [s['id'], s['stack_name']]:
+        return 200, {'stack': dict(s, parameters={}, outputs=[], disable_rollback=True, timeout_mins=None)}
+    return 404, {'error': {'type': 'NotFound', 'message': 'The Stack ({0}) could not be found.'.format(name)}}
+
+  def stack_create(self, req):
+
+    body = req.json()
+    now = _now()
+    s = {'id': str(uuid.uuid4()), 'stack_name': body.get('stack_name'), 'stack_status': 'CREATE_COMPLETE', \
+         'stack_status_reason': '', 'creation_time': now, 'updated_time': None, 'description': '', 'links': []}
+
+    with self._lock:
+      self.stacks.append(s)
+
+    return 201, {'stack': {'id': s['id'], 'links': []}}
+
+  def stack_delete(self, req, name, _id=None):
+    with self._lock:
+      self.stacks = [s for s in self.stacks if name not in [s['id'], s['stack_name']]]
+    return 204, None
+
+  ''' neutron '''
+
+  def _filter(self, items, query):
+    for k, v in query.items():
+      if k not in ['fields', 'limit', 'marker']:
+        items = [i for i in items if str(i.get(k)) == v]
+    return items
+
+  def network_list(self, req):
+    return 200, {'networks': self._filter(self.networks, req.query)}
+
+  def port_list(self, req):
+    return 200, {'ports': self._filter(self.ports, req.query)}
+
+  def floatingip_list(self, req):
+    return 200, {'floatingips': self._filter(self.floatingips, req.query)}
+
+  def floatingip_create(self, req):
+
+    body = req.json().get('floatingip', {})
+
+    with self._lock:
+      n = len(self.floatingips)
+      f = {'id': str(uuid.uuid4()), 'floating_ip_address': '172.24.{0}.{1}'.format(4 + (n + 1) / 250, (n + 1) % 250 + 1), \
+           'floating_network_id': body.get('floating_network_id'), 'port_id': body.get('port_id'), \
+           'fixed_ip_address': None, 'status': 'ACTIVE', 'tenant_id': TENANT_ID, 'router_id': None}
+      self.floatingips.append(f)
+
+    return 201, {'floatingip': f}
+
+  def floatingip_delete(self, req, _id):
+    with self._lock:
+      self.floatingips = [f for f in self.floatingips if f['id'] != _id]
+    return 204, None
+
+  ''' ceilometer '''
+
+  def meter_list(self, req):
+    return 200, self.meters
+
+  def sample_list(self, req):
+
+    limit = int(req.query.get('limit') or 100)
+    samples = []
+    for i, m in enumerate(self.meters[:limit]):
+      samples.append({'id': _uuid('sample', i), 'meter': m['name'], 'type': m['type'], 'unit': m['unit'], \
+                      'volume': float(i % 100), 'resource_id': m['resource_id'], 'project_id': TENANT_ID, \
+                      'user_id': USER_ID, 'source': 'openstack', 'metadata': {}, \
+                      'timestamp': datetime.utcnow().isoformat(), 'recorded_at': datetime.utcnow().isoformat()})
+    return 200, samples
+
+  def statistics(self, req, meter):
+    return 200, [{'avg': 1.0, 'count': 1, 'duration': 0.0, 'max': 1.0, 'min': 1.0, 'sum': 1.0, 'period': 0, \
+                  'unit': '%', 'period_start': None, 'period_end': None, 'duration_start': None, 'duration_end': None}]
+
+  ''' routing '''
+
+  ROUTES = [
+    ('keystone', 'GET', r'/identity$', 'identity_versions'),
+    ('keystone', 'GET', r'/identity/(v2\.0|v3)$', 'identity_version'),
+    ('keystone', 'POST', r'/identity/v2\.0/tokens$', 'tokens_v2'),
+    ('keystone', 'POST', r'/identity/v3/auth/tokens$', 'tokens_v3'),
+    ('keystone', 'GET', r'/identity/(v2\.0|v3)/users$', 'users'),
+    ('keystone', 'GET', r'/identity/v2\.0/tenants$', 'tenants'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/flavors(?:/detail)?$', 'flavor_list'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/servers(?:/detail)?$', 'server_list'),
+    ('nova', 'POST', r'/compute/v2/[^/]+/servers$', 'server_create'),
+    ('nova', 'POST', r'/compute/v2/[^/]+/servers/([^/]+)/action$', 'server_action'),
+    ('nova', 'POST', r'/compute/v2/[^/]+/servers/([^/]+)/os-volume_attachments$', 'volume_attach'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/servers/([^/]+)$', 'server_get'),
+    ('nova', 'DELETE', r'/compute/v2/[^/]+/servers/([^/]+)$', 'server_delete'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-hypervisors$', 'hypervisor_list'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-hypervisors/detail$', 'hypervisor_detail'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-hypervisors/([^/]+)/(search|servers)$', 'hypervisor_search'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-hypervisors/([^/]+)$', 'hypervisor_get'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-volumes(?:/detail)?$', 'nova_volume_list'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/images(?:/detail)?$', 'nova_image_list'),
+    ('nova', 'DELETE', r'/compute/v2/[^/]+/images/([^/]+)$', 'image_delete'),
+    ('nova', 'GET', r'/compute/v2/[^/]+/os-networks$', 'nova_network_list'),
+    ('cinder', 'GET', r'/volume/v2/[^/]+/volumes(?:/detail)?$', 'volume_list'),
+    ('cinder', 'POST', r'/volume/v2/[^/]+/volumes$', 'volume_create'),
+    ('cinder', 'GET', r'/volume/v2/[^/]+/volumes/([^/]+)$', 'volume_get'),
+    ('cinder', 'DELETE', r'/volume/v2/[^/]+/volumes/([^/]+)$', 'volume_delete'),
+    ('cinder', 'GET', r'/volume/v2/[^/]+/os-quota-sets/([^/]+)$', 'quota_get'),
+    ('glance', 'GET', r'/image/v1/images(?:/detail)?$', 'image_list'),
+    ('glance', 'POST', r'/image/v1/images$', 'image_create'),
+    ('glance', 'PUT', r'/image/v1/images/([^/]+)$', 'image_update'),
+    ('glance', 'HEAD', r'/image/v1/images/([^/]+)$', 'image_head'),
+    ('glance', 'DELETE', r'/image/v1/images/([^/]+)$', 'image_delete'),
+    ('heat', 'GET', r'/orchestration/v1/[^/]+/stacks$', 'stack_list'),
+    ('heat', 'POST', r'/orchestration/v1/[^/]+/stacks$', 'stack_create'),
+    ('heat', 'GET', r'/orchestration/v1/[^/]+/stacks/([^/]+)(?:/([^/]+))?$', 'stack_get'),
+    ('heat', 'DELETE', r'/orchestration/v1/[^/]+/stacks/([^/]+)(?:/([^/]+))?$', 'stack_delete'),
+    ('neutron', 'GET', r'/network/v2\.0/networks(?:\.json)?$', 'network_list'),
+    ('neutron', 'GET', r'/network/v2\.0/ports(?:\.json)?$', 'port_list'),
+    ('neutron', 'GET', r'/network/v2\.0/floatingips(?:\.json)?$', 'floatingip_list'),
+    ('neutron', 'POST', r'/network/v2\.0/floatingips(?:\.json)?$', 'floatingip_create'),
+    ('neutron', 'DELETE', r'/network/v2\.0/floatingips/([^/.]+)(?:\.json)?$', 'floatingip_delete'),
+    ('ceilo', 'GET', r'/metering/v2/meters$', 'meter_list'),
+    ('ceilo', 'GET', r'/metering/v2/samples$', 'sample_list'),
+    ('ceilo', 'GET', r'/metering/v2/meters/([^/]+)/statistics$', 'statistics'),
+    ('download', 'GET', r'/.+\.(?:img|qcow2|raw|iso)$', 'image_download'),
+  ]
+  ''' (service, http method, path regex, handler method) '''
+
+  def route(self, method, path):
+    '''
+    RETURN:
+
+      TUPLE (service, operation, handler method, path arguments), None if nothing matches
+    '''
+    for service, _method, pattern, name in self.ROUTES:
+      if _method != method:
+        continue
+      m = re.match(pattern, path)
+      if (m):
+        return service, '{0} {1}'.format(method, name), getattr(self, name), [g for g in m.groups() if g is not None]
+
+    return None
+
+
+class _FakeRequest(object):
+
+  def __init__(self, handler, body):
+
+    url = urlparse.urlsplit(handler.path)
+
+    self.path = url.path
+    self.query = dict(urlparse.parse_qsl(url.query, keep_blank_values=True))
+    self.headers = handler.headers
+    self.body = body
+    self.response_headers = {}
+
+  def json(self):
+
+    try:
+      return json.loads(self.body) if self.body else {}
+    except ValueError:
+      return {}
+
+
+class _FakeHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+  fake = None
+  protocol_version = 'HTTP/1.1'
+
+  def log_message(self, *args):
+    pass
+
+  def _handle(self):
+
+    if 'chunked' in (self.headers.getheader('transfer-encoding') or ''):
+      body = self._read_chunked()
+    else:
+      length = int(self.headers.getheader('content-length') or 0)
+      body = self.rfile.read(length) if length else ''
+
+    req = _FakeRequest(self, body)
+
+    route = self.fake.route(self.command, req.path.rstrip('/'))
+
+    if route is None:
+      self._reply(404, {'error': {'message': 'omf fakecloud has no {0} {1}'.format(self.command, req.path)}}, req)
+      return
+
+    service, operation, handler, groups = route
+
+    if self.fake.latency.get(service):
+      time.sleep(self.fake.latency[service])
+
+    if self.fake._inject(service):
+      status, data = self.fake.error_status, {'error': {'code': self.fake.error_status, \
+                                                        'message': 'omf fakecloud injected error', 'title': 'Injected'}}
+    else:
+      try:
+        status, data = handler(req, *groups)
+      except Exception as e:
+        status, data = 500, {'error': {'code': 500, 'message': '{0}: {1}'.format(type(e).__name__, e)}}
+
+    sent = self._reply(status, data, req)
+
+    self.fake._count(service, operation, len(body), sent, status >= 400)
+
+  def _read_chunked(self):
+
+    # GLANCE IMAGE DATA IS UPLOADED WITH CHUNKED TRANSFER ENCODING
+    chunks = []
+    while True:
+      size = int(self.rfile.readline().split(';')[0].strip() or 0, 16)
+      if not size:
+        while self.rfile.readline().strip():
+          pass
+        break
+      chunks.append(self.rfile.read(size))
+      self.rfile.readline()
+
+    return ''.join(chunks)
+
+  def _reply(self, status, data, req):
+
+    raw = isinstance(data, str)
+    payload = data if raw else json.dumps(data) if data is not None else ''
+
+    self.send_response(status)
+    if payload or status >= 400:
+      self.send_header('Content-Type', 'application/octet-stream' if raw else 'application/json')
+    else:
+      # CLIENTS PARSE ANY application/json RESPONSE, EVEN AN EMPTY ONE (glance HEAD)
+      self.send_header('Content-Type', 'text/plain; charset=UTF-8')
+    self.send_header('Content-Length', str(len(payload) if self.command != 'HEAD' else 0))
+    for k, v in req.response_headers.items():
+      self.send_header(k, v)
+    self.end_headers()
+
+    if self.command != 'HEAD':
+      self.wfile.write(payload)
+
+    return len(payload)
+
+  do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_PATCH = _handle
+
+
+def _per_service(value, _type=float):
+  '''
+  Parse a value for all services (0.05) or per service (nova=0.05,cinder=0.02)
+  '''
+  if value is None:
+    return None
+
+  if '=' not in value:
+    return _type(value)
+
+  return dict([(k.strip(), _type(v)) for k, v in [kv.split('=', 1) for kv in value.split(',')]])
+
+
+if __name__ == '__main__':
+
+  import argparse
+
+  parser = argparse.ArgumentParser(description='Fake openstack cloud for OMF performance work.')
+  parser.add_argument('--host', default='127.0.0.1', help='Listen address. default=127.0.0.1')
+  parser.add_argument('--port', type=int, default=35357, help='Listen port, credentials/fakecloud uses 35357. default=35357')
+  for name, default in [('servers', 10), ('hypervisors', 2), ('volumes', 10), ('images', 5), ('networks', 2), \
+                        ('stacks', 2), ('meters', 5), ('floatingips', 2), ('down', 0)]:
+    parser.add_argument('--{0}'.format(name), type=int, default=default, help='default={0}'.format(default))
+  parser.add_argument('--latency', default=None, help='Seconds added to each request, 0.05 or nova=0.05,cinder=0.02')
+  parser.add_argument('--errors', default=None, help='Share of requests failing, 0.01 or nova=0.01')
+  parser.add_argument('--error-status', type=int, default=503, help='Http status of injected errors. default=503')
+  parser.add_argument('--seed', type=int, default=0, help='Error injection random seed. default=0')
+  args = parser.parse_args()
+
+  cloud = FakeCloud(servers=args.servers, hypervisors=args.hypervisors, volumes=args.volumes, images=args.images, \
+                    networks=args.networks, stacks=args.stacks, meters=args.meters, floatingips=args.floatingips, \
+                    down=args.down, latency=_per_service(args.latency), errors=_per_service(args.errors), \
+                    error_status=args.error_status, seed=args.seed, host=args.host, port=args.port)
+
+  print 'omf fakecloud on {0}, auth url {1}'.format(cloud.start(), cloud.auth_url)
+  sys.stdout.flush()
+
+  try:
+    while True:
+      time.sleep(3600)
+  except KeyboardInterrupt:
+    cloud.stop()
+    print json.dumps(cloud.stats(), indent=2, sort_keys=True)
@@ -11,7 +11,7 @@ Description:
 import os, sys, traceback
 from sets import Set
 import omfbase as omfbase
-import time
+import omf_trace
 from datetime import datetime, timedelta
 from collections import defaultdict
 from collections import namedtuple
@@ -58,7 +58,6 @@ class GlanceClient (object):
     try:
       from glanceclient import Client
       import glanceclient
-      import keystoneclient
     except:
       raise omfbase.OMFImport(1808)
 
@@ -67,24 +66,19 @@ class GlanceClient (object):
    
     try:
 
-      _user, _password, _project = _class.init_client_meta(_class, kwargs)
-
-      ks = _class.keystone_client.client
-      glance_endpoint = ks.service_catalog.url_for(service_type='image',
-                                                   endpoint_type='publicURL')
+      sess = _class.get_session(kwargs)
+      glance_endpoint = _class.endpoints.url_for('image') if sess is _class.session else \
+                        sess.get_endpoint(service_type='image', interface='public')
 
       # TODO: v2 glance client doesn't work to create image and get it to Active. It stays queued.
 
-      glance = Client('1', endpoint=glance_endpoint, token=ks.auth_token)
+      glance = Client('1', endpoint=glance_endpoint, session=sess)
 
-      self.client = glance
+      self.client = _class.instrument('glance', glance)
 
       if not isinstance(glance, glanceclient.v1.client.Client):
         _class.log_and_exit('Initialize Glance client failed', 1800)
 
-      if not isinstance(ks, keystoneclient.v2_0.client.Client ):
-        _class.log_and_exit('Required Keystone client v2 invalid', 1800) 
-
     except Exception as e:
       self._class.log_and_exit(e, 1800)
 
@@ -122,8 +116,7 @@ class GlanceClient (object):
     result = False
 
     try: 
-      if self.debug:
-        self.parent.log_and_print_info('Getting images list for iteration')
+      self.parent.log_and_print_debug('Getting images list for iteration')
 
       i = self.client.images.list()
       while True:
@@ -151,8 +144,7 @@ class GlanceClient (object):
     newimage = None
     done = False
 
-    if self.debug:
-      self.parent.log_and_print_info('Attempting to create image {0}'.format(self.image_name))
+    self.parent.log_and_print_debug('Attempting to create image {0}', self.image_name)
 
     try:
       image = self.client.images.create(name=self.image_name, \
@@ -249,7 +241,7 @@ class GlanceClient (object):
         try:
           remote_file = urllib.urlopen(url)
         except Exception as e:
-          self.parent.log_and_print_error('Failed to open url {0}'.format(url))
+          self.parent.log_and_print_error('Failed to open url {0}', url)
 
         _data = remote_file.read()
       if (file):
@@ -283,27 +275,28 @@ class GlanceClient (object):
     while (waiting):
       waiting = False
 
-      theimages = None
+      with omf_trace.span('wait_image', name, cat='wait'):
+        theimages = None
 
-      try:
-        theimages = self.parent.nova_client.client.images.list()
-      except Exception as e:
-        self.parent.log_and_exit(e, 1615)
-
-      if (theimages):
-        for i in theimages:
-          if i.human_id.lower() == name.lower() and i.status.lower() == 'active':
-            self.parent.log_and_print_info('New Image {0} is ready.'.format(i.human_id))
-            self.parent.log_and_print_info('Create New Image took: {0}'.format(datetime.now() - _start))
-            newimage = i
-            break
-          else:
-            waiting = True
-        sys.stdout.write('. ')
-        sys.stdout.flush()
-        time.sleep(1)
-      else:
-        self.log_and_exit('Failed to images.list()', 1615)
+        try:
+          theimages = self.parent.nova_client.client.images.list()
+        except Exception as e:
+          self.parent.log_and_exit(e, 1615)
+
+        if (theimages):
+          for i in theimages:
+            if i.human_id.lower() == name.lower() and i.status.lower() == 'active':
+              self.parent.log_and_print_info('New Image {0} is ready.', i.human_id)
+              self.parent.log_and_print_info('Create New Image took: {0}', datetime.now() - _start)
+              newimage = i
+              break
+            else:
+              waiting = True
+          sys.stdout.write('. ')
+          sys.stdout.flush()
+          omf_trace.sleep(1)
+        else:
+          self.log_and_exit('Failed to images.list()', 1615)
 
     sys.stdout.write('\n')
 
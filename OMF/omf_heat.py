@@ -12,7 +12,7 @@ Description:
 import os, sys, traceback, inspect
 from sets import Set
 import omfbase as omfbase
-import time
+import omf_trace
 from datetime import datetime, timedelta
 from collections import defaultdict
 from collections import namedtuple
@@ -75,15 +75,16 @@ class HeatClient (object):
 
       self.project = _project
 
-      ksc = _class.keystone_client.client
-      heat_endpoint = ksc.service_catalog.url_for(service_type='orchestration', endpoint_type='publicURL')
+      sess = _class.get_session(kwargs)
+      heat_endpoint = _class.endpoints.url_for('orchestration') if sess is _class.session else \
+                      sess.get_endpoint(service_type='orchestration', interface='public')
 
-      self.client = Client('1', heat_endpoint, token=ksc.auth_token)  
+      self.client = _class.instrument('heat', Client('1', heat_endpoint, session=sess))
 
       if not isinstance(self.client, heatclient.v1.client.Client):
         _class.log_and_exit('Initialize Heat client failed', 1900)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(self.client)))
+      _class.log_debug('Created new {0}: {1}', __name__, type(self.client))
 
     except Exception as e:
       self.parent.log_and_exit(e, 1900)
@@ -108,13 +109,13 @@ class HeatClient (object):
 
     try:
       while True and (_stacks):
-        self.parent.log_info('{0}'.format(_stacks.next()))
+        self.parent.log_debug('{0}', _stacks.next())
         stack_count+=1
     except StopIteration as e:
       if (self.debug):
-        self.parent.log_and_print_info('iterating stacks, found {0}'.format(stack_count))
+        self.parent.log_and_print_info('iterating stacks, found {0}', stack_count)
       else:
-        self.parent.log_info('iterating stacks, found {0}'.format(stack_count))
+        self.parent.log_info('iterating stacks, found {0}', stack_count)
 
     if (self._name_filter):
       for s in slist:
@@ -225,8 +226,9 @@ class HeatClient (object):
     self.stackname = name 
     self.stackdata = stack
 
-    runningtime, newstack = omfbase.trace(self._create_stack)
-    self.parent.log_and_print_info('Create Stack took: {0}'.format(runningtime))
+    with omf_trace.span('create_stack') as _span:
+      newstack = self._create_stack()
+    self.parent.log_took('Create Stack took: {0}', _span.duration)
 
     # WAIT FOR READINESS
     waiting = True
@@ -239,16 +241,17 @@ class HeatClient (object):
     while (waiting):
       waiting = False
       try:
-        count, stack_gen, stack_list = self._stacks()
-        if (count): #at least 1 stack
-          if (not stack_list[0].stack_status.upper() == 'CREATE_COMPLETE'):
-            waiting = True
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            time.sleep(self.wait_time)
-          else:
-            self.parent.log_and_print_info('New STACK {0} is ready.'.format(stack_list[0].stack_name))
-            self.parent.log_and_print_info('Verify STACK took: {0}'.format(datetime.now() - _start))
+        with omf_trace.span('wait_stack', self._name_filter, cat='wait'):
+          count, stack_gen, stack_list = self._stacks()
+          if (count): #at least 1 stack
+            if (not stack_list[0].stack_status.upper() == 'CREATE_COMPLETE'):
+              waiting = True
+              sys.stdout.write('. ')
+              sys.stdout.flush()
+              omf_trace.sleep(self.wait_time)
+            else:
+              self.parent.log_and_print_info('New STACK {0} is ready.', stack_list[0].stack_name)
+              self.parent.log_and_print_info('Verify STACK took: {0}', datetime.now() - _start)
       except Exception as e:
         self.parent.log_and_exit(e, 1904)    
 
@@ -25,7 +25,8 @@ class KeystoneClient (object):
     ''' 
     Initialize KeystoneClient instance
 
-    Creates a V2 and V3 authentication object
+    Creates the native client for the requested version on the session shared through OMFClient.
+    The other version is created only if .v2 or .v3 is used.
 
     INPUTS:
    
@@ -54,60 +55,94 @@ class KeystoneClient (object):
     self.debug = self.parent.debug
     ''' BOOL set debug level based on parent '''
 
+    self.version = 2
+    ''' INT keystone api version of self.client, 2 (default) or 3 '''
+
+    for k,v in kwargs.items():
+      if 'version' in k:
+        if v in [2, 3]:
+          self.version = v
+
     try:
-      from keystoneclient.auth.identity import v3
       import keystoneclient
-      from keystoneclient.v2_0 import client
     except:
       raise omfbase.OMFImport(2202)
 
     self.keystoneclient = keystoneclient
     '''set passthru to native openstack keystone modeule for methods not in Client()'''
 
+    self._versions = {}
+    ''' DICT native clients created so far, keyed on api version '''
+
     try:
 
       _user, _password, _project = _class.init_client_meta(_class, kwargs)
 
       self.project = _project
 
-      # create v2 client
-      _v2 = client.Client(username=_user, password=_password, tenant_name=_project, auth_url=_class.host)
+      self._session = _class.get_session(kwargs)
 
-      if not isinstance(_v2, keystoneclient.v2_0.client.Client):
-        _class.log_and_exit('Initialize Keystone v2 client failed', 700)
+    except Exception as e:
+      _class.log_and_exit(e, 2200)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(_v2)))
+    # ONLY THE REQUESTED VERSION IS CREATED NOW, THE OTHER ONE ON FIRST USE OF .v2 OR .v3
+    self.client
 
-      # create v3 client
-      auth = v3.Password(auth_url = _class.host,
-                         username = _user,
-                         password = _password,
-                         project_id = _project)
+  @property
+  def client(self):
+    '''
+    Native keystone client for the requested api version
+    '''
+    return self.v3 if self.version == 3 else self.v2
 
-      sess = keystoneclient.session.Session(auth=auth)
+  @property
+  def v2(self):
+    '''
+    Native keystone v2.0 client, created on first use
+    '''
+    if not 2 in self._versions:
+      self._versions[2] = self._create(2)
 
-      _v3 = keystoneclient.v3.client.Client(session=sess, version=(2,))
+    return self._versions[2]
 
-      if not isinstance(_v3, keystoneclient.v3.client.Client):
-        _class.log_and_exit('Initialize Keystone v3 client failed', 2200)
+  @property
+  def v3(self):
+    '''
+    Native keystone v3 client, created on first use
+    '''
+    if not 3 in self._versions:
+      self._versions[3] = self._create(3)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(_v3)))
+    return self._versions[3]
 
-      self.client = _v2  #for default set to _v2, then parse incoming args 
+  ''' private methods '''
 
-      for k,v in kwargs.items():
-        if 'version' in k:
-          if v == 2:
-            self.client = _v2
-          elif v == 3:
-            self.client = _v3
-          else:
-            None
+  def _create(self, version):
+
+    obj = None
+
+    try:
+      if version == 3:
+        from keystoneclient.v3 import client
+      else:
+        from keystoneclient.v2_0 import client
+    except:
+      self.parent.log_and_exit('Failed to load keystone v{0} client module'.format(version), 2202)
+
+    try:
+      obj = client.Client(session=self._session)
+
+      if not isinstance(obj, client.Client):
+        self.parent.log_and_exit('Initialize Keystone v{0} client failed'.format(version), 2200)
+
+      self.parent.log_debug('Created new {0}: {1}', __name__, type(obj))
+
+      obj = self.parent.instrument('keystone', obj)
 
     except Exception as e:
-      _class.log_and_exit(e, 2200)
+      self.parent.log_and_exit(e, 2200)
 
-  ''' private methods '''
+    return obj
 
 
   ''' public methods '''
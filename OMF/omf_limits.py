@@ -0,0 +1,151 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Client side rate limiting of the openstack api calls of an OMFClient
+
+  - A token bucket (calls per second with a burst) and a maximum of calls in flight
+    for each service endpoint, so parallel OMF use does not get throttled (http 429/503)
+    by the nova, neutron, ... api nodes
+
+  - Configured per environment in the credentials file, see credentials/ABOUT
+
+NOTE:
+
+  The limits apply to the calls of one OMF process. Parallel cron jobs each get their own budget.
+'''
+import time
+import threading
+
+import omf_trace
+
+
+class TokenBucket(object):
+  '''
+  Token bucket refilled with rate tokens per second up to burst tokens.
+  Callers are served in the order they asked, each one waits for its own token.
+  '''
+
+  def __init__(self, rate, burst=None):
+    '''
+    Initialize TokenBucket instance
+
+    INPUTS:
+
+      FLOAT rate - calls per second
+
+      INT burst - calls allowed back to back after an idle period. default rate (at least 1)
+
+    RETURN:
+
+      TokenBucket instance
+    '''
+    self.rate = float(rate)
+    ''' tokens added per second '''
+
+    self.capacity = float(burst or max(1, int(rate)))
+    ''' maximum tokens '''
+
+    self.tokens = self.capacity
+    ''' tokens available, negative when callers are waiting '''
+
+    self._last = time.time()
+    self._lock = threading.Lock()
+
+  def acquire(self):
+    '''
+    Take one token, sleeping until it is available
+
+    RETURN:
+
+      FLOAT seconds waited
+    '''
+    with self._lock:
+      now = time.time()
+      self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+      self._last = now
+
+      # RESERVE THE TOKEN NOW, LATER CALLERS QUEUE BEHIND IT
+      self.tokens -= 1
+      wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    if (wait):
+      omf_trace.sleep(wait, 'rate_limit_wait')
+
+    return wait
+
+
+class Limiter(object):
+  '''
+  Rate limit and in-flight limit of one service endpoint
+  '''
+
+  def __init__(self, rate_limit=None, rate_burst=None, max_inflight=None):
+    '''
+    Initialize Limiter instance
+
+    INPUTS:
+
+      FLOAT rate_limit - calls per second. default None (no rate limit)
+
+      INT rate_burst - token bucket size. default rate_limit
+
+      INT max_inflight - calls running at the same time. default None (no limit)
+
+    RETURN:
+
+      Limiter instance
+    '''
+    self.bucket = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+    ''' TokenBucket, None without rate limit '''
+
+    self.inflight = threading.BoundedSemaphore(max_inflight) if max_inflight else None
+    ''' Semaphore, None without in-flight limit '''
+
+  def acquire(self):
+    '''
+    Wait for a rate token and then an in-flight slot. Must be followed by release().
+
+    RETURN:
+
+      FLOAT seconds waited
+    '''
+    t1 = time.time()
+
+    # TOKEN FIRST, A CALL WAITING FOR IT'S TOKEN DOES NOT HOLD A SLOT OTHER CALLS COULD RUN IN
+    if (self.bucket):
+      self.bucket.acquire()
+
+    if (self.inflight):
+      self.inflight.acquire()
+
+    return time.time() - t1
+
+  def release(self):
+
+    if (self.inflight):
+      self.inflight.release()
+
+
+def new_limiter(limits, service):
+  '''
+  Build the limiter of a service from the credentials limits
+
+  INPUTS:
+
+    DICT limits - service or default -> DICT rate_limit, rate_burst, max_inflight (omfbase.credentials.limits)
+
+    STRING service - nova | cinder | glance | heat | neutron | ceilo | keystone
+
+  RETURN:
+
+    Limiter instance, None if the service is not limited
+  '''
+  cfg = dict(limits.get('default', {}))
+  cfg.update(limits.get(service, {}))
+
+  if not (cfg.get('rate_limit') or cfg.get('max_inflight')):
+    return None
+
+  return Limiter(**cfg)
@@ -0,0 +1,377 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Buffered log files for OMFClient.log and OMFOpenStack.log
+
+  - Log lines are queued in memory and appended by a background writer thread in batches,
+    instead of opening, appending and closing the file for every message
+
+  - One sink per log file is shared by every OMFClient of the process and is safe to use
+    from parallel workers. Sinks are flushed at exit, and by log_and_exit before the process exits
+
+  - Log levels DEBUG < INFO < WARN < ERROR. Messages below the level are dropped before they
+    are formatted, pass the arguments instead of a formatted string:
+
+    os_client.log_debug('Checking status of host {0}', h.hypervisor_hostname)
+
+  - With log_format json every line is one json object (see line() and event()), so log shippers
+    and ad-hoc analysis can stream the logs instead of grepping for "query took":
+
+    {"ts": "2016-05-02T17:04:11.204331Z", "level": "INFO", "env": "sandbox", "pid": 4211,
+     "service": "nova", "operation": "servers.list", "duration": 0.183, "count": 212, "status": "ok"}
+
+  - Log files are rotated at MAX_BYTES. The rotated segments are gzip compressed and the newest
+    BACKUPS of them are kept: OMFClient.log.1.gz (newest) ... OMFClient.log.5.gz (oldest)
+
+NOTE:
+
+  A forked child (i.e. the glance image upload process) writes its lines straight through,
+  multiprocessing children end with os._exit and would never flush a buffer.
+'''
+import os, sys
+import atexit
+import threading
+import json
+import gzip
+import shutil
+from datetime import datetime
+
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARN': WARN, 'WARNING': WARN, 'ERROR': ERROR}
+''' level name -> level '''
+
+level = INFO
+''' process default level, set by omf-osmgr.py from --debug and --quiet '''
+
+FORMATS = ['text', 'json']
+
+log_format = 'text'
+''' text | json, set by omf-osmgr.py from --log-format '''
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+DEFAULT_BACKUPS = 5
+
+MAX_BYTES = DEFAULT_MAX_BYTES
+''' size in bytes a log file is rotated at, 0 never rotates. set by omf-osmgr.py from --log-max-bytes '''
+
+BACKUPS = DEFAULT_BACKUPS
+''' compressed segments kept of a rotated log file. set by omf-osmgr.py from --log-backups '''
+
+FLUSH_INTERVAL = 0.5
+''' seconds between two batches of the writer thread '''
+
+MAX_BUFFERED = 1000
+''' lines queued before the writer thread is woken up early '''
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+class LogSink(object):
+  '''
+  Log file appended to in batches by a background writer thread
+  '''
+
+  def __init__(self, path, flush_interval=FLUSH_INTERVAL, max_buffered=MAX_BUFFERED):
+    '''
+    Initialize LogSink instance
+
+    INPUTS:
+
+      STRING path - log file
+
+      FLOAT flush_interval - seconds between two batches. default 0.5
+
+      INT max_buffered - lines queued before a batch is written early. default 1000
+
+    RETURN:
+
+      LogSink instance
+    '''
+    self.path = path
+    ''' log file '''
+
+    self.flush_interval = flush_interval
+    ''' seconds between two batches '''
+
+    self.max_buffered = max_buffered
+    ''' lines queued before an early batch '''
+
+    self._pid = os.getpid()
+    self._buffer = []
+    self._lock = threading.Lock()
+    self._write_lock = threading.Lock()
+    self._wakeup = threading.Event()
+    self._thread = None
+    self._through = False
+
+  def _forked(self):
+
+    # THE PARENT OWNS (AND FLUSHES) THE LINES BUFFERED BEFORE THE FORK, LOCKS MAY HAVE BEEN HELD BY IT'S THREADS
+    self._pid = os.getpid()
+    self._buffer = []
+    self._lock = threading.Lock()
+    self._write_lock = threading.Lock()
+    self._through = True
+
+  def _start(self):
+
+    self._thread = threading.Thread(target=self._run, name='omf-log-{0}'.format(os.path.basename(self.path)))
+    self._thread.daemon = True
+    self._thread.start()
+
+  def _run(self):
+
+    while True:
+      self._wakeup.wait(self.flush_interval)
+      self._wakeup.clear()
+      try:
+        self.flush()
+      except Exception:
+        pass
+
+  def write(self, line):
+    '''
+    Queue one log line
+
+    INPUT:
+
+      STRING line - complete line, including the newline
+
+    RETURN: none
+    '''
+    if self._pid != os.getpid():
+      self._forked()
+
+    if (self._through):
+      with self._write_lock:
+        self._append([line])
+      return
+
+    with self._lock:
+      self._buffer.append(line)
+      queued = len(self._buffer)
+      if self._thread is None:
+        self._start()
+
+    if queued >= self.max_buffered:
+      self._wakeup.set()
+
+  def flush(self):
+    '''
+    Append the queued lines to the log file
+
+    RETURN: none
+    '''
+    if self._pid != os.getpid() or self._through:
+      return
+
+    with self._write_lock:
+      with self._lock:
+        lines, self._buffer = self._buffer, []
+
+      if (lines):
+        self._append(lines)
+
+  def _append(self, lines):
+
+    # ONE write PER BATCH, O_APPEND KEEPS LINES OF PARALLEL PROCESSES WHOLE
+    with open(self.path, 'a') as f:
+      f.write(''.join(lines))
+      size = f.tell()
+
+    if (MAX_BYTES) and size >= MAX_BYTES:
+      self._rotate()
+
+  def _rotate(self):
+
+    # RENAME FIRST, WRITERS OF OTHER PROCESSES START A NEW FILE WHILE THE SEGMENT IS COMPRESSED
+    segment = '{0}.{1}'.format(self.path, os.getpid())
+    try:
+      os.rename(self.path, segment)
+    except OSError:
+      # ANOTHER PROCESS ROTATED IT
+      return
+
+    if not BACKUPS:
+      os.remove(segment)
+      return
+
+    i = BACKUPS + 1
+    while os.path.exists('{0}.{1}.gz'.format(self.path, i)):
+      os.remove('{0}.{1}.gz'.format(self.path, i))
+      i += 1
+
+    for i in range(BACKUPS - 1, 0, -1):
+      if os.path.exists('{0}.{1}.gz'.format(self.path, i)):
+        os.rename('{0}.{1}.gz'.format(self.path, i), '{0}.{1}.gz'.format(self.path, i + 1))
+
+    with open(segment, 'rb') as f_in:
+      with gzip.open('{0}.gz'.format(segment), 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+
+    os.rename('{0}.gz'.format(segment), '{0}.1.gz'.format(self.path))
+    os.remove(segment)
+
+
+def configure(fmt=None, max_bytes=None, backups=None):
+  '''
+  Set the log format and rotation of the process, None keeps the current value
+
+  INPUTS:
+
+    STRING fmt - text | json
+
+    INT max_bytes - size a log file is rotated at, 0 never rotates
+
+    INT backups - compressed segments kept
+
+  RETURN: none
+  '''
+  global log_format, MAX_BYTES, BACKUPS
+
+  if fmt is not None:
+    if not fmt in FORMATS:
+      raise ValueError('Unknown log format {0}, one of {1}'.format(fmt, ', '.join(FORMATS)))
+    log_format = fmt
+
+  if max_bytes is not None:
+    MAX_BYTES = max(0, int(max_bytes))
+
+  if backups is not None:
+    BACKUPS = max(0, int(backups))
+
+
+def line(state, message, **fields):
+  '''
+  Log line of a message in the process log format
+
+  INPUTS:
+
+    STRING state - DEBUG | INFO | WARN | ERROR
+
+    STRING message - formatted message
+
+    fields - added to json records, i.e. env='sandbox'. None values are left out
+
+  RETURN:
+
+    STRING line, including the newline
+  '''
+  if log_format != 'json':
+    return '{0} {1}: {2}\n'.format(str(datetime.now()), str(state).upper(), str(message))
+
+  fields['message'] = str(message)
+  return _record(state, fields)
+
+
+def event(state, operation, **fields):
+  '''
+  Json log line of a timed operation, i.e. one openstack api call or one omf-osmgr run
+
+  INPUTS:
+
+    STRING state - DEBUG | INFO | WARN | ERROR
+
+    STRING operation - i.e. servers.list or checkhosts
+
+    fields - service, duration (seconds), count (objects returned), status, exit_code, env ... None values are left out
+
+  RETURN:
+
+    STRING line, including the newline
+  '''
+  fields['operation'] = operation
+  return _record(state, fields)
+
+
+def _record(state, fields):
+
+  record = {'ts': datetime.utcnow().isoformat() + 'Z', 'level': str(state).upper(), 'pid': os.getpid()}
+  for k, v in fields.items():
+    if v is not None:
+      record[k] = round(v, 6) if isinstance(v, float) else v
+
+  return json.dumps(record, sort_keys=True, default=str) + '\n'
+
+
+def level_of(debug=False, quiet=False):
+  '''
+  RETURN:
+
+    INT level for the --debug and --quiet options, INFO without either
+  '''
+  if (debug):
+    return DEBUG
+
+  if (quiet):
+    return WARN
+
+  return INFO
+
+
+def enabled(state):
+  '''
+  RETURN:
+
+    BOOL True if messages of state (INFO, WARN, ...) pass the process default level
+  '''
+  return LEVELS.get(str(state).upper(), INFO) >= level
+
+
+def render(text, args, kwargs):
+  '''
+  Format a log message, text.format(*args, **kwargs) if there are arguments
+
+  RETURN:
+
+    STRING message
+  '''
+  if (args) or (kwargs):
+    return str(text).format(*args, **kwargs)
+
+  return str(text)
+
+
+def sink(path):
+  '''
+  Shared sink of a log file
+
+  INPUT:
+
+    STRING path - log file, relative to the working directory
+
+  RETURN:
+
+    LogSink instance
+  '''
+  path = os.path.abspath(path)
+
+  s = _sinks.get(path)
+  if s is None:
+    with _sinks_lock:
+      s = _sinks.get(path)
+      if s is None:
+        s = _sinks[path] = LogSink(path)
+
+  return s
+
+
+def flush():
+  '''
+  Flush every log sink of the process
+
+  RETURN: none
+  '''
+  for s in _sinks.values():
+    try:
+      s.flush()
+    except Exception as e:
+      sys.stderr.write('Failed to write log {0}: {1}\n'.format(s.path, e))
+
+
+atexit.register(flush)
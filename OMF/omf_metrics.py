@@ -0,0 +1,484 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Metrics registry for the openstack api calls of an OMFClient
+
+  - Every native client call made through an OMF service client is counted by
+    service, operation and status, and its latency is kept in a fixed-bucket histogram
+
+USE EXAMPLES:
+
+  c = OMFClient(osenv='sandbox')
+  c.nova_client.get_instance()
+
+  * c.metrics.quantile('nova', 'servers.list', 0.99) (seconds)
+
+  * c.metrics.report() (print count, errors, mean, p50, p99, max and limiter wait of every operation)
+'''
+import os, time
+import threading
+import types
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+''' histogram bucket upper bounds in seconds, a +Inf bucket is always added '''
+
+
+def status_of(e):
+  '''
+  Status label of a failed call
+
+  INPUT:
+
+    Exception e - exception raised by the native client
+
+  RETURN:
+
+    STRING http status code if the exception carries one, else error
+  '''
+  for attr in ['http_status', 'status_code', 'code']:
+    value = getattr(e, attr, None)
+    if isinstance(value, int):
+      return str(value)
+
+  return 'error'
+
+
+class Histogram(object):
+  '''
+  Fixed-bucket latency histogram, counts are kept per bucket (not cumulative)
+  '''
+
+  def __init__(self, buckets=DEFAULT_BUCKETS):
+
+    self.buckets = tuple(buckets)
+    ''' bucket upper bounds in seconds '''
+
+    self.counts = [0] * (len(self.buckets) + 1)
+    ''' observations per bucket, the last one is +Inf '''
+
+    self.count = 0
+    ''' number of observations '''
+
+    self.sum = 0.0
+    ''' total seconds observed '''
+
+    self.max = 0.0
+    ''' slowest observation in seconds '''
+
+  def observe(self, seconds):
+
+    i = 0
+    while i < len(self.buckets) and seconds > self.buckets[i]:
+      i += 1
+
+    self.counts[i] += 1
+    self.count += 1
+    self.sum += seconds
+    self.max = max(self.max, seconds)
+
+  def quantile(self, q):
+    '''
+    Estimate a quantile, interpolating linearly inside the bucket it falls in
+    (the same estimate as prometheus histogram_quantile)
+
+    INPUT:
+
+      FLOAT q - 0.0 to 1.0
+
+    RETURN:
+
+      FLOAT seconds, None without observations
+    '''
+    if not self.count:
+      return None
+
+    rank = q * self.count
+    seen = 0
+
+    for i, n in enumerate(self.counts):
+      if n and seen + n >= rank:
+        lower = self.buckets[i - 1] if i > 0 else 0.0
+        upper = self.buckets[i] if i < len(self.buckets) else self.max
+        return min(lower + (upper - lower) * ((rank - seen) / float(n)), self.max)
+      seen += n
+
+    return self.max
+
+
+class MetricsRegistry(object):
+  '''
+  Thread safe counters and latency histograms keyed on service and operation
+  '''
+
+  def __init__(self, buckets=DEFAULT_BUCKETS):
+
+    self.buckets = buckets
+    ''' histogram bucket upper bounds in seconds '''
+
+    self.calls = {}
+    ''' DICT (service, operation, status) -> count '''
+
+    self.latency = {}
+    ''' DICT (service, operation) -> Histogram '''
+
+    self.waits = {}
+    ''' DICT (service, operation) -> Histogram of time spent waiting for the client side api limits '''
+
+    self.retries = {}
+    ''' DICT (service, operation) -> retries made '''
+
+    self.shared = {}
+    ''' DICT (service, operation) -> calls answered with the result of an identical call '''
+
+    self._lock = threading.Lock()
+
+  def record(self, service, operation, status, seconds):
+    '''
+    Record one finished call
+
+    INPUTS:
+
+      STRING service - nova | cinder | glance | heat | neutron | ceilo | keystone
+
+      STRING operation - native client call. i.e. servers.list, hypervisors.search
+
+      STRING status - ok, http status code or error
+
+      FLOAT seconds - call duration
+
+    RETURN: none
+    '''
+    with self._lock:
+      key = (service, operation, status)
+      self.calls[key] = self.calls.get(key, 0) + 1
+
+      h = self.latency.get((service, operation))
+      if h is None:
+        h = self.latency[(service, operation)] = Histogram(self.buckets)
+      h.observe(seconds)
+
+  def record_wait(self, service, operation, seconds):
+    '''
+    Record the time a call waited for the rate and in-flight limits of it's service
+
+    RETURN: none
+    '''
+    with self._lock:
+      h = self.waits.get((service, operation))
+      if h is None:
+        h = self.waits[(service, operation)] = Histogram(self.buckets)
+      h.observe(seconds)
+
+  def record_retry(self, service, operation):
+
+    with self._lock:
+      self.retries[(service, operation)] = self.retries.get((service, operation), 0) + 1
+
+  def record_shared(self, service, operation):
+
+    with self._lock:
+      self.shared[(service, operation)] = self.shared.get((service, operation), 0) + 1
+
+  def quantile(self, service, operation, q):
+    '''
+    Latency quantile of an operation
+
+    RETURN:
+
+      FLOAT seconds, None if the operation was never called
+    '''
+    with self._lock:
+      h = self.latency.get((service, operation))
+      return h.quantile(q) if h else None
+
+  def reset(self):
+
+    with self._lock:
+      self.calls = {}
+      self.latency = {}
+      self.waits = {}
+      self.retries = {}
+      self.shared = {}
+
+  def rows(self):
+    '''
+    Summary of every operation called, slowest total first
+
+    RETURN:
+
+      LIST of DICT service, operation, count, errors, shared, total, mean, p50, p99, max, wait (seconds)
+    '''
+    with self._lock:
+      ret = []
+      for (service, operation), h in self.latency.items():
+        errors = sum([n for (s, o, status), n in self.calls.items() \
+                      if (s, o) == (service, operation) and status != 'ok'])
+        ret.append({'service': service, 'operation': operation, 'count': h.count, 'errors': errors, \
+                    'shared': self.shared.get((service, operation), 0), \
+                    'total': h.sum, 'mean': h.sum / h.count, 'p50': h.quantile(0.5), \
+                    'p99': h.quantile(0.99), 'max': h.max, \
+                    'wait': self.waits[(service, operation)].sum if (service, operation) in self.waits else 0.0})
+
+    return sorted(ret, key=lambda r: r['total'], reverse=True)
+
+  def report(self):
+    '''
+    Print the summary of every operation called
+
+    RETURN: none
+    '''
+    import omfbase
+    from collections import namedtuple
+
+    rows = self.rows()
+    if not rows:
+      return
+
+    Row = namedtuple('Row', 'service, operation, count, errors, shared, mean, p50, p99, max, wait')
+
+    table = [Row(*Row._fields)]
+    for r in rows:
+      table.append(Row(r['service'], r['operation'], r['count'], r['errors'], r['shared'], \
+                       *['{0:.3f}'.format(r[k]) for k in ['mean', 'p50', 'p99', 'max', 'wait']]))
+
+    print '\nAPI call latency (seconds):\n'
+    omfbase.print_pretty_columns(table, list(Row._fields))
+
+
+class Instrumented(object):
+  '''
+  Proxy of a native openstack client. Calls to its methods, and to methods of its managers
+  (i.e. client.servers.list), go through call(service, operation, func, *args, **kwargs).
+  '''
+
+  def __init__(self, obj, call, service, prefix=''):
+
+    object.__setattr__(self, '_obj', obj)
+    object.__setattr__(self, '_call', call)
+    object.__setattr__(self, '_service', service)
+    object.__setattr__(self, '_prefix', prefix)
+
+  @property
+  def __class__(self):
+    # isinstance() CHECKS AGAINST THE NATIVE CLIENT CLASSES KEEP WORKING
+    return self._obj.__class__
+
+  def __getattr__(self, name):
+
+    value = getattr(self._obj, name)
+
+    if name.startswith('_') or isinstance(value, (type, types.ModuleType)):
+      return value
+
+    operation = '{0}{1}'.format(self._prefix, name)
+
+    if callable(value):
+      def _wrapped(*args, **kwargs):
+        return self._call(self._service, operation, value, *args, **kwargs)
+      _wrapped.__name__ = name
+      _wrapped.__doc__ = getattr(value, '__doc__', None)
+      return _wrapped
+
+    # ONLY THE CLIENT ITSELF AND ITS MANAGERS ARE WRAPPED, NOT WHAT THE MANAGERS HOLD
+    if not self._prefix and hasattr(value, '__dict__'):
+      return Instrumented(value, self._call, self._service, '{0}.'.format(name))
+
+    return value
+
+  def __setattr__(self, name, value):
+
+    setattr(self._obj, name, value)
+
+  def __repr__(self):
+
+    return repr(self._obj)
+
+
+def timed_generator(gen, done, elapsed=0.0):
+  '''
+  Wrap a generator returned by a native call (i.e. glance images.list) so the time spent
+  producing items is part of the call duration
+
+  INPUTS:
+
+    GENERATOR gen - native result
+
+    FUNCTION done - called once with (status, seconds) when the generator is exhausted, fails or is closed
+
+    FLOAT elapsed - seconds already spent in the call that returned the generator
+
+  RETURN:
+
+    GENERATOR
+  '''
+  status = 'ok'
+  try:
+    while True:
+      t1 = time.time()
+      try:
+        item = next(gen)
+      except StopIteration:
+        elapsed += time.time() - t1
+        break
+      except Exception as e:
+        elapsed += time.time() - t1
+        status = status_of(e)
+        raise
+      elapsed += time.time() - t1
+      yield item
+  finally:
+    done(status, elapsed)
+
+
+class Textfile(object):
+  '''
+  Prometheus text format output for the node_exporter textfile collector.
+  Holds the gauges of one omf-osmgr run, the api call metrics are taken from a MetricsRegistry.
+  '''
+
+  def __init__(self, prefix='omf', **labels):
+    '''
+    Initialize Textfile instance
+
+    INPUTS:
+
+      STRING prefix - metric name prefix. default omf
+
+      labels - constant labels added to every series, i.e. environment='sandbox'
+
+    RETURN:
+
+      Textfile instance
+    '''
+    self.prefix = prefix
+    ''' metric name prefix '''
+
+    self.labels = labels
+    ''' constant labels of every series '''
+
+    self.gauges = {}
+    ''' DICT name -> (help, DICT label tuple -> value) '''
+
+  def gauge(self, name, value, help='', **labels):
+    '''
+    Set a gauge series
+
+    INPUTS:
+
+      STRING name - metric name without prefix
+
+      FLOAT value - gauge value, BOOL is written as 1 or 0
+
+      STRING help - metric description
+
+      labels - series labels, i.e. host='compute01'
+
+    RETURN: none
+    '''
+    _help, series = self.gauges.setdefault(name, (help, {}))
+    series[tuple(sorted(labels.items()))] = float(value)
+
+  def _series(self, name, value, labels):
+
+    labels = sorted(self.labels.items()) + list(labels)
+
+    if labels:
+      _labels = ','.join(['{0}="{1}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) \
+                          for k, v in labels])
+      return '{0}_{1}{{{2}}} {3}\n'.format(self.prefix, name, _labels, repr(float(value)))
+
+    return '{0}_{1} {2}\n'.format(self.prefix, name, repr(float(value)))
+
+  def _histogram(self, out, name, _help, buckets, histograms):
+
+    out.append('# HELP {0}_{1} {2}\n# TYPE {0}_{1} histogram\n'.format(self.prefix, name, _help))
+
+    for (service, operation) in sorted(histograms.keys()):
+      counts, _sum, _count = histograms[(service, operation)]
+      _labels = [('operation', operation), ('service', service)]
+      cumulative = 0
+      for le, n in zip([repr(b) for b in buckets] + ['+Inf'], counts):
+        cumulative += n
+        out.append(self._series('{0}_bucket'.format(name), cumulative, _labels + [('le', le)]))
+      out.append(self._series('{0}_sum'.format(name), _sum, _labels))
+      out.append(self._series('{0}_count'.format(name), _count, _labels))
+
+  def render(self, registry=None):
+    '''
+    Render gauges and the api call counters and latency histograms
+
+    INPUT:
+
+      MetricsRegistry registry - optional, api call metrics of the run
+
+    RETURN:
+
+      STRING prometheus text exposition format
+    '''
+    out = []
+
+    for name in sorted(self.gauges.keys()):
+      _help, series = self.gauges[name]
+      out.append('# HELP {0}_{1} {2}\n# TYPE {0}_{1} gauge\n'.format(self.prefix, name, _help))
+      for labels in sorted(series.keys()):
+        out.append(self._series(name, series[labels], labels))
+
+    if (registry):
+      with registry._lock:
+        calls = dict(registry.calls)
+        latency = dict([(k, (list(h.counts), h.sum, h.count)) for k, h in registry.latency.items()])
+        waits = dict([(k, (list(h.counts), h.sum, h.count)) for k, h in registry.waits.items()])
+        retries = dict(registry.retries)
+        shared = dict(registry.shared)
+
+      out.append('# HELP {0}_api_requests_total OpenStack api calls by service, operation and status\n' \
+                 '# TYPE {0}_api_requests_total counter\n'.format(self.prefix))
+      for (service, operation, status) in sorted(calls.keys()):
+        out.append(self._series('api_requests_total', calls[(service, operation, status)], \
+                                [('operation', operation), ('service', service), ('status', status)]))
+
+      out.append('# HELP {0}_api_retries_total OpenStack api calls retried after a transient failure\n' \
+                 '# TYPE {0}_api_retries_total counter\n'.format(self.prefix))
+      for (service, operation) in sorted(retries.keys()):
+        out.append(self._series('api_retries_total', retries[(service, operation)], \
+                                [('operation', operation), ('service', service)]))
+
+      out.append('# HELP {0}_api_shared_total OpenStack api calls answered with the result of an identical call\n' \
+                 '# TYPE {0}_api_shared_total counter\n'.format(self.prefix))
+      for (service, operation) in sorted(shared.keys()):
+        out.append(self._series('api_shared_total', shared[(service, operation)], \
+                                [('operation', operation), ('service', service)]))
+
+      self._histogram(out, 'api_request_duration_seconds', 'OpenStack api call latency', registry.buckets, latency)
+      self._histogram(out, 'api_limiter_wait_seconds', 'Time api calls waited for the client side rate and in-flight limits', \
+                      registry.buckets, waits)
+
+    return ''.join(out)
+
+  def write(self, path, registry=None):
+    '''
+    Write the textfile. The file is written next to path and renamed over it,
+    so the collector never reads a partial file.
+
+    INPUTS:
+
+      STRING path - output file, the node_exporter collector only reads files ending in .prom
+
+      MetricsRegistry registry - optional, api call metrics of the run
+
+    RETURN: none
+    '''
+    _dir = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(_dir):
+      os.makedirs(_dir)
+
+    _tmp = os.path.join(_dir, '.{0}.{1}'.format(os.path.basename(path), os.getpid()))
+    try:
+      with open(_tmp, 'w') as f:
+        f.write(self.render(registry))
+      os.rename(_tmp, path)
+    finally:
+      if os.path.exists(_tmp):
+        os.remove(_tmp)
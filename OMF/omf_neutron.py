@@ -12,6 +12,7 @@ Description:
 import os, sys, traceback
 from sets import Set
 import omfbase as omfbase
+import omf_trace
 import time
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -71,17 +72,17 @@ class NeutronClient (object):
     '''set passthru to native openstack neutron v2 module for methods not in Client()'''
 
     try:
-   
-      _user, _password, _project = _class.init_client_meta(_class, kwargs)
 
-      neutron = client.Client(username=_user, password=_password,tenant_name=_project, auth_url=_class.host)
+      sess = _class.get_session(kwargs)
+
+      neutron = client.Client(session=sess)
 
       if not isinstance(neutron, neutronclient.v2_0.client.Client):
         _class.log_and_exit('Initialize Neutron client failed', 2000)
 
-      _class.log_info('Created new {0}: {1}'.format(__name__, type(neutron)))
+      _class.log_debug('Created new {0}: {1}', __name__, type(neutron))
 
-      self.client = neutron
+      self.client = _class.instrument('neutron', neutron)
 
     except Exception as e:
       _class.log_and_exit(e, 2000)
@@ -131,7 +132,8 @@ class NeutronClient (object):
     if(namefilter):
       self.name_filter = namefilter
 
-    runningtime, obj = omfbase.trace(self._networks)
-    self.parent.log_and_print_info('Networks query took: {0}'.format(runningtime))
+    with omf_trace.span('get_networks') as _span:
+      obj = self._networks()
+    self.parent.log_took('Networks query took: {0}', _span.duration)
 
     return obj 
@@ -11,7 +11,7 @@ Description:
 import os, sys, traceback
 from sets import Set 
 import omfbase as omfbase
-import time
+import omf_trace
 from collections import defaultdict
 from collections import namedtuple
 from datetime import datetime, timedelta
@@ -81,16 +81,16 @@ class NovaClient (object):
 
     try:
 
-      _user, _password, _project = _class.init_client_meta(_class, kwargs)
+      sess = _class.get_session(kwargs)
 
-      nova = client.Client('2', _user, _password, _project, _class.host)
+      nova = client.Client('2', session=sess)
 
       if not isinstance(nova, novaclient.v2.client.Client):
         _class.log_and_exit('Failed to initialize Nova client', 1600)
 
-      _class.log_info('Created new {0} {1}'.format(__name__,type(nova)))
+      _class.log_debug('Created new {0} {1}', __name__,type(nova))
 
-      self.client = nova #the actual client
+      self.client = _class.instrument('nova', nova) #the actual client, calls are recorded in OMFClient.metrics
   
     except Exception as e:
       _class.log_and_exit(e, 1600)
@@ -207,7 +207,7 @@ class NovaClient (object):
     '''
     compute_nodes = set([])
 
-    self.parent.log_info('Filtering on host name: {0}'.format(self._name_filter))
+    self.parent.log_debug('Filtering on host name: {0}', self._name_filter)
 
     if (self._name_filter):  
       all_hosts = self.get_hypervisors(namefilter=self._name_filter)
@@ -217,8 +217,7 @@ class NovaClient (object):
     hosts_with_server = [] #so we can add the servers{} items
 
     for h in all_hosts:
-      if self.debug:
-        self.parent.log_and_print_info('Checking status of host {0}'.format(h.hypervisor_hostname))
+      self.parent.log_and_print_debug('Checking status of host {0}', h.hypervisor_hostname)
 
       hosts_with_server.append(self.hv_search(hvhost=h.hypervisor_hostname, sflag=True))
 
@@ -245,7 +244,7 @@ class NovaClient (object):
 
         compute_nodes.add(cnode)
       except Exception as e:
-        self.parent.log_and_print_error('{0} {1} for {2}'.format(type(e),e,h.hypervisor_hostname))
+        self.parent.log_and_print_error('{0} {1} for {2}', type(e),e,h.hypervisor_hostname)
 
     return compute_nodes
 
@@ -263,8 +262,9 @@ class NovaClient (object):
       LIST flavors
 
     '''
-    runningtime, obj = omfbase.trace(self._flavors)
-    self.parent.log_and_print_info('Flavors query took: {0}'.format(runningtime))
+    with omf_trace.span('get_flavors') as _span:
+      obj = self._flavors()
+    self.parent.log_took('Flavors query took: {0}', _span.duration)
 
     return obj
 
@@ -290,7 +290,7 @@ class NovaClient (object):
       if o.human_id.lower() == value.lower():
         ret = o.id
     if (not ret):
-      self.parent.log_and_print_error('{0} specified does not exist. {1}'.format(oname, value))
+      self.parent.log_and_print_error('{0} specified does not exist. {1}', oname, value)
 
     return ret
 
@@ -321,7 +321,7 @@ class NovaClient (object):
           ret = o.human_id 
  
     if (not ret):
-      self.parent.log_and_print_error('{0} specified does not exist. {1}'.format(oname, value))
+      self.parent.log_and_print_error('{0} specified does not exist. {1}', oname, value)
 
     return ret
 
@@ -389,7 +389,7 @@ class NovaClient (object):
     if (not obj):
       self.parent.log_and_exit('Failed to create server {0}'.format(cfg['name']), 1609)
 
-    self.parent.log_and_print_info('Created new server {0} id: {1} {2}'.format(cfg['name'], obj.id, obj.human_id))
+    self.parent.log_and_print_info('Created new server {0} id: {1} {2}', cfg['name'], obj.id, obj.human_id)
 
     # WAIT FOR READINESS
     waiting = True
@@ -398,16 +398,17 @@ class NovaClient (object):
     while (waiting):
       waiting = False
       try:
-        _s = self.get_instance(namefilter=obj.name)
-        if (_s):
-          if (not _s[0].status.upper() == 'ACTIVE'):
-            waiting = True
-            sys.stdout.write('. ')
-            sys.stdout.flush()
-            time.sleep(1)
-          else:
-            self.parent.log_and_print_info('New Instance {0} is ready.'.format(obj.name))
-            self.parent.log_and_print_info('Create New Instance took: {0}'.format(datetime.now() - _start))
+        with omf_trace.span('wait_server', obj.name, cat='wait'):
+          _s = self.get_instance(namefilter=obj.name)
+          if (_s):
+            if (not _s[0].status.upper() == 'ACTIVE'):
+              waiting = True
+              sys.stdout.write('. ')
+              sys.stdout.flush()
+              omf_trace.sleep(1)
+            else:
+              self.parent.log_and_print_info('New Instance {0} is ready.', obj.name)
+              self.parent.log_and_print_info('Create New Instance took: {0}', datetime.now() - _start)
       except Exception as e:
         self.parent.log_and_exit(e, 1609)
 
@@ -453,7 +454,7 @@ class NovaClient (object):
         if getattr(_s, 'os-extended-volumes:volumes_attached')[0].items()[0][1] != volume_id:
           waiting = True
           timer-=1
-          time.sleep(1)
+          omf_trace.sleep(1, 'wait_attach')
         else:
           is_attached = True
       except Exception as e:
@@ -461,10 +462,10 @@ class NovaClient (object):
         return 1
       
     if (is_attached):
-      self.parent.log_and_print_info('Successfully attached volume {0} to server {1}'.format(volume_id, server.name))
+      self.parent.log_and_print_info('Successfully attached volume {0} to server {1}', volume_id, server.name)
       return 0
     else:
-      self.parent.log_and_print_error('Failed to attach volume {0} to server {1}'.format(volume_id, server.name))
+      self.parent.log_and_print_error('Failed to attach volume {0} to server {1}', volume_id, server.name)
       return 1
 
   # RETURNS OS SERVER OBJECT
@@ -483,8 +484,9 @@ class NovaClient (object):
     if (namefilter):
       self._name_filter = namefilter
 
-    runningtime, obj = omfbase.trace(self._instances)
-    self.parent.log_info('Server query took: {0}'.format(runningtime))
+    with omf_trace.span('get_instance') as _span:
+      obj = self._instances()
+    self.parent.log_info('Server query took: {0}', _span.duration)
 
     return obj
 
@@ -503,8 +505,9 @@ class NovaClient (object):
     if (namefilter):
       self._name_filter = namefilter
 
-    runningtime, obj = omfbase.trace(self._host_instances)
-    self.parent.log_and_print_info('Host server instance query took: {0}'.format(runningtime))
+    with omf_trace.span('get_host_instances') as _span:
+      obj = self._host_instances()
+    self.parent.log_took('Host server instance query took: {0}', _span.duration)
 
     return obj
 
@@ -524,8 +527,9 @@ class NovaClient (object):
     if (namefilter):
       self._name_filter = namefilter
 
-    runningtime, obj = omfbase.trace(self._hypervisors)
-    self.parent.log_and_print_info('Host query took: {0}'.format(runningtime))
+    with omf_trace.span('get_hypervisors') as _span:
+      obj = self._hypervisors()
+    self.parent.log_took('Host query took: {0}', _span.duration)
 
     return obj
 
@@ -545,8 +549,9 @@ class NovaClient (object):
     if (namefilter):
       self._name_filter = namefilter
 
-    runningtime, obj = omfbase.trace(self._populate_compute_nodes)
-    self.parent.log_and_print_info('Populate ComputeNode type took: {0}'.format(runningtime))
+    with omf_trace.span('get_hypervisors_info') as _span:
+      obj = self._populate_compute_nodes()
+    self.parent.log_took('Populate ComputeNode type took: {0}', _span.duration)
 
     return obj
 
@@ -571,8 +576,9 @@ class NovaClient (object):
 
     self.sflag = sflag
     self.hvhost = hvhost
-    runningtime, obj = omfbase.trace(self._search_hypervisors)
-    self.parent.log_and_print_info('Hypervisor Search query took: {0}'.format(runningtime))
+    with omf_trace.span('hv_search', hvhost) as _span:
+      obj = self._search_hypervisors()
+    self.parent.log_took('Hypervisor Search query took: {0}', _span.duration)
 
     return obj
 
@@ -598,8 +604,9 @@ class NovaClient (object):
     if (not servers):
       self.parent.log_and_exit('HypervisorServers object required', 1614)
 
-    runningtime, obj = omfbase.trace(self._instances)
-    self.parent.log_and_print_info('Instance query took: {0}'.format(runningtime))
+    with omf_trace.span('get_instances_with_status') as _span:
+      obj = self._instances()
+    self.parent.log_took('Instance query took: {0}', _span.duration)
 
     for s in servers:
       _uuid = s.items()[0][1]
@@ -0,0 +1,171 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - cProfile and memory profiling of one omf-osmgr command (--profile, --profile-out, --profile-mem)
+
+  - The cpu profile is written as pstats (--profile-out) and/or printed sorted by cumulative time
+
+  - The memory profile lists the top allocation sites and the peak of the traced memory. It needs
+    tracemalloc (python 3, or python 2 built with the pytracemalloc patch). Without it only the peak
+    resident set size of the process is reported.
+
+USE EXAMPLES:
+
+  * omf-osmgr.py --osenv sandbox --checkhosts --profile
+
+  * omf-osmgr.py --osenv sandbox --show hostsfull --profile-out /tmp/hostsfull.pstats --profile-mem
+
+    python -c "import pstats; pstats.Stats('/tmp/hostsfull.pstats').sort_stats('cumulative').print_stats('omf')"
+'''
+import sys, time
+
+TOP = 25
+''' functions printed by report() '''
+
+MEM_TOP = 10
+''' allocation sites printed by report() '''
+
+MEM_FRAMES = 10
+''' frames kept per traced allocation '''
+
+
+class Profile(object):
+  '''
+  cpu (cProfile) and optional memory (tracemalloc) profile of the calling thread
+  '''
+
+  def __init__(self, out=None, mem=False):
+    '''
+    Initialize Profile instance
+
+    INPUTS:
+
+      STRING out - optional pstats file written by stop()
+
+      BOOL mem - also record allocation sites and the memory peak. default False
+
+    RETURN:
+
+      Profile instance
+    '''
+    self.out = out
+    ''' pstats file '''
+
+    self.mem = mem
+    ''' record memory '''
+
+    self.profiler = None
+    ''' cProfile.Profile while running '''
+
+    self.snapshot = None
+    ''' tracemalloc.Snapshot taken by stop() '''
+
+    self.peak = None
+    ''' peak traced memory in bytes, None without tracemalloc '''
+
+    self.seconds = None
+    ''' profiled wall time '''
+
+    self._tracemalloc = None
+    self._start = None
+
+  def start(self):
+    '''
+    Start profiling
+
+    RETURN: none
+    '''
+    if (self.mem):
+      try:
+        import tracemalloc
+        tracemalloc.start(MEM_FRAMES)
+        self._tracemalloc = tracemalloc
+      except ImportError:
+        self._tracemalloc = None
+
+    import cProfile
+
+    self.profiler = cProfile.Profile()
+    self._start = time.time()
+    self.profiler.enable()
+
+  def stop(self):
+    '''
+    Stop profiling and write the pstats file
+
+    RETURN: none
+    '''
+    if self.profiler is None:
+      return
+
+    self.profiler.disable()
+    self.seconds = time.time() - self._start
+
+    if (self._tracemalloc):
+      self.peak = self._tracemalloc.get_traced_memory()[1]
+      self.snapshot = self._tracemalloc.take_snapshot()
+      self._tracemalloc.stop()
+
+    if (self.out):
+      self.profiler.dump_stats(self.out)
+
+  def report(self, out=None, limit=TOP, cpu=True):
+    '''
+    Print the top functions by cumulative time, and the memory profile with mem
+
+    INPUTS:
+
+      FILE out - default sys.stdout
+
+      INT limit - functions printed. default TOP
+
+      BOOL cpu - print the functions. default True
+
+    RETURN: none
+    '''
+    import pstats
+
+    out = out or sys.stdout
+
+    if self.profiler is None:
+      return
+
+    if (cpu):
+      out.write('\nProfile ({0:.3f}s):\n'.format(self.seconds or 0.0))
+      pstats.Stats(self.profiler, stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+
+    if (self.out):
+      out.write('pstats written to {0}\n'.format(self.out))
+
+    if (self.mem):
+      self._report_mem(out)
+
+  def _report_mem(self, out):
+
+    if self.snapshot is None:
+      import resource
+      # ru_maxrss IS KB ON LINUX, BYTES ON MAC
+      rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+      rss = rss if sys.platform == 'darwin' else rss * 1024
+      out.write('\nMemory: tracemalloc is not available, peak resident set size {0}\n'.format(_size(rss)))
+      return
+
+    out.write('\nMemory: peak traced {0}, top {1} allocation sites:\n'.format(_size(self.peak), MEM_TOP))
+
+    for stat in self.snapshot.statistics('lineno')[:MEM_TOP]:
+      frame = stat.traceback[0]
+      out.write('{0:>12}{1:>10} blocks  {2}:{3}\n'.format(_size(stat.size), stat.count, frame.filename, frame.lineno))
+
+    out.flush()
+
+
+def _size(n):
+
+  for unit in ['B', 'KB', 'MB']:
+    if abs(n) < 1024.0:
+      return '{0:.1f} {1}'.format(n, unit)
+    n /= 1024.0
+
+  return '{0:.1f} GB'.format(n)
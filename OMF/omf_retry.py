@@ -0,0 +1,258 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Retry policy and circuit breaker for the openstack api calls of an OMFClient
+
+  - Read only calls (list, get, show, search, find) failing with a transient error
+    (connection failure, timeout, http 408 429 500 502 503 504) are retried with jittered
+    exponential backoff, as long as the retry budget of the client allows it
+
+  - A circuit breaker per service endpoint fails calls fast after repeated transient
+    failures, instead of waiting out timeouts and retries against an api that is down
+
+  - Configured per environment in the credentials file, see credentials/ABOUT
+'''
+import time
+import random
+import threading
+
+
+RETRYABLE_STATUS = ['408', '429', '500', '502', '503', '504']
+''' http status codes worth another try '''
+
+RETRYABLE_ERRORS = ['ConnectionError', 'ConnectionRefused', 'ConnectFailure', 'ConnectTimeout', 'ReadTimeout', \
+                    'Timeout', 'RequestTimeout', 'ServiceUnavailable', 'GatewayTimeout', 'BadGateway', \
+                    'OverLimit', 'RateLimit', 'RetriableConnectionFailure']
+''' exception class names (of any native client or requests) worth another try '''
+
+IDEMPOTENT = ['list', 'get', 'show', 'search', 'find', 'findall', 'authenticate']
+''' operation names, or name prefixes (list_networks), that are safe to repeat '''
+
+
+class CircuitOpen(Exception):
+  '''
+  The service endpoint had too many transient failures, the call was not made
+  '''
+  def __init__(self, service, retry_in):
+    Exception.__init__(self, '{0} api circuit is open after repeated failures, retry in {1:.1f}s'.format(service, retry_in))
+    self.service = service
+    self.retry_in = retry_in
+
+
+class RetryPolicy(object):
+  '''
+  Which calls are retried, how long to wait between tries and how many retries the client may spend
+  '''
+
+  def __init__(self, attempts=3, backoff=0.5, backoff_max=8.0, budget_ratio=0.2, budget_min=10):
+    '''
+    Initialize RetryPolicy instance
+
+    INPUTS:
+
+      INT attempts - tries per call including the first one. 1 disables retries. default 3
+
+      FLOAT backoff - seconds, the n-th retry waits a random time up to backoff * 2^n. default 0.5
+
+      FLOAT backoff_max - maximum seconds between two tries. default 8
+
+      FLOAT budget_ratio - retries earned by each call. default 0.2 (retries stay below 20% of the calls)
+
+      INT budget_min - retries available before any call was made. default 10
+
+    RETURN:
+
+      RetryPolicy instance
+    '''
+    self.attempts = max(1, int(attempts))
+    ''' tries per call '''
+
+    self.backoff = backoff
+    ''' backoff base in seconds '''
+
+    self.backoff_max = backoff_max
+    ''' backoff cap in seconds '''
+
+    self.budget_ratio = budget_ratio
+    ''' retries earned per call '''
+
+    self.budget_max = float(budget_min)
+    ''' retries that can be saved up '''
+
+    self.budget = float(budget_min)
+    ''' retries available now '''
+
+    self._lock = threading.Lock()
+
+  def idempotent(self, operation):
+    '''
+    RETURN:
+
+      BOOL True if the operation (i.e. servers.list, list_networks) only reads
+    '''
+    name = operation.split('.')[-1]
+
+    return name in IDEMPOTENT or name.split('_')[0] in IDEMPOTENT
+
+  def retryable(self, e):
+    '''
+    RETURN:
+
+      BOOL True if the exception is a transient failure
+    '''
+    import omf_metrics
+
+    if isinstance(e, CircuitOpen):
+      return False
+
+    if omf_metrics.status_of(e) in RETRYABLE_STATUS:
+      return True
+
+    return bool([c for c in type(e).__mro__ if c.__name__ in RETRYABLE_ERRORS])
+
+  def delay(self, attempt, e=None):
+    '''
+    Seconds to wait before the next try
+
+    INPUTS:
+
+      INT attempt - retries made so far
+
+      Exception e - failure of the last try. A retry_after from the server (http 429, 413) is honored
+
+    RETURN:
+
+      FLOAT seconds
+    '''
+    retry_after = getattr(e, 'retry_after', None)
+
+    if isinstance(retry_after, (int, float)) and retry_after > 0:
+      return min(float(retry_after), self.backoff_max)
+
+    return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+  def deposit(self):
+    '''
+    Earn part of a retry for a call made
+
+    RETURN: none
+    '''
+    with self._lock:
+      self.budget = min(self.budget_max, self.budget + self.budget_ratio)
+
+  def withdraw(self):
+    '''
+    Spend one retry
+
+    RETURN:
+
+      BOOL False if the budget is used up
+    '''
+    with self._lock:
+      if self.budget < 1:
+        return False
+      self.budget -= 1
+      return True
+
+
+class CircuitBreaker(object):
+  '''
+  Circuit breaker of one service endpoint.
+
+  closed - calls are made, consecutive transient failures are counted
+  open - calls fail with CircuitOpen until reset_timeout passed
+  half open - one trial call is made, it's result closes or opens the circuit again
+  '''
+
+  def __init__(self, service, threshold=5, reset_timeout=30.0):
+    '''
+    Initialize CircuitBreaker instance
+
+    INPUTS:
+
+      STRING service - service name, used in the CircuitOpen message
+
+      INT threshold - consecutive transient failures that open the circuit. 0 disables the breaker. default 5
+
+      FLOAT reset_timeout - seconds the circuit stays open before a trial call. default 30
+
+    RETURN:
+
+      CircuitBreaker instance
+    '''
+    self.service = service
+    ''' service name '''
+
+    self.threshold = threshold
+    ''' failures that open the circuit '''
+
+    self.reset_timeout = reset_timeout
+    ''' seconds open before a trial call '''
+
+    self.failures = 0
+    ''' consecutive transient failures '''
+
+    self.opened = None
+    ''' time the circuit opened, None when closed '''
+
+    self._trial = False
+    self._lock = threading.Lock()
+
+  @property
+  def state(self):
+
+    if self.opened is None:
+      return 'closed'
+
+    return 'half-open' if self._trial or time.time() - self.opened >= self.reset_timeout else 'open'
+
+  def before(self):
+    '''
+    Check the circuit before a call
+
+    RETURN: none, raises CircuitOpen if the call must not be made
+    '''
+    if not self.threshold:
+      return
+
+    with self._lock:
+      if self.opened is None:
+        return
+
+      waited = time.time() - self.opened
+
+      if waited < self.reset_timeout or self._trial:
+        raise CircuitOpen(self.service, max(0, self.reset_timeout - waited))
+
+      self._trial = True
+
+  def success(self):
+
+    with self._lock:
+      self.failures = 0
+      self.opened = None
+      self._trial = False
+
+  def failure(self):
+    '''
+    Count a transient failure
+
+    RETURN:
+
+      BOOL True if this failure opened the circuit
+    '''
+    if not self.threshold:
+      return False
+
+    with self._lock:
+      self.failures += 1
+
+      if self._trial or (self.opened is None and self.failures >= self.threshold):
+        _opened = self.opened is None
+        self.opened = time.time()
+        self._trial = False
+        return _opened
+
+      return False
@@ -0,0 +1,346 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Keystone authentication session shared by the OMF service clients
+
+  - One token and one service catalog per OMFClient instead of one login per native client
+
+'''
+import os, time
+import omfbase as omfbase
+
+from omfcodes import ExitCodes
+ec = ExitCodes()
+
+
+def new_transport(pool_connections=16, pool_maxsize=32, connect_timeout=None, read_timeout=None, cassette=None):
+  '''
+  Build the http transport shared by every OMF service client.
+  Connections are kept alive and reused across calls through one connection pool per host.
+
+  INPUTS:
+
+    * INT pool_connections - number of hosts (service endpoints) to keep a connection pool for
+
+    * INT pool_maxsize - maximum connections kept open per host
+
+    * FLOAT connect_timeout - seconds to wait for a tcp/tls connect. default None (no timeout)
+
+    * FLOAT read_timeout - seconds to wait for a response. default None (no timeout)
+
+    * omf_cassette.Cassette cassette - record the http traffic to, or replay it from, a cassette. default None
+
+  RETURN:
+
+    * Instance requests.Session
+  '''
+  import requests
+  from requests.adapters import HTTPAdapter
+
+  class _OMFAdapter(HTTPAdapter):
+
+    _pid = os.getpid()
+
+    def send(self, request, **kwargs):
+      if (cassette) and (not cassette.recording):
+        return cassette.replay_http(request, self)
+
+      if self._pid != os.getpid():
+        # FORKED (omf_glance image upload), NEVER SHARE THE PARENT'S KEEP-ALIVE SOCKETS
+        self._pid = os.getpid()
+        self.init_poolmanager(self._pool_connections, self._pool_maxsize, block=self._pool_block)
+
+      if kwargs.get('timeout') is None and (connect_timeout or read_timeout):
+        kwargs['timeout'] = (connect_timeout, read_timeout)
+
+      if not cassette:
+        return super(_OMFAdapter, self).send(request, **kwargs)
+
+      t1 = time.time()
+      response = super(_OMFAdapter, self).send(request, **kwargs)
+      response.content
+      cassette.record_http(request, response, time.time() - t1)
+
+      return response
+
+  adapter = _OMFAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+
+  transport = requests.Session()
+  transport.mount('https://', adapter)
+  transport.mount('http://', adapter)
+
+  return transport
+
+def new_session(host=None, user=None, password=None, project=None, domain='Default', transport=None):
+  '''
+  Build a keystone session authenticated with a password plugin.
+  The identity api version (v2.0 or v3) is discovered from the auth url.
+
+  INPUTS:
+
+    * STRING host - openstack auth url
+
+    * STRING user - openstack user
+
+    * STRING password - openstack user password
+
+    * STRING project - openstack tenant (project) name
+
+    * STRING domain - user and project domain, only used by keystone v3. default Default
+
+    * Instance requests.Session transport - http transport, see new_transport(). default requests defaults
+
+  RETURN:
+
+    * Instance keystoneclient.session.Session
+  '''
+  try:
+    from keystoneclient.auth.identity import generic
+    from keystoneclient import session
+  except:
+    raise omfbase.OMFImport(2202)
+
+  auth = generic.Password(auth_url = host,
+                          username = user,
+                          password = password,
+                          project_name = project,
+                          user_domain_name = domain,
+                          project_domain_name = domain)
+
+  return session.Session(auth=auth, session=transport)
+
+
+class TokenCache(object):
+  '''
+  Opt-in on-disk keystone token cache, one file per openstack environment, host, user and project.
+
+  The cached token is reused until it is about to expire. A token the cloud rejects is dropped by
+  the keystone session (http 401 -> re-authenticate), and the fresh token is written back.
+  '''
+
+  cache_dir = os.path.join(os.path.expanduser('~'), '.omf', 'tokens')
+  '''directory holding cached tokens, created with 0700 permission'''
+
+  stale_duration = 300
+  '''seconds before expiry a cached token is no longer reused'''
+
+  def __init__(self, osenv=None, host=None, user=None, project=None):
+    '''
+    Initialize TokenCache instance
+
+    INPUTS:
+
+      * STRING osenv - openstack environment name, used as the file name prefix
+
+      * STRING host, user, project - credentials the token belongs to
+
+    RETURN:
+
+      * TokenCache instance
+    '''
+    import hashlib
+
+    _key = hashlib.sha1('{0}|{1}|{2}'.format(host, user, project)).hexdigest()[:16]
+
+    self.path = os.path.join(self.cache_dir, '{0}-{1}.json'.format(osenv or 'default', _key))
+    '''cache file path'''
+
+    self.token = None
+    '''token id loaded from or last written to the cache file'''
+
+  def load(self, auth):
+    '''
+    Set the cached token on an identity auth plugin if it is still usable
+
+    INPUT:
+
+      * Instance keystoneclient identity auth plugin
+
+    RETURN:
+
+      * BOOL True if the cached token was loaded
+    '''
+    import json
+    from keystoneclient import access
+
+    try:
+      with open(self.path, 'r') as f:
+        cached = json.load(f)
+
+      if cached['version'] == 'v3':
+        auth_ref = access.AccessInfo.factory(body={'token': cached['body']}, auth_token=cached['token'])
+      else:
+        auth_ref = access.AccessInfo.factory(body={'access': cached['body']})
+    except Exception:
+      return False
+
+    if auth_ref.will_expire_soon(stale_duration=self.stale_duration):
+      return False
+
+    auth.auth_ref = auth_ref
+    self.token = auth_ref.auth_token
+
+    return True
+
+  def save(self, auth):
+    '''
+    Write the token of an identity auth plugin to the cache file if it changed.
+    The file is only readable by the owner and replaced atomically.
+
+    INPUT:
+
+      * Instance keystoneclient identity auth plugin
+
+    RETURN: none
+    '''
+    import json
+
+    auth_ref = getattr(auth, 'auth_ref', None)
+
+    if (not auth_ref) or (auth_ref.auth_token == self.token):
+      return
+
+    if not os.path.isdir(self.cache_dir):
+      os.makedirs(self.cache_dir, 0700)
+
+    cached = {'version': auth_ref.version, 'token': auth_ref.auth_token, 'body': dict(auth_ref)}
+
+    _tmp = '{0}.{1}'.format(self.path, os.getpid())
+    fd = os.open(_tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, 'w') as f:
+      json.dump(cached, f, default=str)
+    os.rename(_tmp, self.path)
+
+    self.token = auth_ref.auth_token
+
+  def clear(self):
+    '''
+    Remove the cache file
+
+    RETURN: none
+    '''
+    if os.path.exists(self.path):
+      os.remove(self.path)
+    self.token = None
+
+
+class EndpointResolver(object):
+  '''
+  Service catalog endpoint lookups served from a dictionary.
+
+  The catalog of the session token is parsed once per token into
+  (service type, interface, region) -> url. Optionally the parsed catalog is kept on disk
+  for each openstack environment so later runs start with it.
+  '''
+
+  cache_dir = os.path.join(os.path.expanduser('~'), '.omf', 'endpoints')
+  '''directory holding persisted endpoint catalogs'''
+
+  def __init__(self, session, osenv=None, persist=False):
+    '''
+    Initialize EndpointResolver instance
+
+    INPUTS:
+
+      * Instance keystoneclient.session.Session session - authenticated session
+
+      * STRING osenv - openstack environment name, used as the file name when persisted
+
+      * BOOL persist - keep the parsed catalog on disk. default False
+
+    RETURN:
+
+      * EndpointResolver instance
+    '''
+    self.session = session
+    '''keystone session the catalog belongs to'''
+
+    self.path = os.path.join(self.cache_dir, '{0}.json'.format(osenv or 'default')) if persist else None
+    '''persisted catalog file, None when not persisted'''
+
+    self.endpoints = {}
+    '''DICT (service type, interface, region) -> url. region None is the first url found'''
+
+    self.token = None
+    '''sha1 of the token the endpoints were parsed from'''
+
+    if (self.path):
+      self._load()
+
+  def url_for(self, service_type, interface='public', region=None):
+    '''
+    Resolve a service endpoint url
+
+    INPUTS:
+
+      * STRING service_type - catalog service type. i.e. compute, image, orchestration
+
+      * STRING interface - public | internal | admin. default public
+
+      * STRING region - optional region name
+
+    RETURN:
+
+      * STRING url, None if the catalog has no such endpoint
+    '''
+    import hashlib
+
+    auth_ref = self.session.auth.get_access(self.session)
+
+    if hashlib.sha1(auth_ref.auth_token).hexdigest() != self.token:
+      self._parse(auth_ref)
+
+    return self.endpoints.get((service_type, interface, region))
+
+  def _parse(self, auth_ref):
+
+    endpoints = {}
+
+    if auth_ref.version == 'v3':
+      for service in auth_ref.get('catalog', []):
+        for e in service.get('endpoints', []):
+          for region in [e.get('region_id') or e.get('region'), None]:
+            endpoints.setdefault((service['type'], e['interface'], region), e['url'])
+    else:
+      for service in auth_ref.get('serviceCatalog', []):
+        for e in service.get('endpoints', []):
+          for interface in ['public', 'internal', 'admin']:
+            if '{0}URL'.format(interface) in e:
+              for region in [e.get('region'), None]:
+                endpoints.setdefault((service['type'], interface, region), e['{0}URL'.format(interface)])
+
+    import hashlib
+
+    self.endpoints = endpoints
+    self.token = hashlib.sha1(auth_ref.auth_token).hexdigest()
+
+    if (self.path):
+      self._save()
+
+  def _load(self):
+
+    import json
+
+    try:
+      with open(self.path, 'r') as f:
+        cached = json.load(f)
+      self.endpoints = dict([(tuple(e[0]), e[1]) for e in cached['endpoints']])
+      self.token = cached['token']
+    except Exception:
+      self.endpoints = {}
+      self.token = None
+
+  def _save(self):
+
+    import json
+
+    if not os.path.isdir(self.cache_dir):
+      os.makedirs(self.cache_dir, 0700)
+
+    _tmp = '{0}.{1}'.format(self.path, os.getpid())
+    fd = os.open(_tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0600)
+    with os.fdopen(fd, 'w') as f:
+      json.dump({'token': self.token, 'endpoints': [[list(k), v] for k, v in self.endpoints.items()]}, f)
+    os.rename(_tmp, self.path)
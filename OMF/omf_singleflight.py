@@ -0,0 +1,144 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Single-flight of the read only openstack api calls of an OMFClient
+
+  - Calls with the same service, operation and arguments that run at the same time share
+    one http request and it's result. With a window (credentials singleflight_window, default 0
+    seconds) a finished result is also handed to identical calls made within it, i.e. a list made
+    right after the same list by another part of the command. Those results can be up to window
+    seconds old
+
+  - Any call that changes something (create, delete, attach, ...) drops every finished result,
+    a change made through one service can show in another (a nova volume attach changes the cinder volume)
+'''
+import sys, time
+import threading
+import types
+
+
+def _arg(a):
+
+  # THE SAME RESOURCE FETCHED TWICE IS TWO OBJECTS WITH ONE ID, IT'S REPR DEPENDS ON THE CLIENT
+  return getattr(a, 'id', a)
+
+
+class _Call(object):
+
+  def __init__(self):
+
+    self.event = threading.Event()
+    self.result = None
+    self.error = None
+    self.done = None
+    self.shareable = True
+
+
+class SingleFlight(object):
+  '''
+  Identical calls in flight, and finished within window seconds, keyed on (service, operation, arguments)
+  '''
+
+  def __init__(self, window=0):
+    '''
+    Initialize SingleFlight instance
+
+    INPUT:
+
+      FLOAT window - seconds a finished result is reused. 0 only shares calls in flight. default 0
+
+    RETURN:
+
+      SingleFlight instance
+    '''
+    self.window = window
+    ''' seconds a finished result is reused '''
+
+    self._calls = {}
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def key(service, operation, args, kwargs):
+    '''
+    Call key. Resources (servers, hypervisors, volumes, ...) are keyed on their id, other arguments on their repr.
+    Arguments without an id or a stable repr (plain objects) make the key unique, so those calls are not shared.
+
+    RETURN:
+
+      TUPLE (service, operation, STRING arguments)
+    '''
+    return (service, operation, repr(([_arg(a) for a in args], sorted([(k, _arg(v)) for k, v in kwargs.items()]))))
+
+  def do(self, key, func):
+    '''
+    Run func, or wait for and share the result of the identical call in flight
+
+    INPUTS:
+
+      TUPLE key - see key()
+
+      FUNCTION func - makes the call
+
+    RETURN:
+
+      TUPLE (result, BOOL shared). Lists and dicts shared are copies, an exception of the shared call is raised again.
+    '''
+    now = time.time()
+
+    with self._lock:
+      for k, c in self._calls.items():
+        if c.done is not None and now - c.done > self.window:
+          del self._calls[k]
+
+      c = self._calls.get(key)
+      leader = c is None
+      if (leader):
+        c = self._calls[key] = _Call()
+
+    if (leader):
+      try:
+        c.result = func()
+      except Exception:
+        c.error = sys.exc_info()
+      finally:
+        with self._lock:
+          c.done = time.time()
+          # A GENERATOR CAN ONLY BE ITERATED ONCE, AN ERROR IS ONLY SHARED WITH CALLS ALREADY WAITING
+          c.shareable = not isinstance(c.result, types.GeneratorType)
+          if (not self.window) or (not c.shareable) or (c.error):
+            if self._calls.get(key) is c:
+              del self._calls[key]
+        c.event.set()
+
+      if (c.error):
+        raise c.error[0], c.error[1], c.error[2]
+
+      return c.result, False
+
+    c.event.wait()
+
+    if not c.shareable:
+      return func(), False
+
+    if (c.error):
+      raise c.error[0], c.error[1], c.error[2]
+
+    if isinstance(c.result, list):
+      return list(c.result), True
+    if isinstance(c.result, dict):
+      return dict(c.result), True
+
+    return c.result, True
+
+  def forget(self):
+    '''
+    Drop the finished results of every service
+
+    RETURN: none
+    '''
+    with self._lock:
+      for k, c in self._calls.items():
+        if c.done is not None:
+          del self._calls[k]
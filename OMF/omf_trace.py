@@ -0,0 +1,552 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  - Hierarchical span tracing of omf-osmgr commands
+
+  - A span times one block of work on a monotonic clock. Spans opened while another span is
+    open in the same thread become it's children, so a command is recorded as a tree:
+
+    checkhosts > get_hypervisors_info > hv_search[cmp-01] > nova.hypervisors.search
+                                      > is_reachable[cmp-01]
+
+  - Spans are always timed, they are only kept for report() while tracing is enabled (omf-osmgr.py --trace).
+    Root spans are kept when they close, child spans when they open
+
+USE EXAMPLES:
+
+  import omf_trace
+
+  * as context manager, the optional label tells spans of the same name apart
+
+    with omf_trace.span('hv_search', hvhost) as s:
+      obj = self._search_hypervisors()
+    self.parent.log_took('Hypervisor Search query took: {0}', s.duration)
+
+  * as decorator, return values are unchanged. label names the argument to use as label
+
+    @omf_trace.traced(label='host')
+    def is_reachable(self, host):
+
+  * sleeps of wait loops, so idle time shows up in the trace
+
+    omf_trace.sleep(1)
+
+  * omf_trace.enable(), run the command, omf_trace.report() or omf_trace.write_chrome('run.json')
+    (Chrome Trace Event format, open in chrome://tracing or https://ui.perfetto.dev)
+
+  * omf_trace.report_summary() (count, total, mean, p50, p95, p99, max and share of the run wall time per span name)
+
+NOTE:
+
+  Work handed to other threads is not a child of the submitting span unless it is wrapped with
+  omf_trace.wrap(func) (omf_async does this for the calls it runs on it's worker pool).
+'''
+import os, sys, time
+import threading
+import functools
+import json
+import math
+
+
+def _monotonic_clock():
+  '''
+  Monotonic clock in seconds, clock_gettime(CLOCK_MONOTONIC) through ctypes. time.time if it is not available.
+
+  RETURN:
+
+    FUNCTION clock
+  '''
+  if hasattr(time, 'monotonic'):
+    return time.monotonic
+
+  try:
+    import ctypes
+
+    # LIBRARIES BY NAME, ctypes.util.find_library RUNS ldconfig OR gcc IN A SUBPROCESS
+    if sys.platform == 'darwin':
+      libc, clock_id = ctypes.CDLL('libc.dylib', use_errno=True), 6
+    else:
+      libc, clock_id = ctypes.CDLL('librt.so.1', use_errno=True), 1
+
+    class _timespec(ctypes.Structure):
+      _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    clock_gettime = libc.clock_gettime
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+    clock_gettime.restype = ctypes.c_int
+
+    def monotonic():
+      t = _timespec()
+      if clock_gettime(clock_id, ctypes.byref(t)) != 0:
+        raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+      return t.tv_sec + t.tv_nsec * 1e-9
+
+    monotonic()
+
+    return monotonic
+
+  except Exception:
+    return time.time
+
+
+_clock = None
+
+
+def monotonic():
+  '''
+  Seconds on a clock that does not jump with the wall clock. The clock is looked up on the first call,
+  so importing omf_trace (omf-osmgr.py --help) does not load ctypes
+
+  RETURN:
+
+    FLOAT seconds
+  '''
+  global _clock
+
+  if _clock is None:
+    _clock = _monotonic_clock()
+
+  return _clock()
+
+enabled = False
+''' keep spans for report(), set by omf-osmgr.py from --trace '''
+
+_roots = []
+_roots_lock = threading.Lock()
+_local = threading.local()
+
+
+class Span(object):
+  '''
+  One timed block of work
+  '''
+  __slots__ = ['name', 'label', 'cat', 'attrs', 'parent', 'children', 'start', 'end', 'thread', 'tid']
+
+  def __init__(self, name, label=None, cat='omf', **attrs):
+
+    self.name = name
+    ''' STRING i.e. hv_search '''
+
+    self.label = label
+    ''' tells spans of the same name apart, i.e. the host name '''
+
+    self.cat = cat
+    ''' category, omf | api | ping | wait | sleep '''
+
+    self.attrs = attrs
+    ''' DICT attributes, error or exit_code are added when the block raised '''
+
+    self.parent = None
+    self.children = []
+    self.start = None
+    self.end = None
+    self.thread = None
+    self.tid = None
+
+  def __repr__(self):
+    return '<Span {0} {1:.6f}s>'.format(self.key, self.duration)
+
+  @property
+  def key(self):
+    ''' name[label] '''
+    return self.name if self.label is None else '{0}[{1}]'.format(self.name, self.label)
+
+  @property
+  def duration(self):
+    ''' seconds, up to now while the span is open '''
+    if self.start is None:
+      return 0.0
+
+    return (self.end if self.end is not None else monotonic()) - self.start
+
+  def __enter__(self):
+
+    stack = _stack()
+
+    self.parent = stack[-1] if stack else None
+    self.thread = threading.current_thread().name
+    self.tid = threading.current_thread().ident
+
+    if (enabled) and self.parent is not None:
+      self.parent.children.append(self)
+
+    stack.append(self)
+    self.start = monotonic()
+
+    return self
+
+  def __exit__(self, exc_type, exc_value, tb):
+
+    self.end = monotonic()
+
+    stack = _stack()
+    if stack and stack[-1] is self:
+      stack.pop()
+
+    # A ROOT SPAN IS KEPT WHEN IT CLOSES, SO A COMMAND SPAN OPENED BEFORE --trace WAS PARSED IS KEPT TOO
+    if (enabled) and self.parent is None:
+      with _roots_lock:
+        _roots.append(self)
+
+    if exc_type is not None:
+      if issubclass(exc_type, SystemExit):
+        self.attrs['exit_code'] = getattr(exc_value, 'code', None)
+      else:
+        self.attrs['error'] = exc_type.__name__
+
+    return False
+
+
+def _stack():
+
+  try:
+    return _local.stack
+  except AttributeError:
+    _local.stack = []
+    return _local.stack
+
+
+def span(name, label=None, cat='omf', **attrs):
+  '''
+  Open a span, use with the with statement
+
+  INPUTS:
+
+    STRING name - i.e. hv_search
+
+    STRING label - optional, i.e. the host name. shown as name[label]
+
+    STRING cat - optional category, omf | api | ping | wait | sleep. default omf
+
+    attrs - optional attributes
+
+  RETURN:
+
+    Span instance, duration holds the seconds the block took
+  '''
+  return Span(name, label, cat, **attrs)
+
+
+def sleep(seconds, name='sleep'):
+  '''
+  time.sleep in a span, so idle time of wait loops and backoffs shows up in the trace
+
+  INPUTS:
+
+    FLOAT seconds
+
+    STRING name - optional, default sleep
+
+  RETURN: none
+  '''
+  with Span(name, cat='sleep'):
+    time.sleep(seconds)
+
+
+def traced(name=None, label=None, cat='omf'):
+  '''
+  Decorator running the function in a span
+
+  INPUTS:
+
+    STRING name - optional, default the function name
+
+    STRING label - optional, name of the argument whose value labels the span
+
+    STRING cat - optional category. default omf
+
+  RETURN:
+
+    decorator, the return value of the function is unchanged
+  '''
+  def decorator(func):
+
+    _name = name or func.__name__
+    _index = None
+
+    if (label):
+      # ARGUMENT NAMES FROM THE CODE OBJECT, inspect TAKES LONGER TO IMPORT THAN THE REST OF omf_trace
+      _args = func.__code__.co_varnames[:func.__code__.co_argcount]
+      _index = _args.index(label) if label in _args else None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+      _label = None
+      if (label):
+        if label in kwargs:
+          _label = kwargs[label]
+        elif _index is not None and _index < len(args):
+          _label = args[_index]
+
+      with Span(_name, _label, cat):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+  return decorator
+
+
+def current():
+  '''
+  RETURN:
+
+    Span open in this thread, None outside of any span
+  '''
+  stack = _stack()
+  return stack[-1] if stack else None
+
+
+def wrap(func):
+  '''
+  Bind func to the span open now, spans func opens in another thread become it's children
+
+  RETURN:
+
+    FUNCTION
+  '''
+  parent = current()
+
+  if parent is None:
+    return func
+
+  @functools.wraps(func)
+  def wrapper(*args, **kwargs):
+
+    stack = _stack()
+    stack.append(parent)
+    try:
+      return func(*args, **kwargs)
+    finally:
+      stack.remove(parent)
+
+  return wrapper
+
+
+def enable(on=True):
+  '''
+  Start (or stop) keeping spans for report()
+
+  RETURN: none
+  '''
+  global enabled
+  enabled = bool(on)
+
+
+def reset():
+  '''
+  Drop the kept spans
+
+  RETURN: none
+  '''
+  with _roots_lock:
+    del _roots[:]
+
+
+def spans():
+  '''
+  RETURN:
+
+    LIST of root Span, in the order they were closed
+  '''
+  with _roots_lock:
+    return list(_roots)
+
+
+def report(out=None):
+  '''
+  Print the span tree. Siblings of the same name are merged into one line with their count,
+  total and slowest seconds, so a check of a thousand hosts stays readable.
+
+  INPUT:
+
+    FILE out - default sys.stdout
+
+  RETURN: none
+  '''
+  out = out or sys.stdout
+
+  roots = spans()
+  if not roots:
+    return
+
+  out.write('\n{0:<70}{1:>8}{2:>12}{3:>12}\n'.format('span', 'count', 'total', 'max'))
+  _report(roots, 0, out)
+  out.flush()
+
+
+def _report(siblings, depth, out):
+
+  groups = []
+  by_name = {}
+  for s in siblings:
+    if not s.name in by_name:
+      by_name[s.name] = []
+      groups.append(by_name[s.name])
+    by_name[s.name].append(s)
+
+  for group in groups:
+    name = group[0].key if len(group) == 1 else group[0].name
+    durations = [s.duration for s in group]
+
+    out.write('{0:<70}{1:>8}{2:>11.4f}s{3:>11.4f}s\n'.format( \
+              ('  ' * depth + name)[:69], len(group), sum(durations), max(durations)))
+
+    children = []
+    for s in group:
+      children.extend(s.children)
+
+    _report(children, depth + 1, out)
+
+
+def _walk(spans):
+
+  for s in spans:
+    yield s
+    for c in _walk(s.children):
+      yield c
+
+
+def chrome_events():
+  '''
+  Kept spans as Chrome Trace Event complete events, one row per thread
+
+  RETURN:
+
+    DICT {'traceEvents': [...], 'displayTimeUnit': 'ms'}
+  '''
+  roots = spans()
+  pid = os.getpid()
+
+  events = []
+  threads = {}
+
+  base = min([s.start for s in roots]) if roots else 0.0
+
+  for s in _walk(roots):
+    if s.start is None:
+      continue
+
+    # SMALL STABLE THREAD IDS, THE MAIN THREAD FIRST
+    if not s.tid in threads:
+      threads[s.tid] = (len(threads) + 1, s.thread)
+
+    args = dict(s.attrs)
+    if s.label is not None:
+      args['label'] = s.label
+
+    events.append({'name': s.key, 'cat': s.cat, 'ph': 'X', 'pid': pid, 'tid': threads[s.tid][0], \
+                   'ts': round((s.start - base) * 1e6, 3), 'dur': round(s.duration * 1e6, 3), 'args': args})
+
+  for tid, name in threads.values():
+    events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+
+  events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, \
+                 'args': {'name': 'omf-osmgr {0}'.format(roots[0].name) if roots else 'omf-osmgr'}})
+
+  return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome(path):
+  '''
+  Write the kept spans to a Chrome Trace Event file (chrome://tracing, https://ui.perfetto.dev)
+
+  INPUT:
+
+    STRING path - output file
+
+  RETURN: none
+  '''
+  with open(path, 'w') as f:
+    json.dump(chrome_events(), f, default=str)
+
+
+def _percentile(ordered, q):
+
+  # NEAREST RANK ON THE SORTED DURATIONS
+  return ordered[max(0, int(math.ceil(q * len(ordered))) - 1)]
+
+
+def _wall(roots):
+
+  # ROOTS OF UNWRAPPED WORKER THREADS OVERLAP THE COMMAND SPAN, ONLY THE SPREAD OF ALL ROOTS IS WALL TIME
+  if not roots:
+    return 0.0
+
+  return max([s.start + s.duration for s in roots]) - min([s.start for s in roots])
+
+
+def summary():
+  '''
+  Latency summary of the kept spans, one row per span name. Nested spans are part of their
+  parents, so the shares of the rows add up to more than 1.
+
+  RETURN:
+
+    LIST of DICT name, cat, count, total, mean, p50, p95, p99, max, share. slowest total first
+  '''
+  roots = spans()
+
+  wall = _wall(roots)
+
+  durations = {}
+  cats = {}
+  for s in _walk(roots):
+    durations.setdefault(s.name, []).append(s.duration)
+    cats.setdefault(s.name, s.cat)
+
+  rows = []
+  for name, d in durations.items():
+    d.sort()
+    total = sum(d)
+    rows.append({'name': name, 'cat': cats[name], 'count': len(d), 'total': total, 'mean': total / len(d), \
+                 'p50': _percentile(d, 0.5), 'p95': _percentile(d, 0.95), 'p99': _percentile(d, 0.99), \
+                 'max': d[-1], 'share': total / wall if wall else 0.0})
+
+  rows.sort(key=lambda r: r['total'], reverse=True)
+
+  return rows
+
+
+def report_summary():
+  '''
+  Print the latency summary of the kept spans
+
+  RETURN: none
+  '''
+  import omfbase
+  from collections import namedtuple
+
+  rows = summary()
+  if not rows:
+    return
+
+  Row = namedtuple('Row', 'name, cat, count, total, mean, p50, p95, p99, max, share')
+
+  table = [Row(*Row._fields)]
+  for r in rows:
+    table.append(Row(r['name'], r['cat'], r['count'], \
+                     *(['{0:.3f}'.format(r[k]) for k in ['total', 'mean', 'p50', 'p95', 'p99', 'max']] + \
+                       ['{0:.1f}%'.format(r['share'] * 100)])))
+
+  print '\nRun summary (seconds, share of the run wall time):\n'
+  omfbase.print_pretty_columns(table, list(Row._fields))
+
+
+def write_summary(path):
+  '''
+  Write the latency summary of the kept spans as json
+
+  INPUT:
+
+    STRING path - output file
+
+  RETURN: none
+  '''
+  roots = sorted(spans(), key=lambda s: s.start)
+
+  with open(path, 'w') as f:
+    json.dump({'command': roots[0].name if roots else None, 'wall': _wall(roots), \
+               'operations': summary()}, f, indent=2, sort_keys=True)
@@ -8,17 +8,40 @@ Provides:
 
 import os, sys, traceback, inspect
 from sets import Set 
-from datetime import datetime, timedelta
-import time
-import argparse
-import ast
+import omf_log
+import omf_trace
 import omf_client
 
-known_environments = [env.strip() for env in open('../credentials/environments', 'r')]
-'''The known Openstack environments to be supported'''
+CREDENTIALS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'credentials')
+'''Directory of the credentials files and the environments list'''
+
+known_environments = None
+'''The known Openstack environments to be supported, read by environments() on first use'''
+
+local_environments = ['fakecloud']
+'''Known environments that are only selected by name, --osenv all leaves them out'''
 
 OMFCLIENT_CLASS = omf_client.OMFClient
 
+known_services = ['keystone', 'nova', 'cinder', 'glance', 'heat', 'neutron', 'ceilo']
+'''Service names the OMF service clients record and limit their api calls under'''
+
+def environments():
+  '''
+  The known Openstack environments, read from credentials/environments on first use
+
+  RETURN:
+
+    LIST environment names
+  '''
+  global known_environments
+
+  if known_environments is None:
+    with open(os.path.join(CREDENTIALS_DIR, 'environments'), 'r') as f:
+      known_environments = [env.strip() for env in f]
+
+  return known_environments
+
 class OMFImport(Exception):
   pass
 
@@ -33,37 +56,100 @@ class credentials(object):
       sys.stderr.write('1510')
       sys.exit(151)
 
-    if not environment in known_environments:
+    if not environment in environments():
       _out('{0} is not a supported environment'.format(environment))
 
-    creds = {i.strip().split("=")[0] : i.strip().split("=")[1] for i in open('../credentials/{0}'.format(environment), 'r')}
+    _path = os.path.join(CREDENTIALS_DIR, environment)
+
+    creds = {i.strip().split("=")[0] : i.strip().split("=")[1] for i in open(_path, 'r')}
 
     try:
       self.host = creds['host']
       '''the openstack host url'''
     except:
-      _out('Missing host in credentials file {0}'.format('../credentials/{0}'.format(environment)))
+      _out('Missing host in credentials file {0}'.format(_path))
     try:
       self.user = creds['user']
       '''the openstack user account'''
     except:
-      _out('Missing user in credentials file {0}'.format('../credentials/{0}'.format(environment)))
+      _out('Missing user in credentials file {0}'.format(_path))
     try:
       self.password = creds['password']
       '''the openstack user password'''
     except:
-      _out('Missing password in credentials file {0}'.format('../credentials/{0}'.format(environment)))
+      _out('Missing password in credentials file {0}'.format(_path))
     try:
       self.project = creds['project']
       '''the openstack tenant'''
     except:
-      _out('Missing project in credentials file {0}'.format('../credentials/{0}'.format(environment)))
+      _out('Missing project in credentials file {0}'.format(_path))
     try:
       self.domain = creds['domain']
       '''the openstack domain'''
     except:
-      _out('Missing domain in credentials file {0}'.format('../credentials/{0}'.format(environment)))
-
+      _out('Missing domain in credentials file {0}'.format(_path))
+
+    self.token_cache = _flag(creds.get('token_cache'))
+    '''optional, reuse keystone tokens across runs'''
+
+    self.endpoint_cache = _flag(creds.get('endpoint_cache'))
+    '''optional, keep the parsed service catalog on disk'''
+
+    self.transport = {}
+    '''optional http transport settings, pool_connections pool_maxsize connect_timeout read_timeout'''
+
+    for k, _type in [('pool_connections', int), ('pool_maxsize', int), ('connect_timeout', float), ('read_timeout', float)]:
+      if k in creds:
+        try:
+          self.transport[k] = _type(creds[k].strip("'"))
+        except ValueError:
+          _out('Invalid {0} in credentials file {1}'.format(k, _path))
+
+    self.retry = {}
+    '''optional retry policy of read only api calls, attempts backoff backoff_max budget_ratio'''
+
+    self.breaker = {}
+    '''optional circuit breaker settings, threshold reset_timeout'''
+
+    for key, k, _type, _d in [('retry_attempts', 'attempts', int, self.retry), \
+                              ('retry_backoff', 'backoff', float, self.retry), \
+                              ('retry_backoff_max', 'backoff_max', float, self.retry), \
+                              ('retry_budget', 'budget_ratio', float, self.retry), \
+                              ('breaker_threshold', 'threshold', int, self.breaker), \
+                              ('breaker_reset', 'reset_timeout', float, self.breaker)]:
+      if key in creds:
+        try:
+          _d[k] = _type(creds[key].strip("'"))
+        except ValueError:
+          _out('Invalid {0} in credentials file {1}'.format(key, _path))
+
+    self.singleflight_window = None
+    '''optional seconds a finished read only api call result is shared with identical calls'''
+
+    if 'singleflight_window' in creds:
+      try:
+        self.singleflight_window = float(creds['singleflight_window'].strip("'"))
+      except ValueError:
+        _out('Invalid singleflight_window in credentials file {0}'.format(_path))
+
+    self.limits = {}
+    '''optional client side api limits, default or service -> rate_limit rate_burst max_inflight'''
+
+    for service in ['default'] + known_services:
+      for k, _type in [('rate_limit', float), ('rate_burst', int), ('max_inflight', int)]:
+        key = k if service == 'default' else '{0}_{1}'.format(service, k)
+        if key in creds:
+          try:
+            self.limits.setdefault(service, {})[k] = _type(creds[key].strip("'"))
+          except ValueError:
+            _out('Invalid {0} in credentials file {1}'.format(key, _path))
+
+
+def _flag(value):
+  '''
+  Evaluate an optional true|false credentials file value
+  '''
+  return str(value).strip("'").lower() in ['true', 'yes', '1']
 
 def dump_attributes(obj):
   '''
@@ -86,64 +172,36 @@ def dump_attributes(obj):
 
   sys.exit(0)
 
-def common_args():
+def parse_environments(value):
   '''
-  Builds ArgumentParser and fills with common arguments for all OS Clients
+  Expand an --osenv value into the list of environments
 
-    debug - enable verbose logging and print
-  
-    user - valid openstack user name
-
-    password - valid openstack user password
- 
-    host - valid openstack host connect url
-
-    project - valid openstack tenant 
-    
-  INPUTS:
+  INPUT:
 
-    none
+    STRING value - one known environment, a comma separated list, or all (except local_environments)
 
   RETURN:
-  
-    ArgumentParser object
 
-  '''
-  parser = argparse.ArgumentParser()
+    LIST known environments
 
-  parser.add_argument(
-    '--debug',
-    help="toggle debug",
-    action='store_true')
+  RAISES:
 
-  parser.add_argument(
-    '--user',
-    help='Openstack user.',
-    default=None)
-
-  parser.add_argument(
-    '--password',
-    help='Openstack password.',
-    default=None)
-
-  parser.add_argument(
-    '--host',
-    help='Openstack auth_url.',
-    default=None)
-
-  parser.add_argument(
-    '--project',
-    help='Openstack tenant (project).',
-    default=None)
-
-  parser.add_argument(
-    '--osenv',
-    choices=known_environments,
-    help='OpenStack Environment. Use instead of passing credentials in.',
-    default=None)
+    ValueError on an unknown environment
+  '''
+  if value.strip().lower() == 'all':
+    return [e for e in environments() if not e in local_environments]
 
-  return parser
+  envs = []
+  for e in value.split(','):
+    e = e.strip().lower()
+    if not e:
+      continue
+    if not e in environments():
+      raise ValueError('{0} is not a supported environment'.format(e))
+    if not e in envs:
+      envs.append(e)
 
+  return envs
 
 def check_client_args(*args):
   '''
@@ -182,20 +240,21 @@ def _print (text=None):
 
   print '{0}'.format(str(text))
 
-def _log (data=None, state='info'):
+def _log (data=None, state='info', *args, **kwargs):
 
-  # state options [INFO | WARNING | ERROR]
-  with open("OMFOpenStack.log", 'a') as f:
-    _log = '{0} {1}: {2}\n'.format(str(datetime.now()), state.upper(), str(data))
-    f.write(_log)
+  # state options [DEBUG | INFO | WARNING | ERROR]
+  if not omf_log.enabled(state):
+    return
 
-#TODO: create a tracewrapper that can support multiple arguments to the function we are tracing
-#This code below doesn't work right in that use case
+  data = omf_log.render(data, args, kwargs)
 
+  omf_log.sink('OMFOpenStack.log').write(omf_log.line(state, data))
 
 def trace_wrapper(func):
   '''
-  Wraps timing around input function
+  Wraps timing around input function, in a span of the function name (see omf_trace)
+
+  NOTE: changes the return value, new code should use omf_trace.traced()
 
   INPUT:
 
@@ -203,25 +262,23 @@ def trace_wrapper(func):
 
   RETURN:
 
-    function (time delta, function return)
+    function (seconds, function return)
 
   '''
   def wrapper(*arg, **kw):
-    t1 = time.time()
-    res = func(*arg, **kw)
-    t2 = time.time()
+    with omf_trace.span(getattr(func, '__name__', 'trace')) as _span:
+      res = func(*arg, **kw)
 
-    return (t2 - t1), res
+    return _span.duration, res
 
   return wrapper
 
-@trace_wrapper
 def trace(func, *args, **kwargs):
 
   '''
-  Tracing function to time wrap function calls.
+  Tracing function to time wrap function calls, in a span of the function name (see omf_trace)
 
-  Uses decorator trace_wrapper()
+  NOTE: kept for callers of the (seconds, object) form, new code should use omf_trace.span()
 
   INPUTS:
 
@@ -233,10 +290,10 @@ def trace(func, *args, **kwargs):
  
   RETURN:
 
-    function (timedelta, object)
+    function (seconds, object)
 
   '''
-  return func(*args, **kwargs)
+  return trace_wrapper(func)(*args, **kwargs)
 
 def print_pretty_columns(obj, columns):
   '''
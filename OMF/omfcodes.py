@@ -72,6 +72,7 @@ class ExitCodes(object):
     codes[1509] = 'OMF_NO_FREE_VOLUMES'    
     codes[1510] = 'OMF_FAILED_CREDENTIALS'
     codes[1511] = 'OMF_FAILED_INVALID_OMFCLIENT_CLASS'
+    codes[1512] = 'OMF_FAILED_ENVIRONMENTS_DETECTED'
     codes[1599] = 'OMF_INVALID_EXIT_CODE_DESCRIPTOR'
 
   class Nova(object):
@@ -177,6 +178,7 @@ class ExitCodes(object):
     codes[2200] = 'OMF_KEYSTONE_FAILED_CLIENT_INIT'
     codes[2201] = 'OMF_KEYSTONE_FAILED_USERS_LIST'
     codes[2202] = 'OMF_KEYSTONE_FAILED_LOAD_NATIVE_CLIENT_MODULE'
+    codes[2203] = 'OMF_KEYSTONE_FAILED_SESSION_INIT'
 
   _codes = Omf.codes.copy()
   _codes.update(Nova.codes)
@@ -0,0 +1,82 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  Benchmark OMFClient start-up cost.
+
+  Compares the time to get a usable client for a single service command
+  (i.e. --show flavors only needs nova) against creating every OMF service
+  client, which is what OMFClient() used to do in __init__.
+
+USAGE:
+
+  * python benchmarks/bench_client_startup.py --osenv sandbox
+
+  * python benchmarks/bench_client_startup.py --osenv sandbox --clients nova,cinder --repeat 10
+
+  Must be pointed at a reachable openstack environment, every run authenticates.
+'''
+
+import os, sys, time
+import argparse
+
+OMF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OMF')
+
+ALL_CLIENTS = ['keystone', 'nova', 'cinder', 'heat', 'glance', 'neutron', 'ceilo']
+
+
+def _startup(osenv, clients):
+  '''
+  Time OMFClient creation plus first use of each named service client
+
+  INPUTS:
+
+    STRING osenv - known openstack environment
+
+    LIST clients - service client short names to touch
+
+  RETURN:
+
+    FLOAT seconds
+  '''
+  t1 = time.time()
+  c = omfbase.OMFCLIENT_CLASS(osenv=osenv)
+  for name in clients:
+    getattr(c, '{0}_client'.format(name))
+  t2 = time.time()
+
+  return t2 - t1
+
+
+def _report(label, samples):
+
+  samples = sorted(samples)
+  print '{0}  min={1:.3f}s  median={2:.3f}s  max={3:.3f}s'.format(label.ljust(24), \
+                                                                 samples[0], \
+                                                                 samples[len(samples) / 2], \
+                                                                 samples[-1])
+
+if __name__ == '__main__':
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--osenv', required=True, help='OpenStack Environment to benchmark against.')
+  parser.add_argument('--clients', default='nova', help='Comma separated clients the command needs. default=nova')
+  parser.add_argument('--repeat', type=int, default=5, help='Number of runs for each case. default=5')
+  args = parser.parse_args()
+
+  # OMFClient.log IS WRITTEN TO THE WORKING DIRECTORY, NEXT TO THE ONE OF omf-osmgr.py
+  os.chdir(OMF_DIR)
+  sys.path.insert(0, OMF_DIR)
+  import omfbase
+
+  needed = [c.strip() for c in args.clients.split(',')]
+
+  lazy = [_startup(args.osenv, needed) for x in range(args.repeat)]
+  eager = [_startup(args.osenv, ALL_CLIENTS) for x in range(args.repeat)]
+
+  print '\nOMFClient start-up, {0} runs each, osenv={1}\n'.format(args.repeat, args.osenv)
+  _report('on demand ({0})'.format(','.join(needed)), lazy)
+  _report('all clients', eager)
+
+  print '\nsaved per invocation (median): {0:.3f}s'.format(sorted(eager)[len(eager) / 2] - sorted(lazy)[len(lazy) / 2])
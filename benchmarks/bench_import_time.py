@@ -0,0 +1,191 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  Benchmark omf-osmgr.py import time for each command.
+
+  Every case runs omf-osmgr.py in a fresh interpreter with an import hook and prints
+  python -X importtime style lines (self and cumulative microseconds for each module
+  imported for the first time), followed by a summary of all cases.
+
+  --help and argument errors must finish without importing any openstack client library or
+  reading the credentials, also when started outside OMF/. Each command should only import the
+  client libraries of the services it uses.
+
+USAGE:
+
+  * python benchmarks/bench_import_time.py  (only --help and argument error cases, no cloud needed)
+
+  * python benchmarks/bench_import_time.py --osenv sandbox
+
+  * python benchmarks/bench_import_time.py --osenv sandbox --cases show-flavors,checkvolumes --verbose
+
+  With --osenv the commands are run against that openstack environment.
+'''
+
+import os, sys
+import argparse
+import subprocess
+import json
+
+OMF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OMF')
+
+OSMGR = os.path.join(OMF_DIR, 'omf-osmgr.py')
+
+OPENSTACK_PACKAGES = ['keystoneclient', 'novaclient', 'cinderclient', 'glanceclient', \
+                      'heatclient', 'neutronclient', 'ceilometerclient', 'requests']
+''' top level packages that count as openstack client libraries '''
+
+CASES = [
+  ('help', ['--help'], False, []),
+  ('bad-argument', ['--nosuchflag'], False, []),
+  ('bad-osenv', ['--osenv', 'nosuchenv', '--checkhostsapi'], False, []),
+  ('checkclients', ['--checkclients'], True, ['keystoneclient', 'novaclient', 'cinderclient', 'glanceclient', \
+                                                'heatclient', 'neutronclient', 'ceilometerclient']),
+  ('checkhosts', ['--checkhosts'], True, ['novaclient']),
+  ('checkhostsapi', ['--checkhostsapi'], True, ['novaclient']),
+  ('checkvolumes', ['--checkvolumes'], True, ['cinderclient']),
+  ('checkmetrics', ['--checkmetrics'], True, ['ceilometerclient']),
+  ('listmetrics', ['--listmetrics'], True, ['ceilometerclient']),
+  ('show-flavors', ['--show', 'flavors'], True, ['novaclient']),
+  ('show-images', ['--show', 'images'], True, ['glanceclient']),
+  ('show-volumes', ['--show', 'volumes'], True, ['cinderclient']),
+  ('show-networks', ['--show', 'networks'], True, ['neutronclient']),
+  ('show-stacks', ['--show', 'stacks'], True, ['heatclient']),
+]
+''' name, omf-osmgr.py arguments, needs --osenv, openstack packages the command is expected to use '''
+
+OUTSIDE_CASES = ['help', 'bad-argument']
+''' cases also run from the root directory, as <name>-outside, where ../credentials does not exist '''
+
+_CHILD = r'''
+import os, sys, time, json, traceback, __builtin__
+
+_records = []
+_stack = [0.0]
+_import = __builtin__.__import__
+
+def _timed_import(name, *args, **kwargs):
+  if name in sys.modules:
+    return _import(name, *args, **kwargs)
+  _stack.append(0.0)
+  t1 = time.time()
+  try:
+    return _import(name, *args, **kwargs)
+  finally:
+    total = time.time() - t1
+    nested = _stack.pop()
+    _stack[-1] += total
+    if name in sys.modules:
+      _records.append((name, int((total - nested) * 1e6), int(total * 1e6), len(_stack)))
+
+__builtin__.__import__ = _timed_import
+
+sys.argv = [sys.argv[1]] + json.loads(sys.argv[2])
+sys.path.insert(0, os.path.dirname(os.path.abspath(sys.argv[0])))
+
+_start = time.time()
+_error = None
+try:
+  execfile(sys.argv[0], {'__name__': '__main__', '__file__': sys.argv[0]})
+except SystemExit:
+  pass
+except Exception:
+  _error = traceback.format_exc()
+finally:
+  __builtin__.__import__ = _import
+  sys.__stderr__.write('\n@@OMF-IMPORTTIME@@' + json.dumps({'records': _records, 'wall': time.time() - _start, \
+                                                              'modules': sorted(sys.modules.keys()), 'error': _error}) + '\n')
+'''
+
+
+def _run_case(argv, cwd=OMF_DIR):
+  '''
+  Run omf-osmgr.py once with the import hook in a fresh interpreter
+
+  INPUTS:
+
+    LIST argv - omf-osmgr.py arguments
+
+    STRING cwd - working directory. default OMF_DIR
+
+  RETURN:
+
+    DICT records, wall, modules, error (traceback of an exception omf-osmgr.py raised, or None)
+  '''
+  p = subprocess.Popen([sys.executable, '-c', _CHILD, os.path.abspath(OSMGR), json.dumps(argv)], cwd=cwd, \
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+  out, err = p.communicate()
+
+  marker = err.rfind('@@OMF-IMPORTTIME@@')
+  if marker < 0:
+    raise RuntimeError('omf-osmgr.py {0} did not report import times:\n{1}'.format(' '.join(argv), err))
+
+  return json.loads(err[marker + len('@@OMF-IMPORTTIME@@'):])
+
+
+def _openstack_modules(modules):
+
+  return sorted(set([m.split('.')[0] for m in modules if m.split('.')[0] in OPENSTACK_PACKAGES]))
+
+
+def _print_importtime(records):
+
+  print 'import time: self [us] | cumulative | imported package'
+  for name, _self, cumulative, depth in records:
+    print 'import time: {0:>9} | {1:>10} | {2}{3}'.format(_self, cumulative, '  ' * (depth - 1), name)
+
+
+if __name__ == '__main__':
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--osenv', default=None, help='OpenStack Environment to run the commands against.')
+  parser.add_argument('--cases', default=None, help='Comma separated case names. default=all runnable cases')
+  parser.add_argument('--verbose', action='store_true', help='Print importtime lines for every case.')
+  args = parser.parse_args()
+
+  selected = args.cases.split(',') if args.cases else None
+
+  results = []
+  failed = False
+
+  runs = []
+  for name, argv, needs_osenv, expected in CASES:
+    runs.append((name, argv, needs_osenv, expected, OMF_DIR))
+    if name in OUTSIDE_CASES:
+      runs.append(('{0}-outside'.format(name), argv, needs_osenv, expected, os.path.abspath(os.sep)))
+
+  for name, argv, needs_osenv, expected, cwd in runs:
+    if selected and name not in selected:
+      continue
+    if needs_osenv:
+      if not args.osenv:
+        continue
+      argv = ['--osenv', args.osenv] + argv
+
+    r = _run_case(argv, cwd)
+
+    if args.verbose:
+      print '\n== omf-osmgr.py {0}\n'.format(' '.join(argv))
+      _print_importtime(r['records'])
+
+    loaded = _openstack_modules(r['modules'])
+    unexpected = [m for m in loaded if m not in expected + ['keystoneclient', 'requests']] if expected else loaded
+
+    if unexpected or r['error']:
+      failed = True
+
+    if r['error']:
+      print '\n== omf-osmgr.py {0} failed in {1}\n\n{2}'.format(' '.join(argv), cwd, r['error'])
+
+    results.append((name, sum([x[1] for x in r['records']]), len(r['records']), r['wall'], loaded, unexpected))
+
+  print '\n{0}{1}{2}{3}{4}'.format('case'.ljust(22), 'import ms'.rjust(11), 'modules'.rjust(9), 'wall ms'.rjust(10), \
+                                   '  openstack packages')
+  for name, us, count, wall, loaded, unexpected in results:
+    print '{0}{1:>11.1f}{2:>9}{3:>10.1f}  {4}{5}'.format(name.ljust(22), us / 1000.0, count, wall * 1000, \
+                                                      ','.join(loaded) or '-', \
+                                                      '  UNEXPECTED: {0}'.format(','.join(unexpected)) if unexpected else '')
+
+  sys.exit(1 if failed else 0)
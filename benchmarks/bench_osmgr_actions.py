@@ -0,0 +1,307 @@
+'''
+Author: Paul Bruno
+
+Description:
+
+  Benchmark every omf-osmgr.py action against the fake cloud (OMF/omf_fakecloud.py)
+  at several cloud sizes, to catch api call counts or run times that grow faster than
+  the cloud (i.e. a quadratic get_instances_with_status) before they hit production.
+
+  Every case runs omf-osmgr.py --osenv fakecloud in a fresh interpreter and records:
+
+    wall_seconds   - run time of the command
+    api_calls      - http requests the fake cloud served, per service in services
+    bytes_in/out   - request and response body bytes
+    peak_rss_kb    - maximum resident set size of the omf-osmgr.py process
+    exit_code      - omf-osmgr.py exit code, None if it ran into --timeout
+
+  For each action the growth exponent between two sizes is log(wall2/wall1) / log(servers2/servers1),
+  about 1 for linear and 2 for quadratic behavior. The same exponent of the api_calls ratio is checked
+  against --max-calls-exponent, wall time at small sizes is mostly interpreter start-up. Actions above
+  either are listed in the summary and make the benchmark exit 1. Runs that exit non zero are listed
+  as failed and have no exponents.
+
+  Results are printed (or written to --out) as json.
+
+USAGE:
+
+  * python benchmarks/bench_osmgr_actions.py
+
+  * python benchmarks/bench_osmgr_actions.py --sizes 10:10,1000:100,50000:1000 --out results.json
+
+  * python benchmarks/bench_osmgr_actions.py --actions checkhosts,show-hosts --latency 0.005
+
+  Sizes are servers:hypervisors, volumes scale with the servers. The fake cloud listens on
+  --port, credentials/fakecloud points at 35357. The host pings of --checkhosts and --test addip
+  are answered by a ping shim so the runs measure OMF, not icmp, and the image download of
+  --test createimage is served by the fake cloud acting as http proxy.
+'''
+
+import os, sys, time
+import argparse
+import subprocess
+import json
+import math
+import shutil
+import tempfile
+
+OMF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'OMF')
+
+OSMGR = os.path.join(OMF_DIR, 'omf-osmgr.py')
+
+ACTIONS = [
+  ('checkhosts', ['--checkhosts']),
+  ('checkhostsapi', ['--checkhostsapi']),
+  ('checkvolumes', ['--checkvolumes']),
+  ('listmetrics', ['--listmetrics']),
+  ('show-hosts', ['--show', 'hosts']),
+  ('show-hostsfull', ['--show', 'hostsfull']),
+  ('show-flavors', ['--show', 'flavors']),
+  ('show-networks', ['--show', 'networks']),
+  ('show-images', ['--show', 'images']),
+  ('show-imagesfull', ['--show', 'imagesfull']),
+  ('show-quotas', ['--show', 'quotas']),
+  ('show-stacks', ['--show', 'stacks']),
+  ('show-volumes', ['--show', 'volumes']),
+  ('show-volumefull', ['--show', 'volumefull']),
+  ('test-attachvolume', ['--test', 'attachvolume']),
+  ('test-createvolume', ['--test', 'createvolume']),
+  ('test-createserver', ['--test', 'createserver']),
+  ('test-createstack', ['--test', 'createstack']),
+  ('test-createimage', ['--test', 'createimage']),
+  ('test-addip', ['--test', 'addip']),
+]
+''' name, omf-osmgr.py arguments '''
+
+DEFAULT_SIZES = '10:10,1000:100,50000:1000'
+
+
+def _sizes(value):
+  '''
+  Parse servers:hypervisors pairs
+
+  RETURN:
+
+    LIST of TUPLE (servers, hypervisors)
+  '''
+  ret = []
+  for s in value.split(','):
+    servers, hypervisors = s.split(':') if ':' in s else (s, max(1, int(s) / 50))
+    ret.append((int(servers), int(hypervisors)))
+  return ret
+
+
+class _CloudProcess(object):
+  '''
+  FakeCloud served from a child process, so the omf-osmgr.py processes forked by the benchmark
+  do not start out with the memory of a large fake cloud (ru_maxrss survives exec)
+  '''
+
+  def __init__(self, **kwargs):
+
+    import multiprocessing
+
+    self._conn, child = multiprocessing.Pipe()
+    self._process = multiprocessing.Process(target=_CloudProcess._serve, args=(child, kwargs))
+    self._process.daemon = True
+    self._process.start()
+
+    self.url = self._conn.recv()
+    ''' base url of the fake cloud '''
+
+  @staticmethod
+  def _serve(conn, kwargs):
+
+    from omf_fakecloud import FakeCloud
+
+    cloud = FakeCloud(**kwargs)
+    conn.send(cloud.start())
+
+    while True:
+      command = conn.recv()
+      if command == 'stats':
+        conn.send(cloud.stats())
+      elif command == 'reset':
+        cloud.reset_stats()
+        conn.send(None)
+      else:
+        cloud.stop()
+        conn.send(None)
+        return
+
+  def _call(self, command):
+
+    self._conn.send(command)
+    return self._conn.recv()
+
+  def stats(self):
+    return self._call('stats')
+
+  def reset_stats(self):
+    return self._call('reset')
+
+  def stop(self):
+    self._call('stop')
+    self._process.join()
+
+
+def _environment(shim):
+  '''
+  Environment of the omf-osmgr.py runs: ping shim first on the PATH, image downloads through the fake cloud
+  '''
+  with open(os.path.join(shim, 'ping'), 'w') as f:
+    f.write('#!/bin/sh\nexit 0\n')
+  os.chmod(os.path.join(shim, 'ping'), 0755)
+
+  env = dict(os.environ)
+  env['PATH'] = '{0}{1}{2}'.format(shim, os.pathsep, env.get('PATH', ''))
+  env['no_proxy'] = '127.0.0.1,localhost'
+  return env
+
+
+def _run_case(cloud, argv, env, timeout):
+  '''
+  Run omf-osmgr.py once against the fake cloud
+
+  INPUTS:
+
+    _CloudProcess cloud - running fake cloud, it's stats are reset
+
+    LIST argv - omf-osmgr.py arguments
+
+    DICT env - process environment
+
+    FLOAT timeout - seconds before the run is killed
+
+  RETURN:
+
+    DICT wall_seconds, exit_code, peak_rss_kb, api_calls, bytes_in, bytes_out, errors, services
+  '''
+  env = dict(env, http_proxy=cloud.url)
+
+  cloud.reset_stats()
+
+  with tempfile.TemporaryFile() as out:
+    t1 = time.time()
+    p = subprocess.Popen([sys.executable, OSMGR, '--osenv', 'fakecloud'] + argv, cwd=OMF_DIR, env=env, \
+                         stdout=out, stderr=subprocess.STDOUT)
+
+    status, rusage, timed_out = None, None, False
+    while status is None:
+      pid, _status, _rusage = os.wait4(p.pid, os.WNOHANG)
+      if (pid):
+        status, rusage = _status, _rusage
+      elif time.time() - t1 > timeout:
+        p.kill()
+        pid, status, rusage = os.wait4(p.pid, 0)
+        timed_out = True
+      else:
+        time.sleep(0.01)
+    wall = time.time() - t1
+
+    # os.wait4 REAPED THE CHILD, KEEP Popen FROM WAITING FOR IT AGAIN
+    p.returncode = status
+
+    out.seek(0)
+    tail = out.read()[-2000:]
+
+  stats = cloud.stats()
+
+  ret = {'wall_seconds': round(wall, 4), \
+         'exit_code': None if timed_out else os.WEXITSTATUS(status), \
+         'peak_rss_kb': rusage.ru_maxrss, \
+         'api_calls': stats['requests'], \
+         'bytes_in': stats['bytes_in'], \
+         'bytes_out': stats['bytes_out'], \
+         'errors': stats['errors'], \
+         'services': dict([(k, v['requests']) for k, v in stats['services'].items()])}
+
+  if timed_out or ret['exit_code']:
+    ret['output'] = tail
+
+  return ret
+
+
+def _exponent(a, b, key='wall_seconds'):
+  '''
+  Growth exponent of key (wall_seconds or api_calls) between two runs. None if a run failed or timed out,
+  the sizes are the same or a value is 0
+  '''
+  if a['servers'] == b['servers'] or a['exit_code'] != 0 or b['exit_code'] != 0:
+    return None
+
+  if not (a[key] > 0 and b[key] > 0):
+    return None
+
+  return round(math.log(float(b[key]) / a[key]) / math.log(float(b['servers']) / a['servers']), 2)
+
+
+if __name__ == '__main__':
+
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--sizes', default=DEFAULT_SIZES, \
+                      help='Comma separated servers:hypervisors cloud sizes. default={0}'.format(DEFAULT_SIZES))
+  parser.add_argument('--actions', default=None, help='Comma separated action names. default=all')
+  parser.add_argument('--latency', type=float, default=0.0, help='Seconds the fake cloud adds to every request. default=0')
+  parser.add_argument('--timeout', type=float, default=600, help='Seconds before a run is killed. default=600')
+  parser.add_argument('--max-exponent', type=float, default=1.5, \
+                      help='Growth exponent above which an action is reported as super-linear. default=1.5')
+  parser.add_argument('--max-calls-exponent', type=float, default=1.2, \
+                      help='Growth exponent of the api calls above which an action is reported as super-linear. default=1.2')
+  parser.add_argument('--port', type=int, default=35357, help='Fake cloud port, must match credentials/fakecloud. default=35357')
+  parser.add_argument('--out', default=None, help='Write the json results to this file instead of stdout.')
+  args = parser.parse_args()
+
+  sys.path.insert(0, OMF_DIR)
+
+  selected = args.actions.split(',') if args.actions else None
+  actions = [(name, argv) for name, argv in ACTIONS if not selected or name in selected]
+
+  shim = tempfile.mkdtemp(prefix='omf-bench-')
+  env = _environment(shim)
+
+  results = []
+
+  try:
+    for servers, hypervisors in _sizes(args.sizes):
+      for name, argv in actions:
+        # A FRESH CLOUD PER RUN, --test ACTIONS CREATE AND DELETE OBJECTS
+        cloud = _CloudProcess(servers=servers, hypervisors=hypervisors, volumes=max(10, servers / 10), \
+                              latency=args.latency, port=args.port)
+        try:
+          r = _run_case(cloud, argv, env, args.timeout)
+        finally:
+          cloud.stop()
+
+        r.update({'action': name, 'servers': servers, 'hypervisors': hypervisors})
+        results.append(r)
+
+        sys.stderr.write('{0:<20}{1:>8} servers{2:>6} hypervisors{3:>10.2f}s{4:>8} calls{5:>10} KB rss  exit {6}\n'.format( \
+                         name, servers, hypervisors, r['wall_seconds'], r['api_calls'], r['peak_rss_kb'], r['exit_code']))
+  finally:
+    shutil.rmtree(shim, ignore_errors=True)
+
+  growth = []
+  for name, argv in actions:
+    runs = [run for run in results if run['action'] == name]
+    for a, b in zip(runs, runs[1:]):
+      growth.append({'action': name, 'from_servers': a['servers'], 'to_servers': b['servers'], \
+                     'exponent': _exponent(a, b), 'calls_exponent': _exponent(a, b, 'api_calls'), \
+                     'api_calls_ratio': round(float(b['api_calls']) / a['api_calls'], 2) if a['api_calls'] else None})
+
+  superlinear = sorted(set([g['action'] for g in growth if g['exponent'] is not None and g['exponent'] > args.max_exponent]))
+  calls_superlinear = sorted(set([g['action'] for g in growth \
+                                  if g['calls_exponent'] is not None and g['calls_exponent'] > args.max_calls_exponent]))
+  timeouts = sorted(set([run['action'] for run in results if run['exit_code'] is None]))
+  failed = sorted(set([run['action'] for run in results if run['exit_code']]))
+
+  report = {'sizes': _sizes(args.sizes), 'latency': args.latency, 'results': results, 'growth': growth, \
+            'superlinear': superlinear, 'calls_superlinear': calls_superlinear, 'timeouts': timeouts, 'failed': failed}
+
+  if (args.out):
+    with open(args.out, 'w') as f:
+      json.dump(report, f, indent=2, sort_keys=True)
+  else:
+    print json.dumps(report, indent=2, sort_keys=True)
+
+  sys.exit(1 if superlinear or calls_superlinear or timeouts else 0)
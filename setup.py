@@ -24,7 +24,7 @@ setup(name='omf',
       description='Openstack Management Framework',
       author='Paul Bruno',
       author_email='paul@autoagentframework.com',
-      py_modules=['omf_nova','omf_glance', 'omf_cinder', 'omf_neutron', 'omf_ceilometer', 'omf_heat', 'omf_keystone', 'omf_client', 'omfbase', 'omfcodes'],
+      py_modules=['omf_nova','omf_glance', 'omf_cinder', 'omf_neutron', 'omf_ceilometer', 'omf_heat', 'omf_keystone', 'omf_session', 'omf_client', 'omf_async', 'omf_metrics', 'omf_limits', 'omf_retry', 'omf_singleflight', 'omf_cassette', 'omf_fakecloud', 'omf_log', 'omf_trace', 'omf_profile', 'omf_args', 'omfbase', 'omfcodes'],
       scripts=list(get_files('docs,templates,credentials')),
       url='https://github.com/thetoolsmith/omf',
       packages=['OMF'],
@@ -32,9 +32,9 @@ setup(name='omf',
         classifiers=[
           "Programming Language :: Python 2.7+",
         ],
-      install_requires=['python-ceilometerclient>=0.4.6', \
+      install_requires=['python-ceilometerclient>=1.5.0', \
                         'python-cinderclient>=1.4.0', \
-                        'python-glanceclient>=0.19.0', \
+                        'python-glanceclient>=1.0.0', \
                         'python-heatclient>=0.8.0', \
                         'python-keystoneclient>=1.8.1', \
                         'python-neutronclient>=3.1.0', \